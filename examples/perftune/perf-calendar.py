@@ -0,0 +1,33 @@
+import random, time
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# inspecting a large calendar: the first page and a later page of the
+# future events, and a snapshot, which is copied when the simulation
+# goes on, and sorted when it's read
+N = 1000000
+
+def handler(): pass
+
+for eventlist in sorted(_EVENTLISTS.keys()):
+    random.seed(13579)
+    sim = simulus.simulator(eventlist=eventlist)
+    for _ in range(N):
+        sim.sched(handler, offset=random.expovariate(1e-3))
+    sim.run(until=1)
+
+    t = time.time()
+    sim.calendar(0, 100)
+    t1 = time.time()-t
+    t = time.time()
+    sim.calendar(N//100, 100)
+    t2 = time.time()-t
+    snap = sim.snapshot()
+    t = time.time()
+    sim.step()
+    t3 = time.time()-t
+    t = time.time()
+    snap.calendar(N//2, 100)
+    t4 = time.time()-t
+    print("%-12s first page: %.4f sec, page at %d: %.4f sec, snapshot copy: %.2f sec, read: %.2f sec" %
+          (eventlist, t1, N//100, t2, t3, t4))
@@ -0,0 +1,30 @@
+import random, time, tracemalloc
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# the classic hold model: the event list is kept at a constant size
+# of N pending events; each executed event schedules a successor at
+# an exponentially distributed time in the future
+N = 100000
+M = 1000000
+
+def hold(sim):
+    sim.sched(hold, sim, offset=random.expovariate(1))
+
+def run(eventlist):
+    random.seed(13579)
+    tracemalloc.start()
+    sim = simulus.simulator(eventlist=eventlist)
+    for _ in range(N):
+        sim.sched(hold, sim, offset=random.expovariate(1))
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    t = time.time()
+    while sim._runtime["executed_events"] < M:
+        sim.step()
+    t = time.time()-t
+    print("%-12s %10.0f events/sec %8.1f bytes/event" % (eventlist, M/t, mem/N))
+
+for eventlist in sorted(_EVENTLISTS.keys()):
+    run(eventlist)
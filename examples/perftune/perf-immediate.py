@@ -0,0 +1,52 @@
+import random, sys, time
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# zero-delay scheduling: a number of processes pass messages through
+# mailboxes with no delay (and event handlers schedule follow-up
+# events at the current time), while a large number of future events
+# are pending on the event list
+N = 100000 # number of pending future events
+M = 200000 # number of zero-delay messages/events
+
+def future(): pass
+
+def chain(sim, n):
+    if n > 0:
+        sim.sched(chain, sim, n-1)
+
+def ping(sim, mb_in, mb_out, n):
+    for _ in range(n):
+        mb_out.send('ping')
+        mb_in.recv()
+
+def pong(sim, mb_in, mb_out):
+    while True:
+        mb_in.recv()
+        mb_out.send('pong')
+
+def run(eventlist):
+    random.seed(13579)
+    sim = simulus.simulator(eventlist=eventlist)
+    for _ in range(N):
+        sim.sched(future, offset=1+random.random())
+    sim.sched(chain, sim, M)
+    t = time.time()
+    sim.run(until=1)
+    t1 = time.time()-t
+
+    sim = simulus.simulator(eventlist=eventlist)
+    for _ in range(N):
+        sim.sched(future, offset=1+random.random())
+    mb1 = sim.mailbox(min_delay=0)
+    mb2 = sim.mailbox(min_delay=0)
+    sim.process(ping, sim, mb1, mb2, M//2)
+    sim.process(pong, sim, mb2, mb1)
+    t = time.time()
+    sim.run(until=1)
+    t2 = time.time()-t
+    print("%-12s sched(now) %8.0f events/sec, mailbox(delay=0) %8.0f msgs/sec" %
+          (eventlist, M/t1, M/t2))
+
+for eventlist in sys.argv[1:] if len(sys.argv) > 1 else sorted(_EVENTLISTS.keys()):
+    run(eventlist)
@@ -0,0 +1,45 @@
+import random, sys, time
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# throughput of the simulator's main loop (events/sec) for three
+# kinds of models: direct events (the hold model), periodic events
+# (repeat_intv), and processes that sleep
+N = 1000 # number of pending events/processes
+M = 500000 # number of events to be executed
+
+def hold(sim):
+    sim.sched(hold, sim, offset=random.expovariate(1))
+
+def tick():
+    pass
+
+def sleeper(sim):
+    while True:
+        sim.sleep(random.expovariate(1))
+
+def direct(sim):
+    for _ in range(N):
+        sim.sched(hold, sim, offset=random.expovariate(1))
+
+def periodic(sim):
+    for _ in range(N):
+        sim.sched(tick, offset=random.random(), repeat_intv=1+random.random())
+
+def processes(sim):
+    for _ in range(N):
+        sim.process(sleeper, sim, offset=random.random())
+
+def run(eventlist, model):
+    random.seed(13579)
+    sim = simulus.simulator(eventlist=eventlist)
+    model(sim)
+    t = time.time()
+    sim.run(until=M/N)
+    t = time.time()-t
+    return sim._runtime["executed_events"]/t
+
+eventlists = sys.argv[1:] or sorted(_EVENTLISTS.keys())
+for eventlist in eventlists:
+    print("%-12s" % eventlist, "  ".join("%s: %8.0f events/sec" % (m.__name__, run(eventlist, m))
+                                         for m in (direct, periodic, processes)))
@@ -0,0 +1,61 @@
+import os, tracemalloc
+import simulus
+
+# memory footprint of the pending events and the processes; the
+# events are scheduled with and without arguments, and the processes
+# are created but not yet started, or run to their first sleep (where
+# a greenlet process keeps its stack, but a coroutine process keeps
+# only its frame); for the suspended processes, we also report the
+# growth of the resident set size (RSS), if available, which counts
+# the memory not traced by python (such as the greenlet stacks)
+N = 100000
+
+def handler(*args): pass
+
+def proc(*args): pass
+
+async def aproc(*args): pass
+
+def sproc(sim):
+    sim.sleep(1e9)
+
+async def asproc(sim):
+    await sim.sleep(1e9)
+
+def rss():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1])*os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return None
+
+def measure(what, create, run=False):
+    sim = simulus.simulator()
+    r0 = rss()
+    tracemalloc.start()
+    create(sim)
+    if run: sim.run(offset=1)
+    mem = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    r1 = rss()
+    if not run or r0 is None:
+        print("%-28s %8.1f bytes/%s" % (what, mem/N, what.split()[0]))
+    else:
+        print("%-28s %8.1f bytes/%s (rss %.1f)" % (what, mem/N, what.split()[0], (r1-r0)/N))
+
+measure("event (no args)",
+        lambda sim: [sim.sched(handler, offset=i) for i in range(N)])
+measure("event (with args)",
+        lambda sim: [sim.sched(handler, i, i+1, offset=i) for i in range(N)])
+measure("event (sched_many)",
+        lambda sim: sim.sched_many(handler, offset=range(N)))
+measure("process (no args)",
+        lambda sim: [sim.process(proc, offset=i) for i in range(N)])
+measure("process (with args)",
+        lambda sim: [sim.process(proc, i, i+1, offset=i) for i in range(N)])
+measure("process (async def)",
+        lambda sim: [sim.process(aproc, offset=i) for i in range(N)])
+measure("process (suspended)",
+        lambda sim: [sim.process(sproc, sim) for i in range(N)], run=True)
+measure("process (suspended async)",
+        lambda sim: [sim.process(asproc, sim) for i in range(N)], run=True)
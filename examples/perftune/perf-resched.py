@@ -0,0 +1,36 @@
+import random, sys, time
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# the cost of rescheduling (and cancelling) events should stay flat as
+# the number of pending events grows; we fill the event list with N
+# events and then reschedule and cancel random events many times
+K = 100000
+
+def handler():
+    pass
+
+def run(eventlist, n):
+    random.seed(13579)
+    sim = simulus.simulator(eventlist=eventlist)
+    evts = [sim.sched(handler, offset=random.expovariate(1)) for _ in range(n)]
+
+    t = time.time()
+    for _ in range(K):
+        e = evts[random.randrange(n)]
+        sim.resched(e, offset=random.expovariate(1))
+    t1 = time.time()-t
+
+    t = time.time()
+    for _ in range(K):
+        i = random.randrange(n)
+        sim.cancel(evts[i])
+        evts[i] = sim.sched(handler, offset=random.expovariate(1))
+    t2 = time.time()-t
+    print("%-12s n=%-8d resched: %6.2f usec/op  cancel+sched: %6.2f usec/op" %
+          (eventlist, n, t1/K*1e6, t2/K*1e6))
+
+eventlists = sys.argv[1:] if len(sys.argv) > 1 else sorted(_EVENTLISTS.keys())
+for eventlist in eventlists:
+    for n in (10**3, 10**4, 10**5, 10**6):
+        run(eventlist, n)
@@ -0,0 +1,37 @@
+import random, time
+import simulus
+
+# warm-up of a model with a large number of initial events: we
+# compare scheduling the events one at a time using sched() with
+# scheduling them in bulk using sched_many()
+N = 1000000
+
+def handler(idx):
+    pass
+
+random.seed(13579)
+offsets = [random.expovariate(1) for _ in range(N)]
+ids = list(range(N))
+
+for eventlist in ('heap', 'sorteddict', 'calendar'):
+    sim = simulus.simulator(eventlist=eventlist)
+    t = time.time()
+    for i in range(N):
+        sim.sched(handler, ids[i], offset=offsets[i])
+    t1 = time.time()-t
+
+    sim = simulus.simulator(eventlist=eventlist)
+    t = time.time()
+    sim.sched_many(handler, offset=offsets, args=[ids])
+    t2 = time.time()-t
+    print("%-12s sched: %.2f sec, sched_many: %.2f sec" % (eventlist, t1, t2))
+
+try:
+    import numpy as np
+    sim = simulus.simulator()
+    t = time.time()
+    r = np.random.RandomState(13579)
+    sim.sched_many(handler, offset=r.exponential(1, N), args=[np.arange(N)])
+    print("%-12s sched_many (numpy): %.2f sec" % ('heap', time.time()-t))
+except ImportError:
+    pass
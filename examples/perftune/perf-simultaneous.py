@@ -0,0 +1,27 @@
+import simulus
+
+# stress the event list with a large number of simultaneous events:
+# N events are scheduled at only T distinct timestamps; every event
+# must be executed, and events sharing a timestamp must be executed
+# in the order they were scheduled
+N = 1000000
+T = 10
+
+def func(i):
+    global last, count
+    assert i > last
+    last = i
+    count += 1
+
+sim = simulus.simulator()
+for i in range(N):
+    sim.sched(func, i, until=(i%T)*1.0)
+
+last, count = -1, 0
+for t in range(T):
+    # the event ids restart at each timestamp
+    last = -1
+    sim.run(until=t+1.0)
+assert count == N
+
+sim.show_runtime_report()
@@ -0,0 +1,40 @@
+import random, sys, time, tracemalloc
+from simulus.event import SortedDict, CompactSortedDict
+
+# memory footprint and throughput of the sorted dict against the
+# compact sorted dict (with keys in lists and in arrays of doubles);
+# the keys are random float timestamps, as on a calendar
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+random.seed(13579)
+keys = [random.random()*N for _ in range(N)]
+
+def measure(name, create):
+    tracemalloc.start()
+    d = create()
+    base = tracemalloc.get_traced_memory()[0]
+    for i, k in enumerate(keys): d[k] = i
+    mem = tracemalloc.get_traced_memory()[0]-base
+    tracemalloc.stop()
+    del d
+
+    d = create()
+    t = time.time()
+    for i, k in enumerate(keys): d[k] = i
+    t1 = time.time()-t
+    t = time.time()
+    for k in keys: d[k]
+    t2 = time.time()-t
+    t = time.time()
+    for k in keys[:N//2]: del d[k]
+    t3 = time.time()-t
+    t = time.time()
+    while d: d.popitem(0)
+    t4 = time.time()-t
+    print("%-22s %7.1f bytes/item  insert=%.2fs lookup=%.2fs delete=%.2fs popitem(0)=%.2fs" %
+          (name, mem/N, t1, t2, t3, t4))
+
+print("%d items:" % N)
+measure("SortedDict", SortedDict)
+measure("CompactSortedDict", CompactSortedDict)
+measure("CompactSortedDict('d')", lambda: CompactSortedDict(typecode='d'))
@@ -0,0 +1,36 @@
+import random, time, tracemalloc
+import simulus
+
+# a large number of far-future events are scheduled up front (like
+# a trace-driven arrival process); we compare the memory footprint
+# of keeping all events in memory with spilling the far-future
+# events to disk
+N = 200000 # number of events
+T = 20000   # the events are spread over this time span
+
+def arrival(sim, size): pass
+
+def run(spill_horizon, trace):
+    random.seed(13579)
+    sim = simulus.simulator(spill_horizon=spill_horizon)
+    if trace: tracemalloc.start()
+    t = time.time()
+    for _ in range(N):
+        sim.sched(arrival, sim, random.randrange(1500), until=random.uniform(0, T))
+    t1 = time.time()-t
+    if trace: mem = tracemalloc.get_traced_memory()[0]
+    t = time.time()
+    sim.run()
+    t2 = time.time()-t
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print("spill_horizon=%-8s memory %6.1f MB (peak %6.1f MB)" %
+              (spill_horizon, mem/2**20, peak/2**20))
+    else:
+        print("spill_horizon=%-8s sched %5.2f sec, run %5.2f sec" %
+              (spill_horizon, t1, t2))
+
+for trace in (False, True):
+    for spill_horizon in (None, 1000, 100):
+        run(spill_horizon, trace)
@@ -0,0 +1,51 @@
+import random, sys, time
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+# a timeout-heavy workload: each client repeatedly sends a request
+# and waits for the reply with a timeout, which is almost always
+# cancelled since the reply comes back in time; a number of periodic
+# ticks are also running in the background; the clients are either
+# processes (using simulator.wait() with a timeout) or direct events
+# (scheduling and cancelling the timeout events explicitly)
+N = 2000  # number of clients
+T = 100   # number of periodic ticks
+M = 50    # simulation time
+
+def client(sim):
+    while True:
+        reply = sim.trap()
+        sim.sched(reply.trigger, offset=random.expovariate(1))
+        sim.wait(reply, offset=10)
+
+def request(sim):
+    e = sim.sched(timeout, offset=10)
+    sim.sched(response, sim, e, offset=random.expovariate(1))
+
+def response(sim, e):
+    sim.cancel(e)
+    request(sim)
+
+def timeout(): pass
+
+def tick(): pass
+
+def run(eventlist, procs):
+    random.seed(13579)
+    sim = simulus.simulator(eventlist=eventlist)
+    for _ in range(N):
+        if procs: sim.process(client, sim, offset=random.random())
+        else: sim.sched(request, sim, offset=random.random())
+    for i in range(T):
+        sim.sched(tick, offset=i/T, repeat_intv=0.1)
+    t = time.time()
+    sim.run(until=M)
+    t = time.time()-t
+    n = sim._runtime["executed_events"]+sim._runtime["cancelled_events"]
+    print("%-12s %-10s %10.0f events/sec (%d executed, %d cancelled)" %
+          (eventlist, 'processes' if procs else 'events', n/t,
+           sim._runtime["executed_events"], sim._runtime["cancelled_events"]))
+
+for procs in (True, False):
+    for eventlist in sys.argv[1:] if len(sys.argv) > 1 else sorted(_EVENTLISTS.keys()):
+        run(eventlist, procs)
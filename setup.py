@@ -23,6 +23,6 @@ setuptools.setup(
         "License :: OSI Approved :: MIT License",
         "Operating System :: OS Independent",
     ],
-    install_requires=['greenlet'],
+    extras_require={'greenlet': ['greenlet']},
     python_requires='>=2.8',
 )
@@ -17,10 +17,15 @@ from .utils import *
 from .trappable import *
 from .trap import *
 from .semaphore import *
+from .condition import *
 from .resource import *
 from .store import *
 from .bucket import *
 from .mailbox import *
+from .profiler import *
+from .progress import *
+from .trace import *
+from .waitset import *
 from .simulator import *
 from .sync import *
 
@@ -68,6 +68,7 @@ class Bucket(object):
         self.level = initlevel # nonnegative, no more than capacity
         self.name = name
         self.stats = dc
+        self._watchers = None # the conditions watching the level
 
         # internally, we use two semaphores; one for producer and one
         # for consumer
@@ -122,6 +123,11 @@ class Bucket(object):
             errmsg = "bucket.get(amt=%r) requires positive amount" % amt
             log.error(errmsg)
             raise ValueError(errmsg)
+        return p._block(self._get(p, amt))
+
+    def _get(self, p, amt):
+        """The blocking operation of get() as a generator (see
+        _Process._block())."""
 
         self._make_c_arrival(p, amt)
 
@@ -130,7 +136,7 @@ class Bucket(object):
         if amt > self.level:
             #log.debug('consumer get(amt=%r) blocked from bucket (level=%r) at %g' %
             #          (amt, self.level, self._sim.now))
-            self._c_sem.wait()
+            yield from self._c_sem._wait(p)
             #log.debug('consumer get(amt=%r) unblocked from bucket (level=%r) at %g' %
             #          (amt, self.level, self._sim.now))
         else:
@@ -183,7 +189,12 @@ class Bucket(object):
             errmsg = "bucket.put(amt=%r) requires positive amount" % amt
             log.error(errmsg)
             raise ValueError(errmsg)
-           
+        return p._block(self._put(p, amt))
+
+    def _put(self, p, amt):
+        """The blocking operation of put() as a generator (see
+        _Process._block())."""
+
         self._make_p_arrival(p, amt)
 
         # the producer will be blocked if the put amount would
@@ -191,7 +202,7 @@ class Bucket(object):
         if amt + self.level > self.capacity:
             #log.debug('producer put(amt=%r) blocked from bucket (level=%r) at %g' %
             #          (amt, self.level, self._sim.now))
-            self._p_sem.wait()
+            yield from self._p_sem._wait(p)
             #log.debug('producer put(amt=%r) unblocked from bucket (level=%r) at %g' %
             #          (amt, self.level, self._sim.now))
         else:
@@ -414,6 +425,8 @@ class Bucket(object):
             self.stats._sample("put_times", self._sim.now-t)
             self.stats._sample("put_queues", (self._sim.now, len(self._p_arrivals)))
             self.stats._sample("levels", (self._sim.now, self.level))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
             
     def _make_c_departure(self, p, amt):
         t,a = self._c_arrivals.pop(p) # throw a KeyError if not in dictionary
@@ -422,3 +435,5 @@ class Bucket(object):
             self.stats._sample("get_times", self._sim.now-t)
             self.stats._sample("get_queues", (self._sim.now, len(self._c_arrivals)))
             self.stats._sample("levels", (self._sim.now, self.level))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
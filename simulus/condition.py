@@ -0,0 +1,120 @@
+"""Waiting for a predicate on the watched objects to become true."""
+
+from .trappable import Trappable
+
+__all__ = ["Condition"]
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+class Condition(Trappable):
+    """A condition lets processes wait until a predicate becomes true.
+
+    A condition is created by calling the simulator's condition()
+    method with a predicate, which is a function that takes no
+    arguments and returns True or False, and the objects that the
+    predicate depends on (stores, buckets, and resources). The
+    predicate is evaluated when a process waits on the condition; if
+    it's false, the process is blocked. The predicate is re-evaluated
+    only when one of the watched objects changes (i.e., when the level
+    of a store or bucket changes, or when a process arrives at,
+    enters service at, or departs from a resource), and only if there
+    are processes waiting on the condition; once it becomes true, all
+    waiting processes are unblocked.
+
+    The predicate may also depend on other variables, such as user
+    variables, that the condition cannot watch by itself. Whoever
+    changes these variables should call the condition's notify()
+    method afterwards, so that the predicate is re-evaluated.
+
+    A condition is a trappable, so a process can wait on it using the
+    simulator's wait() method along with other trappables (e.g., with
+    a timeout). In that case, the predicate is true when the process
+    is unblocked, but it may become false again before the process
+    resumes execution (if other processes running at the same time
+    change the watched objects); the condition's own wait() method
+    checks the predicate again and waits more if needed.
+
+    """
+
+    __slots__ = ('predicate', 'blocked', '_watched')
+
+    def __init__(self, sim, predicate, watched):
+        """A condition can only be created using simulator's condition()
+        function; it registers itself with the watched objects."""
+
+        super().__init__(sim)
+        self.predicate = predicate
+        self.blocked = []
+        self._watched = watched
+        for w in watched:
+            if w._watchers is None:
+                w._watchers = []
+            w._watchers.append(self)
+
+    def wait(self):
+        """A process waits until the predicate becomes true."""
+
+        # we must be in the process context
+        p = self._sim.cur_process()
+        if p is None:
+            errmsg = "condition.wait() outside process context"
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        return p._block(self._wait(p))
+
+    def _wait(self, p):
+        """The blocking operation of wait() as a generator (see
+        _Process._block())."""
+
+        while not self.predicate():
+            self.blocked.append(p)
+            yield
+
+    def notify(self):
+        """Re-evaluate the predicate, and unblock all waiting processes if it
+        has become true. This method is called automatically when a
+        watched object changes; the user should call it after
+        changing anything else that the predicate depends on."""
+
+        if self.blocked and self.predicate():
+            blocked = self.blocked
+            self.blocked = []
+            for p in blocked:
+                p.acting_trappables.append(self)
+                p.activate()
+
+    def close(self):
+        """Stop watching the objects (the waiting processes, if any, remain
+        blocked until notify() is called)."""
+
+        for w in self._watched:
+            w._watchers.remove(self)
+            if not w._watchers:
+                w._watchers = None
+        self._watched = ()
+
+    def _try_wait(self):
+        """Conditional wait on the condition (called by the simulator's
+        wait() function): return True if the process needs to be
+        suspended, or False if the predicate is already true."""
+
+        # we must be in the process context
+        p = self._sim.cur_process()
+        assert p is not None
+
+        if self.predicate():
+            return False
+        self.blocked.append(p)
+        return True
+
+    def _cancel_wait(self):
+        """Cancel the conditional wait (called by the simulator's wait()
+        function), when the process is no longer waiting on the
+        condition."""
+
+        # we must be in the process context
+        p = self._sim.cur_process()
+        assert p is not None
+        self.blocked.remove(p)
@@ -1,12 +1,16 @@
 """Simulation event types and event list."""
 
+import weakref
+from collections import OrderedDict, deque
 from collections.abc import MutableMapping
+from types import MappingProxyType
 
 from .trappable import Trappable
 from .trap import Trap
 
-__all__ = ["_Event", "_DirectEvent", "_ProcessEvent", "_EventList_", \
-           "infinite_time", "minus_infinite_time"]
+__all__ = ["_Event", "_DirectEvent", "_ProcessEvent", "_EventListBase_", "_EventList_", \
+           "_EventListSnapshot_", "_empty_args", "_empty_kwargs", "infinite_time", \
+           "minus_infinite_time"]
 
 # two extremes of simulation time
 infinite_time = float('inf')
@@ -17,8 +21,12 @@ minus_infinite_time = float('-inf')
 #PQDICT removed, CalQ or Sorted Dict inserted
 import sys
 import warnings
+from array import array
+from bisect import bisect_left, bisect_right
 from sortedcontainers import SortedList, SortedSet
-from itertools import chain
+from functools import reduce
+from itertools import chain, count, islice
+from operator import iadd, itemgetter, lt
 #from collections.abc.Mut
 #from .sortedlist import SortedList, recursive_repr
 from reprlib import recursive_repr
@@ -68,6 +76,9 @@ class SortedDict(dict):
     * :func:`SortedDict.clear`
     * :func:`SortedDict.pop`
     * :func:`SortedDict.popitem`
+    * :func:`SortedDict.pop_range`
+    * :func:`SortedDict.popitems_until`
+    * :func:`SortedDict.del_range`
 
     Methods for looking up items:
 
@@ -496,6 +507,168 @@ class SortedDict(dict):
 
 
 
+    def _cut(self, minimum, maximum, inclusive):
+        """Remove the keys in the given range from the sorted list of keys
+        and return them (in sorted order).
+
+        Rather than removing the keys one at a time, the sublists of the
+        sorted list are sliced, and the sublists at the two ends of the
+        range are merged and split anew.
+
+        """
+        _list = self._list
+        if self._key is not None:
+            # the sorted key list maintains the keys of the keys; we
+            # simply delete the slice of positions
+            lo = 0 if minimum is None else \
+                 (_list.bisect_left if inclusive[0] else _list.bisect_right)(minimum)
+            hi = len(_list) if maximum is None else \
+                 (_list.bisect_right if inclusive[1] else _list.bisect_left)(maximum)
+            keys = _list[lo:hi]
+            if keys:
+                del _list[lo:hi]
+            return keys
+
+        lists = _list._lists
+        maxes = _list._maxes
+        if not maxes:
+            return []
+
+        # the first position in the range
+        if minimum is None:
+            pos0, idx0 = 0, 0
+        else:
+            bis = bisect_left if inclusive[0] else bisect_right
+            pos0 = bis(maxes, minimum)
+            if pos0 == len(maxes):
+                return []
+            idx0 = bis(lists[pos0], minimum)
+
+        # the position after the range
+        if maximum is None:
+            pos1 = len(lists)-1
+            idx1 = len(lists[pos1])
+        else:
+            bis = bisect_right if inclusive[1] else bisect_left
+            pos1 = bis(maxes, maximum)
+            if pos1 == len(maxes):
+                pos1 -= 1
+                idx1 = len(lists[pos1])
+            else:
+                idx1 = bis(lists[pos1], maximum)
+
+        if (pos0, idx0) >= (pos1, idx1):
+            return []
+        if pos0 == pos1:
+            keys = lists[pos0][idx0:idx1]
+            del lists[pos0][idx0:idx1]
+        else:
+            keys = lists[pos0][idx0:]
+            for pos in range(pos0+1, pos1):
+                keys.extend(lists[pos])
+            keys.extend(lists[pos1][:idx1])
+            del lists[pos0][idx0:]
+            del lists[pos1][:idx1]
+            del lists[pos0+1:pos1]
+            del maxes[pos0+1:pos1]
+            pos1 = pos0+1
+
+        # merge the sublists at the two ends of the range (and a
+        # neighbor if they are too short) and split them evenly, so
+        # that all sublists (but the last) are at least half loaded
+        load = _list._load
+        half = load >> 1
+        merged = []
+        for pos in range(pos0, pos1+1):
+            merged.extend(lists[pos])
+        pos1 += 1
+        if len(merged) < half and pos1 < len(lists):
+            merged.extend(lists[pos1])
+            pos1 += 1
+        if len(merged) < half and pos0 > 0:
+            pos0 -= 1
+            merged[:0] = lists[pos0]
+        n = -(-len(merged)//load)
+        chunks = [merged[len(merged)*i//n:len(merged)*(i+1)//n] for i in range(n)]
+        lists[pos0:pos1] = chunks
+        maxes[pos0:pos1] = [chunk[-1] for chunk in chunks]
+
+        _list._len -= len(keys)
+        del _list._index[:]
+        return keys
+
+
+
+    def pop_range(self, minimum=None, maximum=None, inclusive=(True, True)):
+        """Remove and return the ``(key, value)`` pairs with keys in the range
+        from `minimum` to `maximum`, in sorted order.
+
+        Both `minimum` and `maximum` default to `None` which is automatically
+        inclusive of the beginning and end of the sorted dict. The argument
+        `inclusive` is a pair of booleans that indicates whether the minimum
+        and maximum ought to be included in the range, respectively, like
+        in :func:`SortedList.irange`.
+
+        Runtime complexity: `O(log(n) + k)`, where k is the number of items
+        removed -- approximate.
+
+        >>> sd = SortedDict({'a': 1, 'b': 2, 'c': 3, 'd': 4})
+        >>> sd.pop_range('b', 'c')
+        [('b', 2), ('c', 3)]
+        >>> sd
+        SortedDict({'a': 1, 'd': 4})
+
+        :param minimum: minimum key to start range
+        :param maximum: maximum key to end range
+        :param inclusive: pair of booleans
+        :return: list of key and value pairs
+
+        """
+        keys = self._cut(minimum, maximum, inclusive)
+        dict_pop = dict.pop
+        return [(key, dict_pop(self, key)) for key in keys]
+
+
+
+    def popitems_until(self, key, inclusive=False):
+        """Remove and return the ``(key, value)`` pairs with keys less than
+        `key` (or equal to it, if `inclusive` is true), in sorted order.
+
+        Runtime complexity: `O(log(n) + k)`, where k is the number of items
+        removed -- approximate.
+
+        >>> sd = SortedDict({1: 'a', 2: 'b', 3: 'c'})
+        >>> sd.popitems_until(3)
+        [(1, 'a'), (2, 'b')]
+
+        :param key: key to end range
+        :param bool inclusive: whether `key` is included (default false)
+        :return: list of key and value pairs
+
+        """
+        return self.pop_range(None, key, (True, inclusive))
+
+
+
+    def del_range(self, minimum=None, maximum=None, inclusive=(True, True)):
+        """Remove the items with keys in the range from `minimum` to
+        `maximum`; see :func:`SortedDict.pop_range` for the arguments.
+
+        Runtime complexity: `O(log(n) + k)`, where k is the number of items
+        removed -- approximate.
+
+        >>> sd = SortedDict({1: 'a', 2: 'b', 3: 'c'})
+        >>> sd.del_range(2)
+        >>> sd
+        SortedDict({1: 'a'})
+
+        """
+        dict_delitem = dict.__delitem__
+        for key in self._cut(minimum, maximum, inclusive):
+            dict_delitem(self, key)
+
+
+
     def peekitem(self, index=-1):
         """Return ``(key, value)`` pair at `index` in sorted dict.
 
@@ -595,6 +768,107 @@ class SortedDict(dict):
     _update = update
 
 
+    @classmethod
+    def from_sorted(cls, items, key=None, check=True):
+        """Return a new sorted dict built from `items` in sorted order.
+
+        The pairs in `items` must be in increasing order of their keys
+        (with no duplicate keys), for which the sorted list of keys is
+        built in linear time without sorting. See
+        :func:`SortedDict.merge_sorted` for `check`.
+
+        Runtime complexity: `O(n)`
+
+        >>> sd = SortedDict.from_sorted([('a', 1), ('b', 2), ('c', 3)])
+        >>> sd
+        SortedDict({'a': 1, 'b': 2, 'c': 3})
+
+        :param items: iterable of pairs in sorted order
+        :param key: function used to extract comparison key (default None)
+        :param bool check: whether to verify the order (default True)
+        :return: new sorted dict
+
+        """
+        sd = cls(key)
+        sd.merge_sorted(items, check)
+        return sd
+
+
+    def merge_sorted(self, items, check=True):
+        """Merge `items` in sorted order into sorted dict.
+
+        The pairs in `items` must be in increasing order of their keys
+        (with no duplicate keys). Rather than sorting all keys again, the
+        new keys are added one at a time if there are only a few of them,
+        or otherwise merged with the existing keys from the first sublist
+        they fall into (which is a linear merge of two sorted runs, or an
+        append if they all come after the existing keys). Existing items
+        are overwritten.
+
+        If `check` is true, the order of `items` is verified in linear
+        time and, if it does not hold, the items are simply added with
+        :func:`SortedDict.update`. If `check` is false, the order is
+        trusted; unsorted items then leave the sorted dict corrupted.
+
+        Runtime complexity: `O(n+k)`; `O(k*log(n))` if `k` is small
+        relative to `n`.
+
+        >>> sd = SortedDict({'b': 2, 'd': 4})
+        >>> sd.merge_sorted([('a', 1), ('c', 3), ('d', 5)])
+        >>> sd
+        SortedDict({'a': 1, 'b': 2, 'c': 3, 'd': 5})
+
+        :param items: iterable of pairs in sorted order
+        :param bool check: whether to verify the order (default True)
+
+        """
+        if not isinstance(items, list):
+            items = list(items)
+        if not items:
+            return
+        if self._key is not None:
+            self._update(items)
+            return
+
+        keys = [key for key, _ in items]
+        if check and not all(map(lt, keys, islice(keys, 1, None))):
+            self._update(items)
+            return
+        _list = self._list
+        dict.update(self, items)
+        if dict.__len__(self) - _list._len < len(keys):
+            # some keys are already there; keep only the new ones
+            keys = [key for key in keys if key not in _list]
+        if not keys:
+            return
+
+        lists = _list._lists
+        maxes = _list._maxes
+        load = _list._load
+        if maxes:
+            if 4 * len(keys) < _list._len and keys[0] < maxes[-1]:
+                _add = self._list_add
+                for key in keys:
+                    _add(key)
+                return
+            # the sublists before the first new key stay as they are;
+            # the rest are merged with the new keys (two sorted runs
+            # are merged by sort in linear time)
+            pos = min(bisect_left(maxes, keys[0]), len(maxes)-1)
+            merged = reduce(iadd, lists[pos:], [])
+            merged.extend(keys)
+            if keys[0] < maxes[-1]:
+                merged.sort()
+            del lists[pos:]
+            del maxes[pos:]
+            keys = merged
+        chunks = [keys[pos:pos+load] for pos in range(0, len(keys), load)]
+        lists.extend(chunks)
+        maxes.extend(chunk[-1] for chunk in chunks)
+        _list._len = dict.__len__(self)
+        del _list._index[:]
+
+
     def __reduce__(self):
         """Support for pickle.
 
@@ -836,6 +1110,1138 @@ class SortedValuesView(ValuesView, Sequence):
 
     __delitem__ = _view_delitem
 
+class _MultiValues(object):
+    """The values stored under one key of a sorted multi-dict.
+
+    The values are kept in an ordered dict keyed by a sequence number,
+    in the order they have been added. A hashable value is also
+    indexed by the sequence number of its occurrence (or a deque of
+    them, if the value occurs more than once), so that it can be
+    found and removed in O(1) time; an unhashable value is found by a
+    linear scan.
+
+    """
+
+    __slots__ = ('items', 'where', 'seq')
+
+    def __init__(self):
+        self.items = OrderedDict() # sequence number -> value
+        self.where = {} # hashable value -> sequence number(s)
+        self.seq = 0
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(self.items.values())
+
+    def first(self):
+        return next(iter(self.items.values()))
+
+    def last(self):
+        return next(reversed(self.items.values()))
+
+    def append(self, value):
+        seq = self.seq
+        self.seq += 1
+        self.items[seq] = value
+        where = self.where
+        try:
+            seqs = where.get(value)
+        except TypeError:
+            return # unhashable
+        if seqs is None:
+            where[value] = seq
+        elif type(seqs) is int:
+            where[value] = deque((seqs, seq))
+        else:
+            seqs.append(seq)
+
+    def remove(self, value):
+        """Remove the first occurrence of the value; raise ValueError if
+        it's not present."""
+        try:
+            seqs = self.where.get(value)
+        except TypeError:
+            # unhashable
+            for seq, v in self.items.items():
+                if v is value or v == value:
+                    del self.items[seq]
+                    return
+            raise ValueError(value) from None
+        if seqs is None:
+            raise ValueError(value)
+        del self.items[self._unindex(value, seqs, True)]
+
+    def popleft(self):
+        seq, value = self.items.popitem(last=False)
+        self._forget(value, True)
+        return value
+
+    def pop(self):
+        seq, value = self.items.popitem(last=True)
+        self._forget(value, False)
+        return value
+
+    def _forget(self, value, first):
+        try:
+            seqs = self.where.get(value)
+        except TypeError:
+            return # unhashable
+        self._unindex(value, seqs, first)
+
+    def _unindex(self, value, seqs, first):
+        """Drop the first (or the last) occurrence of the value from the
+        index, and return its sequence number."""
+        if type(seqs) is int:
+            del self.where[value]
+            return seqs
+        seq = seqs.popleft() if first else seqs.pop()
+        if len(seqs) == 1:
+            self.where[value] = seqs[0]
+        return seq
+
+    def _check(self):
+        n = 0
+        for value, seqs in self.where.items():
+            seqs = (seqs,) if type(seqs) is int else seqs
+            assert len(seqs) > 0 and list(seqs) == sorted(seqs)
+            assert all(self.items[seq] == value for seq in seqs)
+            n += len(seqs)
+        hashable = 0
+        for value in self.items.values():
+            try:
+                hash(value)
+                hashable += 1
+            except TypeError:
+                pass
+        assert n == hashable
+
+
+class SortedMultiDict(object):
+    """Sorted multi-dict is a sorted mapping that allows duplicate keys.
+
+    The design of sorted multi-dict is similar to sorted dict: a dict maps
+    each distinct key to the values stored under the key, and a sorted list
+    maintains the distinct keys in sorted order. Values stored under the same key are kept
+    in the order they have been added, which is the shape of a calendar of
+    simultaneous events or a buffer of timestamped messages.
+
+    Sorted multi-dict keys must be hashable and comparable. Values are
+    compared by equality (by identity for objects that don't define it) when
+    a specific value is removed; the (hashable) values under each key are
+    indexed, so that the removal takes O(log(n)) time regardless of the
+    number of values under the key. An unhashable value is found by a
+    linear scan of the values under its key.
+
+    Methods for adding items:
+
+    * :func:`SortedMultiDict.add`
+    * :func:`SortedMultiDict.update`
+
+    Methods for removing items:
+
+    * :func:`SortedMultiDict.clear`
+    * :func:`SortedMultiDict.remove`
+    * :func:`SortedMultiDict.discard`
+    * :func:`SortedMultiDict.popitem`
+    * :func:`SortedMultiDict.popall`
+
+    Methods for looking up items:
+
+    * :func:`SortedMultiDict.__contains__`
+    * :func:`SortedMultiDict.getall`
+    * :func:`SortedMultiDict.count`
+    * :func:`SortedMultiDict.peekitem`
+
+    Methods for iteration (in sorted order of keys):
+
+    * :func:`SortedMultiDict.__iter__`
+    * :func:`SortedMultiDict.keys`
+    * :func:`SortedMultiDict.values`
+    * :func:`SortedMultiDict.items`
+
+    Sorted list methods available (applies to distinct keys):
+
+    * :func:`SortedList.bisect_left`
+    * :func:`SortedList.bisect_right`
+    * :func:`SortedList.irange`
+
+    """
+    def __init__(self, iterable=None):
+        """Initialize sorted multi-dict instance.
+
+        Optional iterable argument provides an initial sequence of pairs to
+        initialize the sorted multi-dict. Unlike sorted dict, a key seen
+        more than once keeps all of its values, in the order they appear.
+
+        >>> smd = SortedMultiDict([(2, 'b'), (1, 'a'), (2, 'c')])
+        >>> list(smd.items())
+        [(1, 'a'), (2, 'b'), (2, 'c')]
+
+        """
+        self._dict = {}
+        self._list = SortedList()
+        self._len = 0
+
+        _list = self._list
+        self.bisect_left = _list.bisect_left
+        self.bisect = _list.bisect_right
+        self.bisect_right = _list.bisect_right
+        self.irange = _list.irange
+
+        if iterable is not None:
+            self.update(iterable)
+
+
+    def __len__(self):
+        """Return the number of values in the sorted multi-dict.
+
+        ``smd.__len__()`` <==> ``len(smd)``
+
+        """
+        return self._len
+
+
+    def __contains__(self, key):
+        """Return true if `key` has at least one value.
+
+        ``smd.__contains__(key)`` <==> ``key in smd``
+
+        """
+        return key in self._dict
+
+
+    def __iter__(self):
+        """Return an iterator over the keys of the sorted multi-dict; a key
+        is repeated for each of its values.
+
+        ``smd.__iter__()`` <==> ``iter(smd)``
+
+        """
+        _dict = self._dict
+        for key in self._list:
+            for _ in range(len(_dict[key])):
+                yield key
+
+
+    def keys(self):
+        """Return an iterator over the distinct keys in sorted order."""
+        return iter(self._list)
+
+
+    def values(self):
+        """Return an iterator over the values, sorted by key."""
+        _dict = self._dict
+        return (value for key in self._list for value in _dict[key])
+
+
+    def items(self):
+        """Return an iterator over the ``(key, value)`` pairs, sorted by
+        key."""
+        _dict = self._dict
+        return ((key, value) for key in self._list for value in _dict[key])
+
+
+    def clear(self):
+        """Remove all items from the sorted multi-dict.
+
+        Runtime complexity: `O(n)`
+
+        """
+        self._dict.clear()
+        self._list.clear()
+        self._len = 0
+
+
+    def add(self, key, value):
+        """Add `value` under `key`, after the values already stored under
+        the same key.
+
+        Runtime complexity: `O(log(n))` -- approximate; `O(1)` if the key
+        is already present.
+
+        >>> smd = SortedMultiDict()
+        >>> smd.add(1, 'a')
+        >>> smd.add(1, 'b')
+        >>> smd.getall(1)
+        ['a', 'b']
+
+        :param key: key for item
+        :param value: value for item
+
+        """
+        values = self._dict.get(key)
+        if values is None:
+            values = self._dict[key] = _MultiValues()
+            self._list.add(key)
+        values.append(value)
+        self._len += 1
+
+
+    def update(self, iterable):
+        """Add all ``(key, value)`` pairs from `iterable`.
+
+        :param iterable: iterable of pairs
+
+        """
+        _dict = self._dict
+        newkeys = []
+        n = 0
+        for key, value in iterable:
+            values = _dict.get(key)
+            if values is None:
+                values = _dict[key] = _MultiValues()
+                newkeys.append(key)
+            values.append(value)
+            n += 1
+        self._list.update(newkeys)
+        self._len += n
+
+
+    def getall(self, key):
+        """Return the list of values stored under `key` (in the order they
+        have been added), or an empty list if there is none.
+
+        Runtime complexity: `O(k)`, where k is the number of values
+
+        """
+        values = self._dict.get(key)
+        return list(values) if values is not None else []
+
+
+    def count(self, key):
+        """Return the number of values stored under `key`."""
+        values = self._dict.get(key)
+        return len(values) if values is not None else 0
+
+
+    def remove(self, key, value):
+        """Remove the first occurrence of `value` stored under `key`.
+
+        Runtime complexity: `O(log(n))` -- approximate; `O(1)` if the key
+        keeps other values; plus `O(k)`, where k is the number of values
+        under the key, if `value` is unhashable
+
+        >>> smd = SortedMultiDict([(1, 'a'), (1, 'b'), (2, 'c')])
+        >>> smd.remove(1, 'a')
+        >>> list(smd.items())
+        [(1, 'b'), (2, 'c')]
+        >>> smd.remove(1, 'z')
+        Traceback (most recent call last):
+          ...
+        ValueError: (1, 'z')
+
+        :param key: key for item
+        :param value: value to be removed
+        :raises KeyError: if `key` not found
+        :raises ValueError: if `value` not found under `key`
+
+        """
+        values = self._dict[key]
+        try:
+            values.remove(value)
+        except ValueError:
+            raise ValueError((key, value)) from None
+        self._len -= 1
+        if not values:
+            del self._dict[key]
+            self._list.remove(key)
+
+
+    def discard(self, key, value):
+        """Remove the first occurrence of `value` stored under `key`, if
+        it's present; return true if it has been removed.
+
+        Runtime complexity: the same as :func:`SortedMultiDict.remove`
+
+        """
+        try:
+            self.remove(key, value)
+        except (KeyError, ValueError):
+            return False
+        return True
+
+
+    def peekitem(self, index=0):
+        """Return the ``(key, value)`` pair at `index`, which is either 0 (the
+        first value of the smallest key) or -1 (the last value of the
+        largest key).
+
+        Runtime complexity: `O(log(n))`
+
+        :param int index: 0 (the default) or -1
+        :return: key and value pair
+        :raises IndexError: if sorted multi-dict is empty
+
+        """
+        key = self._list[index]
+        values = self._dict[key]
+        return key, (values.first() if index == 0 else values.last())
+
+
+    def popitem(self, index=0):
+        """Remove and return the ``(key, value)`` pair at `index`, which is
+        either 0 (the first value of the smallest key) or -1 (the last value
+        of the largest key).
+
+        Runtime complexity: `O(log(n))`
+
+        >>> smd = SortedMultiDict([(1, 'a'), (1, 'b'), (2, 'c')])
+        >>> smd.popitem()
+        (1, 'a')
+        >>> smd.popitem(-1)
+        (2, 'c')
+
+        :param int index: 0 (the default) or -1
+        :return: key and value pair
+        :raises KeyError: if sorted multi-dict is empty
+
+        """
+        if not self._len:
+            raise KeyError('popitem(): dictionary is empty')
+        if index not in (0, -1):
+            raise IndexError('popitem(): index must be 0 or -1')
+        key = self._list[index]
+        values = self._dict[key]
+        value = values.popleft() if index == 0 else values.pop()
+        self._len -= 1
+        if not values:
+            del self._dict[key]
+            self._list.pop(index)
+        return key, value
+
+
+    def popall(self, key=None):
+        """Remove and return all values stored under `key` (in the order they
+        have been added); if `key` is not given, the smallest key is used,
+        e.g., to retrieve all simultaneous events at once.
+
+        Runtime complexity: `O(log(n)+k)`, where k is the number of values
+        under the key
+
+        >>> smd = SortedMultiDict([(2, 'c'), (1, 'a'), (1, 'b')])
+        >>> smd.popall()
+        ['a', 'b']
+        >>> smd.popall(2)
+        ['c']
+
+        :param key: key for items (default the smallest key)
+        :return: list of values
+        :raises KeyError: if `key` not found, or sorted multi-dict is empty
+
+        """
+        if key is None:
+            if not self._len:
+                raise KeyError('popall(): dictionary is empty')
+            key = self._list.pop(0)
+            values = self._dict.pop(key)
+        else:
+            values = self._dict.pop(key)
+            self._list.remove(key)
+        self._len -= len(values)
+        return list(values)
+
+
+    def copy(self):
+        """Return a shallow copy of the sorted multi-dict.
+
+        Runtime complexity: `O(n)`
+
+        """
+        return self.__class__(self.items())
+
+
+    __copy__ = copy
+
+
+    def __reduce__(self):
+        return (type(self), (list(self.items()),))
+
+
+    @recursive_repr()
+    def __repr__(self):
+        """Return string representation of sorted multi-dict.
+
+        ``smd.__repr__()`` <==> ``repr(smd)``
+
+        """
+        items = ', '.join('({0!r}, {1!r})'.format(key, value)
+                          for key, value in self.items())
+        return '{0}([{1}])'.format(type(self).__name__, items)
+
+
+    def _check(self):
+        """Check invariants of sorted multi-dict.
+
+        Runtime complexity: `O(n)`
+
+        """
+        _list = self._list
+        _list._check()
+        assert len(self._dict) == len(_list)
+        assert all(self._dict[key] for key in _list)
+        assert self._len == sum(len(values) for values in self._dict.values())
+        for values in self._dict.values():
+            values._check()
+
+
+class CompactSortedDict(MutableMapping):
+    """Compact sorted dict is a sorted mutable mapping without a hash table.
+
+    Sorted dict stores each key twice, in the inherited dict and in the
+    sorted list of keys. Compact sorted dict instead keeps the keys and the
+    values in parallel sorted sublists (as in the sorted list, each sublist
+    holds up to twice the load factor of items), and looks up a key by
+    bisection rather than hashing. If `typecode` is given (e.g., 'd' for
+    float keys, such as the simulation time), the keys are stored in
+    arrays of that type, which takes 8 bytes per key rather than a
+    reference to a float object.
+
+    Compact sorted dict has the same public methods as sorted dict, except
+    that it does not take a key-function; keys need not be hashable, only
+    comparable. Lookup, insertion and removal of a key take O(log(n)) time
+    for the search, plus the time for shifting the items within a sublist.
+    Positional access (other than the first and last items) takes O(n/m)
+    time, where m is the load factor, since there is no positional index.
+
+    """
+    DEFAULT_LOAD_FACTOR = 1000
+
+    def __init__(self, *args, typecode=None, **kwargs):
+        """Initialize compact sorted dict instance.
+
+        Optional arguments are a mapping, an iterable of pairs, or keyword
+        arguments, like for dict.
+
+        >>> csd = CompactSortedDict({'b': 2, 'a': 1})
+        >>> csd
+        CompactSortedDict({'a': 1, 'b': 2})
+        >>> csd = CompactSortedDict([(2.0, 'b'), (1.0, 'a')], typecode='d')
+        >>> list(csd.items())
+        [(1.0, 'a'), (2.0, 'b')]
+
+        """
+        self._typecode = typecode
+        self._load = self.DEFAULT_LOAD_FACTOR
+        self._keys = [] # sublists of keys
+        self._vals = [] # sublists of values, parallel to the keys
+        self._maxes = [] # the last key of each sublist
+        self._len = 0
+        self.update(*args, **kwargs)
+
+
+    def _newkeys(self, keys):
+        """Return a sublist of keys."""
+        if self._typecode is None:
+            return list(keys)
+        return array(self._typecode, keys)
+
+
+    def _reset(self, load):
+        """Reset the load factor and rebuild the sublists.
+
+        Runtime complexity: `O(n)`
+
+        """
+        items = list(self.items())
+        self._load = load
+        self._build(items)
+
+
+    def _build(self, items):
+        """Build the sublists from the sorted list of distinct items."""
+        load = self._load
+        self._keys = [self._newkeys(key for key, _ in items[i:i+load])
+                      for i in range(0, len(items), load)]
+        self._vals = [[value for _, value in items[i:i+load]]
+                      for i in range(0, len(items), load)]
+        self._maxes = [keys[-1] for keys in self._keys]
+        self._len = len(items)
+
+
+    def __len__(self):
+        return self._len
+
+
+    def __getitem__(self, key):
+        """Return the value for `key`.
+
+        Runtime complexity: `O(log(n))`
+
+        """
+        maxes = self._maxes
+        pos = bisect_left(maxes, key)
+        if pos < len(maxes):
+            keys = self._keys[pos]
+            idx = bisect_left(keys, key)
+            if keys[idx] == key:
+                return self._vals[pos][idx]
+        raise KeyError(key)
+
+
+    def __contains__(self, key):
+        maxes = self._maxes
+        pos = bisect_left(maxes, key)
+        if pos < len(maxes):
+            keys = self._keys[pos]
+            return keys[bisect_left(keys, key)] == key
+        return False
+
+
+    def __setitem__(self, key, value):
+        """Store item with `key` and `value`.
+
+        Runtime complexity: `O(log(n))` -- approximate.
+
+        """
+        maxes = self._maxes
+        if not maxes:
+            self._keys.append(self._newkeys((key,)))
+            self._vals.append([value])
+            maxes.append(key)
+            self._len = 1
+            return
+
+        pos = bisect_left(maxes, key)
+        if pos == len(maxes):
+            pos -= 1
+            self._keys[pos].append(key)
+            self._vals[pos].append(value)
+            maxes[pos] = key
+        else:
+            keys = self._keys[pos]
+            idx = bisect_left(keys, key)
+            if keys[idx] == key:
+                self._vals[pos][idx] = value
+                return
+            keys.insert(idx, key)
+            self._vals[pos].insert(idx, value)
+        self._len += 1
+        if len(self._keys[pos]) > (self._load << 1):
+            self._expand(pos)
+
+
+    def _expand(self, pos):
+        """Split the sublist at `pos` in half."""
+        half = len(self._keys[pos]) >> 1
+        keys = self._keys[pos]
+        vals = self._vals[pos]
+        self._keys.insert(pos+1, keys[half:])
+        self._vals.insert(pos+1, vals[half:])
+        del keys[half:]
+        del vals[half:]
+        self._maxes.insert(pos, keys[-1])
+
+
+    def __delitem__(self, key):
+        """Remove item identified by `key`.
+
+        Runtime complexity: `O(log(n))` -- approximate.
+
+        """
+        maxes = self._maxes
+        pos = bisect_left(maxes, key)
+        if pos < len(maxes):
+            keys = self._keys[pos]
+            idx = bisect_left(keys, key)
+            if keys[idx] == key:
+                self._delete(pos, idx)
+                return
+        raise KeyError(key)
+
+
+    def _delete(self, pos, idx):
+        """Delete the item at `(pos, idx)`, and merge the sublist with a
+        neighbor if it becomes less than half loaded."""
+        keys = self._keys[pos]
+        del keys[idx]
+        del self._vals[pos][idx]
+        self._len -= 1
+        if len(keys) > (self._load >> 1) or len(self._keys) == 1:
+            if keys:
+                self._maxes[pos] = keys[-1]
+            else:
+                del self._keys[pos]
+                del self._vals[pos]
+                del self._maxes[pos]
+        else:
+            if not pos:
+                pos += 1
+            prev = pos-1
+            self._keys[prev].extend(self._keys[pos])
+            self._vals[prev].extend(self._vals[pos])
+            self._maxes[prev] = self._keys[prev][-1]
+            del self._keys[pos]
+            del self._vals[pos]
+            del self._maxes[pos]
+            if len(self._keys[prev]) > (self._load << 1):
+                self._expand(prev)
+
+
+    def __iter__(self):
+        return chain.from_iterable(self._keys)
+
+
+    def __reversed__(self):
+        return (key for keys in reversed(self._keys) for key in reversed(keys))
+
+
+    def _pos(self, index):
+        """Return `(pos, idx)` of the item at `index`."""
+        n = self._len
+        if index < 0:
+            index += n
+        if not 0 <= index < n:
+            raise IndexError('list index out of range')
+        if index >= n-len(self._keys[-1]):
+            return len(self._keys)-1, index-(n-len(self._keys[-1]))
+        for pos, keys in enumerate(self._keys):
+            if index < len(keys):
+                return pos, index
+            index -= len(keys)
+
+
+    def _offset(self, pos):
+        """Return the index of the first item of the sublist at `pos`."""
+        return sum(len(keys) for keys in self._keys[:pos])
+
+
+    def bisect_left(self, key):
+        """Return the index at which `key` would be inserted (before any
+        equal key)."""
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos)+bisect_left(self._keys[pos], key)
+
+
+    def bisect_right(self, key):
+        """Return the index at which `key` would be inserted (after any
+        equal key)."""
+        pos = bisect_right(self._maxes, key)
+        if pos == len(self._maxes):
+            return self._len
+        return self._offset(pos)+bisect_right(self._keys[pos], key)
+
+    bisect = bisect_right
+
+
+    def index(self, key):
+        """Return the index of `key`; raise ValueError if not found."""
+        if key not in self:
+            raise ValueError('{0!r} is not in dict'.format(key))
+        return self.bisect_left(key)
+
+
+    def irange(self, minimum=None, maximum=None, inclusive=(True, True),
+               reverse=False):
+        """Return an iterator over the keys in the range from `minimum` to
+        `maximum`, like :func:`SortedList.irange`."""
+        start = 0 if minimum is None else \
+            (self.bisect_left if inclusive[0] else self.bisect_right)(minimum)
+        stop = self._len if maximum is None else \
+            (self.bisect_right if inclusive[1] else self.bisect_left)(maximum)
+        return self.islice(start, stop, reverse)
+
+
+    def islice(self, start=None, stop=None, reverse=False):
+        """Return an iterator over the keys from index `start` to `stop`."""
+        start, stop, _ = slice(start, stop).indices(self._len)
+        keys = self._slice(start, stop)[0]
+        return reversed(keys) if reverse else iter(keys)
+
+
+    def _slice(self, start, stop):
+        """Return the lists of keys and values from index `start` to
+        `stop`."""
+        keys = []
+        vals = []
+        offset = 0
+        for k, v in zip(self._keys, self._vals):
+            n = len(k)
+            if offset+n > start and offset < stop:
+                keys.extend(k[max(start-offset, 0):stop-offset])
+                vals.extend(v[max(start-offset, 0):stop-offset])
+            offset += n
+            if offset >= stop:
+                break
+        return keys, vals
+
+
+    def clear(self):
+        """Remove all items.
+
+        Runtime complexity: `O(n)`
+
+        """
+        self._keys = []
+        self._vals = []
+        self._maxes = []
+        self._len = 0
+
+
+    class _NotGiven(object):
+        # pylint: disable=too-few-public-methods
+        def __repr__(self):
+            return '<not-given>'
+
+    __not_given = _NotGiven()
+
+    def pop(self, key, default=__not_given):
+        """Remove and return value for item identified by `key`; return
+        `default` if given and `key` is not found, otherwise raise
+        :exc:`KeyError`.
+
+        Runtime complexity: `O(log(n))` -- approximate.
+
+        """
+        maxes = self._maxes
+        pos = bisect_left(maxes, key)
+        if pos < len(maxes):
+            keys = self._keys[pos]
+            idx = bisect_left(keys, key)
+            if keys[idx] == key:
+                value = self._vals[pos][idx]
+                self._delete(pos, idx)
+                return value
+        if default is self.__not_given:
+            raise KeyError(key)
+        return default
+
+
+    def popitem(self, index=-1):
+        """Remove and return ``(key, value)`` pair at `index`.
+
+        Runtime complexity: `O(log(n))` for the first and the last items,
+        `O(n/m)` otherwise.
+
+        >>> csd = CompactSortedDict({'a': 1, 'b': 2, 'c': 3})
+        >>> csd.popitem()
+        ('c', 3)
+        >>> csd.popitem(0)
+        ('a', 1)
+
+        :raises KeyError: if compact sorted dict is empty
+        :raises IndexError: if `index` out of range
+
+        """
+        if not self._len:
+            raise KeyError('popitem(): dictionary is empty')
+        pos, idx = self._pos(index)
+        item = (self._keys[pos][idx], self._vals[pos][idx])
+        self._delete(pos, idx)
+        return item
+
+
+    def peekitem(self, index=-1):
+        """Return ``(key, value)`` pair at `index`.
+
+        Runtime complexity: `O(1)` for the first and the last items, `O(n/m)`
+        otherwise.
+
+        :raises IndexError: if `index` out of range
+
+        """
+        pos, idx = self._pos(index)
+        return self._keys[pos][idx], self._vals[pos][idx]
+
+
+    def setdefault(self, key, default=None):
+        """Return value for `key`; insert `key` with value `default` first if
+        it's not in the dict."""
+        try:
+            return self[key]
+        except KeyError:
+            self[key] = default
+            return default
+
+
+    def update(self, *args, **kwargs):
+        """Update compact sorted dict with items from `args` and `kwargs`.
+
+        Overwrites existing items. If the dict is empty, or the new items
+        are many, the sublists are rebuilt from the sorted items.
+
+        """
+        if not args and not kwargs:
+            return
+        pairs = dict(*args, **kwargs)
+        if not self._len or 10*len(pairs) > self._len:
+            items = dict(zip(self, chain.from_iterable(self._vals)))
+            items.update(pairs)
+            self._build(sorted(items.items()))
+        else:
+            for key in pairs:
+                self[key] = pairs[key]
+
+
+    @classmethod
+    def from_sorted(cls, items, typecode=None, check=True):
+        """Return a new compact sorted dict built in linear time from
+        `items` in sorted order; see :func:`SortedDict.from_sorted`."""
+        csd = cls(typecode=typecode)
+        csd.merge_sorted(items, check)
+        return csd
+
+
+    def merge_sorted(self, items, check=True):
+        """Merge `items` in sorted order into compact sorted dict; see
+        :func:`SortedDict.merge_sorted`.
+
+        Runtime complexity: `O(n+k)`; `O(k*log(n))` if `k` is small
+        relative to `n`.
+
+        """
+        if not isinstance(items, list):
+            items = list(items)
+        if not items:
+            return
+        if check and not all(a[0] < b[0] for a, b in zip(items, islice(items, 1, None))):
+            self.update(items)
+            return
+
+        maxes = self._maxes
+        if not maxes:
+            self._build(items)
+        elif items[0][0] > maxes[-1]:
+            # the new items come after all existing ones
+            keys = self._keys.pop()
+            vals = self._vals.pop()
+            maxes.pop()
+            self._len -= len(keys)
+            keys.extend(key for key, _ in items)
+            vals.extend(value for _, value in items)
+            load = self._load
+            for pos in range(0, len(keys), load):
+                self._keys.append(keys[pos:pos+load])
+                self._vals.append(vals[pos:pos+load])
+                maxes.append(self._keys[-1][-1])
+            self._len += len(keys)
+        elif 4*len(items) < self._len:
+            for key, value in items:
+                self[key] = value
+        else:
+            old = list(self.items())
+            merged = []
+            i = 0
+            for item in items:
+                key = item[0]
+                while i < len(old) and old[i][0] < key:
+                    merged.append(old[i])
+                    i += 1
+                if i < len(old) and old[i][0] == key:
+                    i += 1 # overwritten
+                merged.append(item)
+            merged.extend(old[i:])
+            self._build(merged)
+
+
+    def _cut(self, minimum, maximum, inclusive):
+        """Remove the items in the given range and return the lists of their
+        keys and values; see :func:`SortedDict._cut`."""
+        start = 0 if minimum is None else \
+            (self.bisect_left if inclusive[0] else self.bisect_right)(minimum)
+        stop = self._len if maximum is None else \
+            (self.bisect_right if inclusive[1] else self.bisect_left)(maximum)
+        if start >= stop:
+            return [], []
+        if start == 0 and stop == self._len:
+            keys, vals = self._slice(0, self._len)
+            self.clear()
+            return keys, vals
+        (pos0, idx0), (pos1, idx1) = self._pos(start), self._pos(stop-1)
+        idx1 += 1
+        if pos0 == pos1:
+            keys = list(self._keys[pos0][idx0:idx1])
+            vals = self._vals[pos0][idx0:idx1]
+            del self._keys[pos0][idx0:idx1]
+            del self._vals[pos0][idx0:idx1]
+        else:
+            keys = list(self._keys[pos0][idx0:])
+            vals = self._vals[pos0][idx0:]
+            for pos in range(pos0+1, pos1):
+                keys.extend(self._keys[pos])
+                vals.extend(self._vals[pos])
+            keys.extend(self._keys[pos1][:idx1])
+            vals.extend(self._vals[pos1][:idx1])
+            del self._keys[pos0][idx0:]
+            del self._vals[pos0][idx0:]
+            del self._keys[pos1][:idx1]
+            del self._vals[pos1][:idx1]
+            del self._keys[pos0+1:pos1]
+            del self._vals[pos0+1:pos1]
+            del self._maxes[pos0+1:pos1]
+            pos1 = pos0+1
+
+        # merge and split the sublists at the two ends of the range
+        load = self._load
+        half = load >> 1
+        mkeys = self._newkeys(())
+        mvals = []
+        for pos in range(pos0, pos1+1):
+            mkeys.extend(self._keys[pos])
+            mvals.extend(self._vals[pos])
+        pos1 += 1
+        if len(mkeys) < half and pos1 < len(self._keys):
+            mkeys.extend(self._keys[pos1])
+            mvals.extend(self._vals[pos1])
+            pos1 += 1
+        if len(mkeys) < half and pos0 > 0:
+            pos0 -= 1
+            mkeys[:0] = self._keys[pos0]
+            mvals[:0] = self._vals[pos0]
+        m = len(mkeys)
+        n = -(-m//load)
+        self._keys[pos0:pos1] = [mkeys[m*i//n:m*(i+1)//n] for i in range(n)]
+        self._vals[pos0:pos1] = [mvals[m*i//n:m*(i+1)//n] for i in range(n)]
+        self._maxes[pos0:pos1] = [keys[-1] for keys in self._keys[pos0:pos0+n]]
+        self._len -= len(keys)
+        return keys, vals
+
+
+    def pop_range(self, minimum=None, maximum=None, inclusive=(True, True)):
+        """Remove and return the ``(key, value)`` pairs with keys in the range
+        from `minimum` to `maximum`; see :func:`SortedDict.pop_range`."""
+        keys, vals = self._cut(minimum, maximum, inclusive)
+        return list(zip(keys, vals))
+
+
+    def popitems_until(self, key, inclusive=False):
+        """Remove and return the ``(key, value)`` pairs with keys less than
+        `key`; see :func:`SortedDict.popitems_until`."""
+        return self.pop_range(None, key, (True, inclusive))
+
+
+    def del_range(self, minimum=None, maximum=None, inclusive=(True, True)):
+        """Remove the items with keys in the range from `minimum` to
+        `maximum`; see :func:`SortedDict.del_range`."""
+        self._cut(minimum, maximum, inclusive)
+
+
+    def keys(self):
+        """Return new sorted keys view of the compact sorted dict."""
+        return CompactSortedKeysView(self)
+
+
+    def items(self):
+        """Return new sorted items view of the compact sorted dict."""
+        return CompactSortedItemsView(self)
+
+
+    def values(self):
+        """Return new sorted values view of the compact sorted dict."""
+        return CompactSortedValuesView(self)
+
+
+    def copy(self):
+        """Return a shallow copy of the compact sorted dict.
+
+        Runtime complexity: `O(n)`
+
+        """
+        other = self.__class__(typecode=self._typecode)
+        other._load = self._load
+        other._keys = [keys[:] for keys in self._keys]
+        other._vals = [vals[:] for vals in self._vals]
+        other._maxes = self._maxes[:]
+        other._len = self._len
+        return other
+
+
+    __copy__ = copy
+
+
+    @classmethod
+    def fromkeys(cls, iterable, value=None):
+        """Return a new compact sorted dict with keys from `iterable` and
+        values equal to `value`."""
+        return cls((key, value) for key in iterable)
+
+
+    def __reduce__(self):
+        return (_compact_sorted_dict, (self._typecode, list(self.items())))
+
+
+    @recursive_repr()
+    def __repr__(self):
+        item_format = '{0!r}: {1!r}'.format
+        items = ', '.join(item_format(key, value) for key, value in self.items())
+        return '{0}({{{1}}})'.format(type(self).__name__, items)
+
+
+    def _check(self):
+        """Check invariants of compact sorted dict.
+
+        Runtime complexity: `O(n)`
+
+        """
+        assert len(self._keys) == len(self._vals) == len(self._maxes)
+        assert self._len == sum(len(keys) for keys in self._keys)
+        keys = list(self)
+        assert all(a < b for a, b in zip(keys, keys[1:]))
+        for pos, k in enumerate(self._keys):
+            assert len(k) == len(self._vals[pos])
+            assert self._maxes[pos] == k[-1]
+            assert len(k) <= (self._load << 1)
+            if pos < len(self._keys)-1:
+                assert len(k) >= (self._load >> 1)
+
+
+def _compact_sorted_dict(typecode, items):
+    """Recreate a compact sorted dict (for pickle)."""
+    return CompactSortedDict(items, typecode=typecode)
+
+
+class CompactSortedKeysView(KeysView, Sequence):
+    """Sorted keys view of a compact sorted dict."""
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        _mapping = self._mapping
+        if isinstance(index, slice):
+            return list(_mapping.islice(index.start, index.stop))[::index.step]
+        pos, idx = _mapping._pos(index)
+        return _mapping._keys[pos][idx]
+
+    def __iter__(self):
+        return iter(self._mapping)
+
+
+class CompactSortedItemsView(ItemsView, Sequence):
+    """Sorted items view of a compact sorted dict."""
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        _mapping = self._mapping
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(_mapping))
+            keys, vals = _mapping._slice(start, stop)
+            return list(zip(keys, vals))[::step]
+        pos, idx = _mapping._pos(index)
+        return _mapping._keys[pos][idx], _mapping._vals[pos][idx]
+
+    def __iter__(self):
+        _mapping = self._mapping
+        return zip(_mapping, chain.from_iterable(_mapping._vals))
+
+
+class CompactSortedValuesView(ValuesView, Sequence):
+    """Sorted values view of a compact sorted dict."""
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        _mapping = self._mapping
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(_mapping))
+            return _mapping._slice(start, stop)[1][::step]
+        pos, idx = _mapping._pos(index)
+        return _mapping._vals[pos][idx]
+
+    def __iter__(self):
+        return chain.from_iterable(self._mapping._vals)
+
+
 ###        SORTED DICT OPERATIONS            ###
 
 
@@ -894,14 +2300,23 @@ class SortedValuesView(ValuesView, Sequence):
 #sortedDict
 
 ### PQDict or Sorted Dict ends
+# the arguments of events and processes that have none are shared
+_empty_args = ()
+_empty_kwargs = MappingProxyType({})
+
 class _Event(Trappable):
     """The base class for all simulation events."""
 
+    # events use slots (rather than a per-instance dict) to keep the
+    # memory footprint of the pending events small
+    __slots__ = ('time', 'name', 'trap', '_entry', '__weakref__')
+
     def __init__(self, sim, time, name=None):
         super().__init__(sim)
         self.time = time
         self.name = name
         self.trap = None
+        self._entry = None # handle into the event list while pending
 
     def __str__(self):
         return "%g: evt=%s" % \
@@ -932,18 +2347,25 @@ class _Event(Trappable):
             return self.trap
         else:
             return self
+
+    def _fire(self):
+        # each event type carries out its action here, when the event
+        # is retrieved from the event list by the simulator
+        raise RuntimeError("unknown event type: " + str(self))
         
 class _DirectEvent(_Event):
     """The event type for direct event scheduling."""
 
+    __slots__ = ('func', 'repeat_intv', 'args', 'kwargs')
+
     #def __init__(self, sim, time, func, params, name, repeat_intv):
     def __init__(self, sim, time, func, name, repeat_intv, usr_args, usr_kwargs):
         super().__init__(sim, time, name)
         self.func = func
         #self.params = params
         self.repeat_intv = repeat_intv
-        self.args = usr_args
-        self.kwargs = usr_kwargs
+        self.args = usr_args if usr_args else _empty_args
+        self.kwargs = usr_kwargs if usr_kwargs else _empty_kwargs
 
     def __str__(self):
         return "%g: dir_evt=%s %s" % \
@@ -955,9 +2377,28 @@ class _DirectEvent(_Event):
         self.trap = None # trap cannot be reused
         return self
 
+    def _fire(self):
+        if self.repeat_intv is not None:
+            # note that a renewed event is not trappable
+            sim = self._sim
+            self.renew(self.time+self.repeat_intv)
+            #log.debug("[r%d] simulator '%s' schedule repeated event at time=%g from now=%g" %
+            #          (sim._simulus.comm_rank, sim.name[-4:], self.time, sim.now))
+            sim._runtime["scheduled_events"] += 1
+            sim._eventlist.insert(self)
+            if sim._hooks is not None:
+                sim._notify("on_event_scheduled", self)
+        if self.kwargs is _empty_kwargs:
+            # unpacking even an empty mapping would create a dict
+            self.func(*self.args)
+        else:
+            self.func(*self.args, **self.kwargs)
+
 class _ProcessEvent(_Event):
     """The event type for process scheduling."""
 
+    __slots__ = ('proc',)
+
     def __init__(self, sim, time, proc, name):
         #print("process event called")
         super().__init__(sim, time, name)
@@ -967,99 +2408,466 @@ class _ProcessEvent(_Event):
         return "%g: prc_evt=%s" % \
             (self.time, self.name if self.name else self.proc.func.__name__+'()')
 
-# Modified Event List for SDICT
-class _EventList_(object):
-    """An event list sorts events in timestamp order.
+    def _fire(self):
+        self.proc.activate()
+
+class _NowEntry(object):
+    """The handle of an immediate event (see _EventListBase_)."""
+
+    __slots__ = ('evt',)
+
+class _EventListBase_(object):
+    """The base class for all event lists.
+
     An event list is a priority queue that stores and sorts simulation
-    events based on the time of the events. It supports three basic
-    operations: to insert a (future) event, to peek and to retrieve
-    the event with the minimal timestamp.
+    events in timestamp order; simultaneous events are retrieved in
+    the order they have been inserted. This class defines the
+    interface that all event lists must implement, so that each
+    simulator can use the data structure that best fits the access
+    pattern of its model:
+
+    * insert(evt): add a (future) event to the event list
+    * insert_many(evts): add a batch of (future) events at once
+    * get_min(): return the time of the earliest event
+    * delete_min(): remove and return the earliest event
+    * delete_min_before(upper): remove and return the earliest event if
+      it's earlier than 'upper' (otherwise, return None)
+    * cancel(evt): remove a pending event from the event list
+    * update(evt): move a pending event whose time has been changed
+    * current_event(evt): check whether the event is still pending
+    * __len__(): return the number of pending events
+    * __iter__(): iterate over the pending events (in no particular order)
+    * ordered(): iterate over the pending events in the order they will
+      be retrieved, as (time, evt) pairs
+    * page(start, limit): return a list of the pending events in order,
+      from the given position
+    * snapshot(): return a copy-on-write snapshot of the pending events
+
+    Events scheduled at the current time (i.e., at 'last', see below)
+    are handled by this class: they are appended to a FIFO queue of
+    immediate events, which takes O(1) time. The immediate events are
+    retrieved after the events on the main event list at the same
+    time (which must have been inserted earlier). All other events
+    are passed on to the subclass, which implements the main event
+    list with the methods _insert(), _insert_many(), _get_min(),
+    _delete_min(), _cancel(), _update() and _iter(), the counterparts
+    of the methods above. A subclass may also implement _ordered() to
+    iterate over its events in order without sorting them all, and
+    _delete_min_before() to find and remove the earliest event at
+    once.
+
+    Cancelled (or rescheduled) events can be removed lazily: the
+    entry of the event is flagged as a "tombstone" and skipped when it
+    comes to the front of the event list. The event list is compacted
+    (i.e., all tombstones are removed at once) when the tombstones
+    exceed the given fraction 'compact_ratio' of all entries. Both
+    cancel() and update() return True if a tombstone has been left
+    behind.
+
+    While an event is pending, the event list keeps a handle in the
+    event's '_entry' attribute (for example, the event's entry in a
+    heap, or its key in a sorted dict), with which the event can be
+    found directly for cancellation and rescheduling. The handle is
+    reset to None once the event is retrieved or cancelled.
+
+    An event list also keeps 'last', which is the time of the most
+    recently retrieved event (or the time to which the simulator has
+    advanced); no events can be inserted earlier than that.
+
+    A snapshot shares the event list until the event list is about to
+    change (i.e., an event is inserted, retrieved, cancelled or
+    rescheduled); only then are the pending events copied to the
+    snapshot (unsorted, in O(n) time, along with their handles), which
+    sorts them when it's read.
+
     """
-## SDICT has key = event's time, value as the corresponding object of the event class itself
-    def __init__(self):
-        #self.pqueue = []
-        self.sd = SortedDict()
+
+    def __init__(self, lazy=True, compact_ratio=0.5):
+        self.size = 0 # number of pending events on the main event list
+        self.seq = count()
         self.last = minus_infinite_time
+        self.lazy = lazy
+        self.compact_ratio = compact_ratio
+        self.tombstones = 0 # number of tombstones currently held
+        self.compactions = 0
+        self.nowq = deque() # queue of immediate events
+        self.nnow = 0 # number of immediate events
+        self._snaps = [] # weak references to the shared snapshots
 
     def __len__(self):
-        return len(self.sd)
-        
+        return self.size+self.nnow
+
+    def __iter__(self):
+        yield from self._iter()
+        for entry in self.nowq:
+            if entry.evt is not None:
+                yield entry.evt
+
+    def ordered(self):
+        if self.nnow > 0:
+            now = [entry.evt for entry in self.nowq if entry.evt is not None]
+            return _merge_now(self._ordered(), self.last, now)
+        return self._ordered()
+
+    def page(self, start=0, limit=None):
+        stop = None if limit is None else start+limit
+        return [evt for _, evt in islice(self.ordered(), start, stop)]
+
+    def snapshot(self, now=None):
+        snap = _EventListSnapshot_(self, self.last if now is None else now)
+        self._snaps.append(weakref.ref(snap))
+        return snap
+
     def insert(self, evt):
-        #print('EL insert Called')
+        if self._snaps: self._detach()
+        if evt.time == self.last:
+            self._insert_now(evt)
+        else:
+            self._insert(evt)
+
+    def insert_many(self, evts):
+        if self._snaps: self._detach()
+        last = self.last
+        if any(evt.time == last for evt in evts):
+            later = []
+            for evt in evts:
+                if evt.time == last:
+                    self._insert_now(evt)
+                else:
+                    later.append(evt)
+            evts = later
+        self._insert_many(evts)
+
+    def get_min(self):
+        if self.nnow > 0:
+            # the main event list can't have an earlier event
+            return self._now_head().evt.time
+        return self._get_min()
+
+    def delete_min(self):
+        if self._snaps: self._detach()
+        if self.nnow > 0:
+            head = self._now_head()
+            # the events on the main event list at the same time have
+            # been inserted earlier, so they go first
+            if self.size == 0 or self._get_min() > head.evt.time:
+                self.nowq.popleft()
+                evt = head.evt
+                evt._entry = None
+                self.nnow -= 1
+                return evt
+        return self._delete_min()
+
+    def delete_min_before(self, upper):
+        # the simulator's main loop calls this method (rather than
+        # get_min() and delete_min()) for each event
+        if self.nnow > 0:
+            if self.last < upper:
+                return self.delete_min()
+            return None
+        if self.size > 0:
+            return self._delete_min_before(upper)
+        return None
+
+    def cancel(self, evt):
+        if self._snaps: self._detach()
+        entry = evt._entry
+        if type(entry) is _NowEntry:
+            entry.evt = None
+            evt._entry = None
+            self.nnow -= 1
+            if self.nnow == 0:
+                self.nowq.clear() # no tombstones left behind
+            return False
+        return self._cancel(evt)
+
+    def update(self, evt):
+        if self._snaps: self._detach()
+        entry = evt._entry
+        if entry is None:
+            raise ValueError("EventList.update(%s): event not found" % evt)
+        if type(entry) is _NowEntry:
+            if self.last > evt.time:
+                raise ValueError("EventList.update(%s): past event (last=%g)" %
+                                 (evt, self.last))
+            self.cancel(evt)
+            self.insert(evt)
+            return False
+        if evt.time == self.last:
+            buried = self._cancel(evt)
+            self._insert_now(evt)
+            return buried
+        return self._update(evt)
+
+    def current_event(self, evt):
+        # check whether the event is current
+        return evt._entry is not None
+
+    def _iter(self): return iter(())
+
+    def _ordered(self):
+        # subclasses may iterate over the events in order more efficiently
+        evts = list(self._iter())
+        return zip(*_sort_handles([evt._entry for evt in evts], evts))
+
+    def _insert(self, evt): pass
+
+    def _insert_many(self, evts):
+        # subclasses may load the events more efficiently in bulk
+        for evt in evts:
+            self._insert(evt)
+
+    def _get_min(self): pass
+    def _delete_min(self): pass
+
+    def _delete_min_before(self, upper):
+        # subclasses may find and remove the earliest event at once
+        if self._get_min() < upper:
+            if self._snaps: self._detach()
+            return self._delete_min()
+        return None
+    def _cancel(self, evt): pass
+    def _update(self, evt): pass
+    def _compact(self): pass
+
+    def _insert_now(self, evt):
+        """Append an event at the current time to the immediate events."""
+        entry = _NowEntry()
+        entry.evt = evt
+        self.nowq.append(entry)
+        evt._entry = entry
+        self.nnow += 1
+
+    def _now_head(self):
+        """Return the first immediate event (which must exist), after
+        discarding the cancelled ones in front."""
+        nowq = self.nowq
+        while nowq[0].evt is None:
+            nowq.popleft()
+        return nowq[0]
+
+    def _detach(self):
+        """Copy the pending events to the shared snapshots, which must
+        not see the changes about to be made to the event list."""
+        snaps = [snap for snap in (ref() for ref in self._snaps) if snap is not None]
+        self._snaps = []
+        if snaps:
+            self._freeze(snaps)
+
+    def _freeze(self, snaps):
+        """Copy the pending events to the given snapshots, along with the
+        time and the sequence number of their handles, which are
+        sorted when the snapshots are read (the handles themselves may
+        be reused for other events once the events are retrieved)."""
+        evts = list(self._iter())
+        handles = [evt._entry[:2] for evt in evts]
+        now = [entry.evt for entry in self.nowq if entry.evt is not None]
+        for snap in snaps:
+            snap._copied = (handles, evts, now)
+            snap._evlist = None
+
+    def _bury(self):
+        """Account for a new tombstone, and compact the event list if
+        there are too many of them; return True, so that cancel() and
+        update() can report the tombstone they have left behind."""
+        self.tombstones += 1
+        if self.size == 0 or self.tombstones > 32 and \
+           self.tombstones > self.compact_ratio*(self.size+self.tombstones):
+            self._compact()
+            self.tombstones = 0
+            self.compactions += 1
+        return True
+
+def _sort_handles(handles, evts):
+    """Sort the events by their handles, and return the lists of the
+    times and the events in order; a handle is either a list or a
+    tuple, which starts with the time and the sequence number of the
+    event."""
+    # sorting the positions by the sequence numbers and then by the
+    # times (the sort is stable) is much faster than comparing the
+    # handles, and it creates no objects for the garbage collector
+    times = list(map(itemgetter(0), handles))
+    seqs = list(map(itemgetter(1), handles))
+    order = sorted(range(len(evts)), key=seqs.__getitem__)
+    order.sort(key=times.__getitem__)
+    return [times[i] for i in order], [evts[i] for i in order]
+
+def _merge_now(pairs, last, now):
+    """Insert the immediate events (at time 'last') into the ordered
+    (time, evt) pairs, after the events at the same time."""
+    for t, evt in pairs:
+        if now is not None and t > last:
+            yield from ((last, x) for x in now)
+            now = None
+        yield t, evt
+    if now is not None:
+        yield from ((last, x) for x in now)
+
+class _EventListSnapshot_(object):
+    """A copy-on-write snapshot of the pending events on an event list.
+
+    The snapshot reads the event list directly until the event list
+    is about to change, at which time the pending events are copied
+    to the snapshot (see _EventListBase_). Either way, the snapshot
+    presents the events that were pending when it was taken, so that
+    they can be inspected at leisure while the simulation goes on.
+    Note that the events are the same objects as on the event list
+    (for example, a rescheduled event shows its new time), although
+    they are listed in the order of the times they had then.
+
+    """
+
+    def __init__(self, evlist, now):
+        self.now = now # the simulation time of the snapshot
+        self._last = evlist.last
+        self._len = len(evlist)
+        self._evlist = evlist # None once the events have been copied
+        self._copied = None # the copied handles, events and immediate events
+        self._evts = None # the copied events, sorted
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        if self._evlist is not None:
+            self._evlist._detach()
+        return iter(self._sorted())
+
+    def calendar(self, start=0, limit=100):
+        """Return a list of the events on the snapshot in order, at most
+        'limit' of them (or all if None) from position 'start'."""
+        if self._evlist is not None:
+            return self._evlist.page(start, limit)
+        stop = None if limit is None else start+limit
+        return self._sorted()[start:stop]
+
+    def _sorted(self):
+        if self._evts is None:
+            handles, evts, now = self._copied
+            times, evts = _sort_handles(handles, evts)
+            if now:
+                # the immediate events come after the events at the
+                # same time on the main event list
+                i = bisect_right(times, self._last)
+                evts[i:i] = now
+            self._evts = evts
+            self._copied = None
+        return self._evts
+
+# Modified Event List for SDICT
+class _EventList_(_EventListBase_):
+    """An event list implemented with a sorted dict.
+
+    The sorted dict is keyed by a (time, seq) pair, where seq is a
+    monotonically increasing insertion sequence number. Simultaneous
+    events therefore never collide on the same key, and they are
+    retrieved in the order they have been inserted (FIFO). The key
+    is also the handle kept by the event.
+
+    If 'lazy' is true, a cancelled event stays in the sorted dict with
+    its value set to None as a tombstone; otherwise, it is removed from
+    the sorted dict right away.
+
+    """
+
+    def __init__(self, lazy=True, compact_ratio=0.5):
+        super().__init__(lazy, compact_ratio)
+        self.sd = SortedDict()
+
+    def _iter(self):
+        return (evt for evt in self.sd.values() if evt is not None)
+
+    def _ordered(self):
+        return ((key[0], evt) for key, evt in self.sd.items() if evt is not None)
+
+    def _insert(self, evt):
         if self.last <= evt.time:
-            #heapq.heappush(self.pqueue, (evt.time, id(evt), evt))
-            self.sd.update({evt.time:evt})  # inserting a key-val pair into a dict
+            key = (evt.time, next(self.seq))
+            self.sd[key] = evt
+            evt._entry = key
+            self.size += 1
         else:
             raise ValueError("EventList.insert(%s): past event (last=%g)" %
                              (evt, self.last))
-        return
 
-    def get_min(self):                  #PEEK : topmost element of sdict     
-        #print('EL peek Called')
-        if len(self.sd) > 0:
-            #return self.pqueue[0][0] 
-            return self.sd.keys()[0]  # just return the time
+    def _insert_many(self, evts):
+        if len(evts) == 0: return
+        t = min(evt.time for evt in evts)
+        if self.last <= t:
+            seq = self.seq
+            pairs = [((evt.time, next(seq)), evt) for evt in evts]
+            for key, evt in pairs:
+                evt._entry = key
+            self.sd.merge_sorted(pairs)
+            self.size += len(pairs)
+        else:
+            raise ValueError("EventList.insert_many(): past event (time=%g, last=%g)" %
+                             (t, self.last))
+
+    def _get_min(self):
+        if self.size > 0:
+            sd = self.sd
+            key, evt = sd.peekitem(0)
+            while evt is None:
+                sd.popitem(0)
+                self.tombstones -= 1
+                key, evt = sd.peekitem(0)
+            return key[0] # just return the time
         else:
             raise IndexError("EventList.get_min() from empty list")
         
-    # for PQD it returns the second argument of PQD's popitem
-    #PQD's popitem's 2nd arg returns the pkey of heap[0], ie. the event having the most priority(least value of time)
-    # for a given key(eg: patient's name) dkey[key] = ki (key index)
-    # a ki's pkey gives the value of priority associated with the ki (and the corresp key)
-    def delete_min(self):
-        #print('EL delete_min Called')
-        if len(self.sd) > 0:
-            #assert self.last <= self.pqueue[0][0]
-            #self.last = self.pqueue[0][0]
-            #return heapq.heappop(self.pqueue)[-1]
-            
-            #PQDICT : x, e = self.pqueue.popitem() x = dkey, e = pkey
-            #sdict
-            #print('delete min called')
-            x = self.sd.popitem(0) # x is kv pair tuple
-            #print(type(x))
-            #k = x.keys()
-            assert self.last <= x[0]  # evt's time
-            self.last = x[0]
-            return x[1]  # return the event object itself
+    def _delete_min(self):
+        if self.size > 0:
+            sd = self.sd
+            key, evt = sd.popitem(0)
+            while evt is None:
+                self.tombstones -= 1
+                key, evt = sd.popitem(0)
+            evt._entry = None
+            self.size -= 1
+            if self.size == 0 and self.tombstones > 0:
+                self._compact()
+                self.tombstones = 0
+            assert self.last <= key[0]
+            self.last = key[0]
+            return evt
         else:
             raise IndexError("EventList.delete_min() from empty list")
 
-    def cancel(self, evt):
-        if evt.time not in self.sd.keys():
+    def _cancel(self, evt):
+        if evt._entry is None:
             raise ValueError("EventList.cancel(%s): event not found" % evt)
-        del self.sd[evt.time]
-        return
-# 3 attributes of event = time, name , trap
-# pass an event whose id matches with an event already present 
-# in the Sdict, but whose time is different!
-    def update(self, evt):                                # O(n)
-        #print('EL update Called')
-        #if evt.time not in self.sd.keys():
-        #    raise ValueError("EventList.update(%s): event not found" % evt)
-        idlist = []
-        for j in range(len(self.sd)):
-            idlist.append(id(self.sd.values()[j]))
-        
-        if id(evt) not in idlist:
+        key = evt._entry
+        evt._entry = None
+        self.size -= 1
+        if self.lazy:
+            self.sd[key] = None
+            return self._bury()
+        else:
+            del self.sd[key]
+            return False
+
+    def _update(self, evt):
+        # the event's time has been changed; we need to move it to the
+        # new place in the sorted dict
+        if evt._entry is None:
             raise ValueError("EventList.update(%s): event not found" % evt)
         if self.last <= evt.time:
-            # change the time of the event in the eventlist whose id
-            # is same as that of the evt in argument and
-            # insert the newly updated event at it correct place in the SDict
-            events = self.sd.values()  #tuple of events
-            for it in range(len(self.sd)):                     #here values can only be indexed
-                if id(evt) == id(events[it]):
-                    self.sd.pop(events[it].time)   #removed that event itself from the sdict
-                    self.sd.update({evt.time:evt})        #inserted a new kv pair in the sdict
-                    break
-            
+            if self.lazy:
+                self.sd[evt._entry] = None
+            else:
+                del self.sd[evt._entry]
+            key = (evt.time, next(self.seq))
+            self.sd[key] = evt
+            evt._entry = key
+            if self.lazy:
+                return self._bury()
+            return False
         else:
             raise ValueError("EventList.update(%s): past event (last=%g)" %
                              (evt, self.last))
-        return
 
-    def current_event(self, evt):
-        # check whether the event is current
-        #print('EL Current Even Called')
-        return evt.time in self.sd.keys()
+    def _compact(self):
+        """Remove all tombstones from the sorted dict."""
+        self.sd = SortedDict.from_sorted([(k, v) for k, v in self.sd.items()
+                                          if v is not None], check=False)
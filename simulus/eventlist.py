@@ -0,0 +1,1066 @@
+"""Alternative event lists."""
+
+import heapq, io, mmap, os, pickle, shutil, tempfile, weakref
+from itertools import chain, count
+from operator import itemgetter
+from types import FunctionType, BuiltinFunctionType
+
+from .event import *
+
+__all__ = ["_HeapEventList_", "_CalendarEventList_", "_WheelEventList_", "_EVENTLISTS", \
+           "_SpillEventList_"]
+
+def _walk_next(walk, heap):
+    """Return the next entry of a walk over the binary heap in sorted
+    order, without changing the heap; the walk is itself a heap of
+    (entry, position) of the entries yet to be visited, which starts
+    with the root of the heap."""
+    entry, j = walk[0]
+    j = 2*j+1
+    if j < len(heap):
+        heapq.heapreplace(walk, (heap[j], j))
+        if j+1 < len(heap):
+            heapq.heappush(walk, (heap[j+1], j+1))
+    else:
+        heapq.heappop(walk)
+    return entry
+
+class _HeapEventList_(_EventListBase_):
+    """An event list implemented as a binary heap.
+
+    Each event is stored in the heap as an entry [time, seq, evt],
+    where seq is the insertion sequence number to break ties among
+    simultaneous events. The heap supports O(log n) insertion and
+    deletion of the earliest event, and it uses much less memory than
+    the sorted dict.
+
+    The heap cannot remove an arbitrary entry efficiently, so the
+    cancellation is always lazy (the 'lazy' argument is ignored): an
+    event is cancelled by setting the event in its entry to None; the
+    tombstone is discarded when it reaches the top of the heap, or
+    when the heap is compacted.
+
+    The earliest event is retrieved the same way: its entry is left on
+    top of the heap as a tombstone. If an event is inserted next (for
+    example, a process goes back to sleep, or a periodic event is
+    renewed), the entry is reused for the new event and sifted down
+    in one step, like heapq.heapreplace(), which saves both a sift
+    and the allocation of an entry; otherwise, the tombstone is
+    popped when the next event is retrieved, which costs no more
+    than popping the entry right away.
+
+    """
+
+    def __init__(self, lazy=True, compact_ratio=0.5):
+        super().__init__(True, compact_ratio)
+        self.heap = []
+
+    def _iter(self):
+        return (entry[2] for entry in self.heap if entry[2] is not None)
+
+    def _ordered(self):
+        # the first k events take O(k*log(k)) time
+        heap = self.heap
+        walk = [(heap[0], 0)] if heap else []
+        while walk:
+            entry = _walk_next(walk, heap)
+            if entry[2] is not None:
+                yield entry[0], entry[2]
+
+    def _insert(self, evt):
+        if self.last <= evt.time:
+            heap = self.heap
+            if heap and heap[0][2] is None:
+                # replace the tombstone on top with the new event
+                entry = heap[0]
+                entry[0] = evt.time
+                entry[1] = next(self.seq)
+                entry[2] = evt
+                heapq.heapreplace(heap, entry)
+                self.tombstones -= 1
+            else:
+                entry = [evt.time, next(self.seq), evt]
+                heapq.heappush(heap, entry)
+            evt._entry = entry
+            self.size += 1
+        else:
+            raise ValueError("EventList.insert(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _insert_many(self, evts):
+        if len(evts) == 0: return
+        t = min(evt.time for evt in evts)
+        if self.last <= t:
+            seq = self.seq
+            entries = [[evt.time, next(seq), evt] for evt in evts]
+            for entry in entries:
+                entry[2]._entry = entry
+            heap = self.heap
+            if len(entries) > len(heap)>>3:
+                # it's cheaper to rebuild the heap in linear time
+                heap.extend(entries)
+                heapq.heapify(heap)
+            else:
+                for entry in entries:
+                    heapq.heappush(heap, entry)
+            self.size += len(entries)
+        else:
+            raise ValueError("EventList.insert_many(): past event (time=%g, last=%g)" %
+                             (t, self.last))
+
+    def _get_min(self):
+        if self.size > 0:
+            heap = self.heap
+            while heap[0][2] is None:
+                heapq.heappop(heap)
+                self.tombstones -= 1
+            return heap[0][0] # just return the time
+        else:
+            raise IndexError("EventList.get_min() from empty list")
+
+    def _delete_min(self):
+        if self.size > 0:
+            heap = self.heap
+            t, _, evt = heapq.heappop(heap)
+            while evt is None:
+                self.tombstones -= 1
+                t, _, evt = heapq.heappop(heap)
+            evt._entry = None
+            self.size -= 1
+            if self.size == 0 and self.tombstones > 0:
+                self._compact()
+                self.tombstones = 0
+            assert self.last <= t
+            self.last = t
+            return evt
+        else:
+            raise IndexError("EventList.delete_min() from empty list")
+
+    def _delete_min_before(self, upper):
+        heap = self.heap
+        while heap[0][2] is None:
+            heapq.heappop(heap)
+            self.tombstones -= 1
+        entry = heap[0]
+        if entry[0] >= upper:
+            return None
+        if self._snaps: self._detach()
+        # the entry stays on top as a tombstone for the next insertion
+        evt = entry[2]
+        entry[2] = None
+        self.tombstones += 1
+        evt._entry = None
+        self.size -= 1
+        if self.size == 0 and self.tombstones > 1:
+            self._compact()
+            self.tombstones = 0
+        self.last = entry[0]
+        return evt
+
+    def _cancel(self, evt):
+        entry = evt._entry
+        if entry is None:
+            raise ValueError("EventList.cancel(%s): event not found" % evt)
+        entry[2] = None
+        evt._entry = None
+        self.size -= 1
+        return self._bury()
+
+    def _update(self, evt):
+        # the event's time has been changed; we leave a tombstone
+        # behind and insert the event anew
+        if evt._entry is None:
+            raise ValueError("EventList.update(%s): event not found" % evt)
+        if self.last <= evt.time:
+            evt._entry[2] = None
+            entry = [evt.time, next(self.seq), evt]
+            heapq.heappush(self.heap, entry)
+            evt._entry = entry
+            return self._bury()
+        else:
+            raise ValueError("EventList.update(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _compact(self):
+        """Remove all tombstones and rebuild the heap."""
+        self.heap = [entry for entry in self.heap if entry[2] is not None]
+        heapq.heapify(self.heap)
+
+class _CalendarEventList_(_EventListBase_):
+    """An event list implemented as a calendar queue.
+
+    The calendar queue (R. Brown, "Calendar Queues: A Fast O(1)
+    Priority Queue Implementation for the Simulation Event Set
+    Problem", CACM 31(10), 1988) divides the time line into "days" of
+    equal width. The days are mapped to the buckets of the calendar
+    in a round-robin fashion, like the days of a year. To find the
+    earliest event, we visit the buckets starting from the current
+    day and take the first event that falls on the day being
+    visited. If a whole year passes without finding one, we search
+    all buckets directly.
+
+    The number of buckets is doubled (or halved) when the number of
+    events grows above twice (or shrinks below half) the number of
+    buckets. Each time the calendar is resized, the width of the days
+    is re-sampled from the earliest events, so that each day holds a
+    few events on average. Insertion and deletion therefore take O(1)
+    time amortized.
+
+    Each bucket is a small binary heap of [time, seq, evt] entries;
+    like the heap event list, the cancellation is always lazy: a
+    cancelled event leaves a tombstone behind, which is discarded
+    when it comes to the top of its bucket, or when the calendar is
+    compacted (i.e., rebuilt).
+
+    """
+
+    def __init__(self, lazy=True, compact_ratio=0.5, nbuckets=2, width=1.0):
+        super().__init__(True, compact_ratio)
+        self.nbuckets = nbuckets
+        self.width = width
+        self.buckets = [[] for _ in range(nbuckets)]
+        self.day = None # the current day (None if unknown)
+
+    def _iter(self):
+        return (entry[2] for b in self.buckets for entry in b if entry[2] is not None)
+
+    def _ordered(self):
+        # the buckets are visited day by day, like in _locate(), and
+        # the entries of each bucket are visited in sorted order,
+        # without changing the calendar
+        buckets = self.buckets
+        n = self.nbuckets
+        w = self.width
+        walks = [None]*n
+        def walk(i):
+            if walks[i] is None:
+                walks[i] = [(buckets[i][0], 0)] if buckets[i] else []
+            return walks[i]
+
+        left = sum(map(len, buckets)) # entries (including tombstones)
+        day = self.day
+        idle = 0 # number of days visited in a row with no entries
+        while left > 0:
+            if day is None or idle >= n:
+                # direct search for the earliest entry left
+                t = min(walk(i)[0][0][0] for i in range(n) if walk(i))
+                if t == infinite_time:
+                    # only events at infinity are left (in bucket 0)
+                    while walks[0]:
+                        entry = _walk_next(walks[0], buckets[0])
+                        if entry[2] is not None:
+                            yield entry[0], entry[2]
+                    return
+                day = int(t//w)
+                idle = 0
+            i = day%n
+            wk = walk(i)
+            if wk and wk[0][0][0]//w <= day:
+                idle = 0
+                while wk and wk[0][0][0]//w <= day:
+                    entry = _walk_next(wk, buckets[i])
+                    left -= 1
+                    if entry[2] is not None:
+                        yield entry[0], entry[2]
+            else:
+                idle += 1
+            day += 1
+
+    def _insert(self, evt):
+        if self.last <= evt.time:
+            entry = [evt.time, next(self.seq), evt]
+            self._enqueue(entry)
+            evt._entry = entry
+            self.size += 1
+            if self.size > 2*self.nbuckets:
+                self._resize(2*self.nbuckets)
+        else:
+            raise ValueError("EventList.insert(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _insert_many(self, evts):
+        if len(evts) == 0: return
+        t = min(evt.time for evt in evts)
+        if self.last <= t:
+            seq = self.seq
+            entries = [[evt.time, next(seq), evt] for evt in evts]
+            for entry in entries:
+                entry[2]._entry = entry
+            n = self.nbuckets
+            if self.size+len(entries) > 2*n or len(entries) > self.size>>3:
+                # it's cheaper to rebuild the calendar in linear time
+                # (with enough buckets for all events); the entries are
+                # placed in the buckets when the calendar is rebuilt
+                self.size += len(entries)
+                self.buckets[0].extend(entries)
+                while self.size > 2*n: n *= 2
+                self._resize(n)
+            else:
+                for entry in entries:
+                    self._enqueue(entry)
+                self.size += len(entries)
+        else:
+            raise ValueError("EventList.insert_many(): past event (time=%g, last=%g)" %
+                             (t, self.last))
+
+    def _get_min(self):
+        if self.size > 0:
+            return self._locate()[0][0] # just return the time
+        else:
+            raise IndexError("EventList.get_min() from empty list")
+
+    def _delete_min(self):
+        if self.size > 0:
+            return self._pop(self._locate())
+        else:
+            raise IndexError("EventList.delete_min() from empty list")
+
+    def _delete_min_before(self, upper):
+        b = self._locate()
+        if b[0][0] >= upper:
+            return None
+        if self._snaps: self._detach()
+        return self._pop(b)
+
+    def _pop(self, b):
+        """Remove and return the earliest event from the top of the given
+        bucket."""
+        t, _, evt = heapq.heappop(b)
+        evt._entry = None
+        self.size -= 1
+        if self.size == 0 and self.tombstones > 0:
+            self._compact()
+            self.tombstones = 0
+        assert self.last <= t
+        self.last = t
+        if self.size < self.nbuckets//2-2:
+            self._resize(self.nbuckets//2)
+        return evt
+
+    def _cancel(self, evt):
+        entry = evt._entry
+        if entry is None:
+            raise ValueError("EventList.cancel(%s): event not found" % evt)
+        entry[2] = None
+        evt._entry = None
+        self.size -= 1
+        return self._bury()
+
+    def _update(self, evt):
+        # the event's time has been changed; we leave a tombstone
+        # behind and insert the event anew
+        if evt._entry is None:
+            raise ValueError("EventList.update(%s): event not found" % evt)
+        if self.last <= evt.time:
+            evt._entry[2] = None
+            entry = [evt.time, next(self.seq), evt]
+            self._enqueue(entry)
+            evt._entry = entry
+            return self._bury()
+        else:
+            raise ValueError("EventList.update(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _enqueue(self, entry):
+        """Put the entry in the bucket of its day."""
+        t = entry[0]
+        if t < infinite_time:
+            d = int(t//self.width)
+            heapq.heappush(self.buckets[d%self.nbuckets], entry)
+            # the event may be earlier than the current day, if the
+            # search has gone ahead of the time of the last event
+            if self.day is not None and d < self.day:
+                self.day = d
+        else:
+            # events at infinity can only be found by direct search
+            heapq.heappush(self.buckets[0], entry)
+
+    def _locate(self):
+        """Return the bucket with the earliest event on top; the calendar
+        must not be empty."""
+
+        buckets = self.buckets
+        n = self.nbuckets
+        w = self.width
+
+        # visit the buckets for a year, starting from the current day
+        day = self.day
+        if day is not None:
+            for _ in range(n):
+                b = buckets[day%n]
+                while b and b[0][2] is None:
+                    heapq.heappop(b)
+                    self.tombstones -= 1
+                if b and b[0][0]//w <= day:
+                    self.day = day
+                    return b
+                day += 1
+
+        # direct search for the earliest event among all buckets
+        best = None
+        for b in buckets:
+            while b and b[0][2] is None:
+                heapq.heappop(b)
+                self.tombstones -= 1
+            if b and (best is None or b[0] < best[0]):
+                best = b
+        t = best[0][0]
+        self.day = int(t//w) if t < infinite_time else None
+        return best
+
+    def _resize(self, nbuckets):
+        """Rebuild the calendar with the given number of buckets; the width
+        of the days is re-sampled from the earliest events."""
+
+        entries = [entry for b in self.buckets for entry in b if entry[2] is not None]
+
+        # the new width is three times the average separation between
+        # the earliest events (after discarding the large separations)
+        times = [entry[0] for entry in heapq.nsmallest(25, entries)
+                 if entry[0] < infinite_time]
+        if len(times) > 1:
+            seps = [b-a for a, b in zip(times, times[1:])]
+            avg = sum(seps)/len(seps)
+            seps = [x for x in seps if x <= 2*avg]
+            avg = sum(seps)/len(seps)
+            if avg > 0: self.width = 3*avg
+
+        self.nbuckets = nbuckets
+        self.buckets = [[] for _ in range(nbuckets)]
+        self.day = None
+        self.tombstones = 0
+        w = self.width
+        for entry in entries:
+            t = entry[0]
+            if t < infinite_time:
+                self.buckets[int(t//w)%nbuckets].append(entry)
+            else:
+                self.buckets[0].append(entry)
+        for b in self.buckets:
+            heapq.heapify(b)
+
+    def _compact(self):
+        """Remove all tombstones by rebuilding the calendar."""
+        self._resize(self.nbuckets)
+
+class _WheelEventList_(_EventListBase_):
+    """An event list implemented as a hierarchical timing wheel.
+
+    The time line is divided into ticks of equal length (given by
+    'resolution'). The timing wheel consists of a number of levels,
+    each with 2**bits slots: a slot at level 0 holds the events of
+    one tick, a slot at level 1 holds the events of 2**bits ticks,
+    and so on. An event is placed at the lowest level at which its
+    tick falls in the same rotation as the current tick; events
+    beyond the horizon of the wheel (2**(bits*levels) ticks) are
+    kept in a binary heap.
+
+    Each slot is a dict of entries [time, seq, evt, level, slot]
+    keyed by seq, so that inserting and cancelling an event in the
+    near future (where timeouts and periodic events are usually
+    scheduled) take O(1) time; a cancelled event is removed from its
+    slot right away. When all events of the current tick have been
+    processed, the current tick advances to the next non-empty slot
+    at the lowest level; if the slot is at a higher level, its events
+    are moved down to the lower levels (cascaded).
+
+    The events of the current tick are kept in a binary heap, so that
+    the events are retrieved in timestamp order (and simultaneous
+    events in the order they have been inserted), even if they fall
+    on the same tick. The events in the two heaps (of the current
+    tick and beyond the horizon) are cancelled lazily, like in the
+    heap event list.
+
+    """
+
+    def __init__(self, lazy=True, compact_ratio=0.5, resolution=1.0, bits=6, levels=4):
+        super().__init__(True, compact_ratio)
+        self.resolution = resolution
+        self.bits = bits
+        self.mask = (1<<bits)-1
+        self.levels = levels
+        self.tick = 0 # the current tick
+        self.ready = [] # heap of entries at (or before) the current tick
+        self.wheels = [[{} for _ in range(1<<bits)] for _ in range(levels)]
+        self.counts = [0]*levels # number of entries at each level
+        self.far = [] # heap of entries beyond the horizon
+
+    def _iter(self):
+        entries = chain(self.ready, self.far,
+                        (entry for wheel in self.wheels for slot in wheel
+                         for entry in slot.values()))
+        return (entry[2] for entry in entries if entry[2] is not None)
+
+    def _ordered(self):
+        # the events of the current tick come first, then those in the
+        # slots after the current tick at each level in turn (only the
+        # events in each slot need to be sorted), then those beyond the
+        # horizon; the timing wheel is not changed
+        for heap in (self.ready, None, self.far):
+            if heap is None:
+                for lvl, wheel in enumerate(self.wheels):
+                    if self.counts[lvl] > 0:
+                        i = (self.tick>>(self.bits*lvl))&self.mask
+                        for slot in wheel[i:]:
+                            for entry in sorted(slot.values()):
+                                yield entry[0], entry[2]
+                continue
+            walk = [(heap[0], 0)] if heap else []
+            while walk:
+                entry = _walk_next(walk, heap)
+                if entry[2] is not None:
+                    yield entry[0], entry[2]
+
+    def _insert(self, evt):
+        if self.last <= evt.time:
+            entry = [evt.time, next(self.seq), evt, 0, None]
+            self._place(entry)
+            evt._entry = entry
+            self.size += 1
+        else:
+            raise ValueError("EventList.insert(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _insert_many(self, evts):
+        if len(evts) == 0: return
+        t = min(evt.time for evt in evts)
+        if self.last <= t:
+            seq = self.seq
+            for evt in evts:
+                entry = [evt.time, next(seq), evt, 0, None]
+                self._place(entry)
+                evt._entry = entry
+            self.size += len(evts)
+        else:
+            raise ValueError("EventList.insert_many(): past event (time=%g, last=%g)" %
+                             (t, self.last))
+
+    def _get_min(self):
+        if self.size > 0:
+            return self._locate()[0][0] # just return the time
+        else:
+            raise IndexError("EventList.get_min() from empty list")
+
+    def _delete_min(self):
+        if self.size > 0:
+            return self._pop(self._locate())
+        else:
+            raise IndexError("EventList.delete_min() from empty list")
+
+    def _delete_min_before(self, upper):
+        heap = self._locate()
+        if heap[0][0] >= upper:
+            return None
+        if self._snaps: self._detach()
+        return self._pop(heap)
+
+    def _pop(self, heap):
+        """Remove and return the earliest event from the top of the given
+        heap."""
+        t, _, evt, _, _ = heapq.heappop(heap)
+        evt._entry = None
+        self.size -= 1
+        if self.size == 0 and self.tombstones > 0:
+            self._compact()
+            self.tombstones = 0
+        assert self.last <= t
+        self.last = t
+        return evt
+
+    def _cancel(self, evt):
+        entry = evt._entry
+        if entry is None:
+            raise ValueError("EventList.cancel(%s): event not found" % evt)
+        evt._entry = None
+        self.size -= 1
+        return self._remove(entry)
+
+    def _update(self, evt):
+        # the event's time has been changed; we remove the old entry
+        # (or leave a tombstone behind) and insert the event anew
+        if evt._entry is None:
+            raise ValueError("EventList.update(%s): event not found" % evt)
+        if self.last <= evt.time:
+            buried = self._remove(evt._entry)
+            entry = [evt.time, next(self.seq), evt, 0, None]
+            self._place(entry)
+            evt._entry = entry
+            return buried
+        else:
+            raise ValueError("EventList.update(%s): past event (last=%g)" %
+                             (evt, self.last))
+
+    def _remove(self, entry):
+        """Remove the entry from its slot, or turn it into a tombstone if
+        it's in one of the heaps; return True in the latter case."""
+        slot = entry[4]
+        if slot is not None:
+            del slot[entry[1]]
+            self.counts[entry[3]] -= 1
+            entry[2] = None
+            return False
+        else:
+            entry[2] = None
+            return self._bury()
+
+    def _place(self, entry):
+        """Put the entry in the slot of its tick, or in one of the heaps."""
+        t = entry[0]
+        if t < infinite_time:
+            k = int(t//self.resolution)
+            cur = self.tick
+            if k <= cur:
+                entry[4] = None
+                heapq.heappush(self.ready, entry)
+                return
+            bits = self.bits
+            lvl = 0
+            for wheel in self.wheels:
+                if k>>bits == cur>>bits:
+                    slot = wheel[k&self.mask]
+                    slot[entry[1]] = entry
+                    entry[3] = lvl
+                    entry[4] = slot
+                    self.counts[lvl] += 1
+                    return
+                k >>= bits
+                cur >>= bits
+                lvl += 1
+        # beyond the horizon (or at infinity)
+        entry[4] = None
+        heapq.heappush(self.far, entry)
+
+    def _advance(self):
+        """Move the current tick to the next non-empty slot, and return
+        False if the timing wheel is empty."""
+
+        bits = self.bits
+        for lvl, wheel in enumerate(self.wheels):
+            if self.counts[lvl] > 0:
+                # all entries at this level are in the slots after
+                # that of the current tick
+                shift = bits*lvl
+                i = (self.tick>>shift)&self.mask
+                while not wheel[i]: i += 1
+                slot = wheel[i]
+                wheel[i] = {}
+                self.counts[lvl] -= len(slot)
+                self.tick = (self.tick>>(shift+bits)<<(shift+bits))|(i<<shift)
+                for entry in slot.values():
+                    self._place(entry)
+                return True
+
+        # the wheel is empty; the current tick jumps to the earliest
+        # far event, and the far events within the new horizon are
+        # brought into the wheel
+        far = self.far
+        while far and far[0][2] is None:
+            heapq.heappop(far)
+            self.tombstones -= 1
+        if not far or far[0][0] == infinite_time:
+            return False
+        w = self.resolution
+        shift = bits*self.levels
+        self.tick = int(far[0][0]//w)
+        horizon = self.tick>>shift
+        while far and far[0][0] < infinite_time and int(far[0][0]//w)>>shift == horizon:
+            entry = heapq.heappop(far)
+            if entry[2] is None:
+                self.tombstones -= 1
+            else:
+                self._place(entry)
+        return True
+
+    def _locate(self):
+        """Return the heap with the earliest event on top; the event list
+        must not be empty."""
+
+        ready = self.ready
+        while True:
+            while ready and ready[0][2] is None:
+                heapq.heappop(ready)
+                self.tombstones -= 1
+            if ready:
+                return ready
+            if not self._advance():
+                # only events at infinity are left
+                return self.far
+
+    def _compact(self):
+        """Remove all tombstones from the two heaps."""
+        self.ready = [entry for entry in self.ready if entry[2] is not None]
+        heapq.heapify(self.ready)
+        self.far = [entry for entry in self.far if entry[2] is not None]
+        heapq.heapify(self.far)
+
+# the event lists that can be selected by name when creating a simulator
+_EVENTLISTS = {
+    'heap': _HeapEventList_,
+    'calendar': _CalendarEventList_,
+    'sorteddict': _EventList_,
+    'wheel': _WheelEventList_,
+}
+
+class _SpillPickler(pickle.Pickler):
+    """Pickle the simulator as a reference, not by value."""
+
+    def __init__(self, file, sim):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.sim = sim
+
+    def persistent_id(self, obj):
+        return 'sim' if obj is self.sim else None
+
+class _SpillUnpickler(pickle.Unpickler):
+    """Resolve the reference to the simulator when unpickling."""
+
+    def __init__(self, file, sim):
+        super().__init__(file)
+        self.sim = sim
+
+    def persistent_load(self, pid):
+        if pid == 'sim':
+            return self.sim
+        raise pickle.UnpicklingError("unknown persistent id %r" % pid)
+
+class _SpillSegment(object):
+    """The spilled events of one time partition."""
+
+    __slots__ = ('part', 'path', 'buf', 'nbytes', 'count', 'held', 'cancelled')
+
+    def __init__(self, part, path):
+        self.part = part # the partition
+        self.path = path # the segment file
+        self.buf = bytearray() # records yet to be written to the file
+        self.nbytes = 0 # number of bytes in the file
+        self.count = 0 # number of pending events
+        self.held = {} # events that cannot be pickled, keyed by seq
+        self.cancelled = set() # seqs of cancelled records
+
+class _SpillHandle(object):
+    """The handle of a spilled event (kept in the event's '_entry')."""
+
+    __slots__ = ('seg', 'seq')
+
+    def __init__(self, seg, seq):
+        self.seg = seg
+        self.seq = seq
+
+# the types of arguments that can be spilled; they are immutable, so
+# that a copy read back from the segment file is as good as the
+# original
+_spill_value_types = frozenset((int, float, complex, bool, str, bytes, type(None)))
+
+class _SpillEventList_(_EventListBase_):
+    """An event list that spills far-future events to disk.
+
+    The spill tier wraps around one of the other event lists (the
+    inner event list), which holds the events in the near future. The
+    time line is divided into partitions of equal length (given by
+    'horizon'). Events in the partitions beyond the current one are
+    pickled and appended to a segment file, one for each partition
+    (the records are buffered in memory and written to the file in
+    large chunks). When the simulation clock approaches a partition,
+    i.e., when the earliest event in memory is no earlier than the
+    start of the partition, the segment file is memory-mapped and
+    the events are read back into the inner event list, in the order
+    they have been inserted.
+
+    Only direct events can be spilled, and only if the event handler
+    is a plain function (which is pickled by name) and the arguments
+    are immutable values or the simulator itself (which is pickled as
+    a reference); all other events (e.g., process events, or events
+    with lambdas or mutable objects as arguments) are held in memory
+    along with the segment, since a copy read back from the file
+    would not be the same object.
+
+    If the user keeps a reference to a spilled event (to cancel it,
+    reschedule it, or wait on it), the event object is found through
+    a weak reference when it's read back, so that the same event is
+    put on the inner event list; otherwise, the event object is
+    discarded once it has been spilled, and a new one is created from
+    the record when it's read back.
+
+    """
+
+    def __init__(self, inner, sim, horizon, directory=None, bufsize=1<<16, maxbuf=1<<24):
+        # the spill tier keeps the bookkeeping of the inner event
+        # list (such as 'last' and the tombstones) rather than its own
+        self.inner = inner
+        self.sim = sim
+        self.horizon = horizon
+        self.bufsize = bufsize # flush a segment at this buffer size
+        self.maxbuf = maxbuf # flush all segments at this total buffer size
+        self.buffered = 0
+        self.seq = count()
+        self.current = int(sim.now//horizon) # the current partition
+        self.boundary = (self.current+1)*horizon # start of the next partition
+        self.segments = {} # partition -> segment
+        self.pending = [] # heap of partitions with segments
+        self.spilled = 0 # number of spilled events
+        self.spills = 0 # number of events written to segments
+        self.pageins = 0 # number of segments read back
+        self.live = weakref.WeakValueDictionary() # seq -> spilled event
+        self.dir = tempfile.mkdtemp(prefix='simulus-spill-', dir=directory)
+        self._finalizer = weakref.finalize(self, shutil.rmtree, self.dir, True)
+        self._stream = io.BytesIO()
+        self._pickler = _SpillPickler(self._stream, sim)
+        self._snaps = []
+
+    @property
+    def size(self): return len(self.inner)+self.spilled
+    @property
+    def lazy(self): return self.inner.lazy
+    @property
+    def tombstones(self): return self.inner.tombstones
+    @property
+    def compactions(self): return self.inner.compactions
+
+    @property
+    def last(self): return self.inner.last
+    @last.setter
+    def last(self, t): self.inner.last = t
+
+    def __len__(self):
+        return len(self.inner)+self.spilled
+
+    def __iter__(self):
+        yield from self.inner
+        for seg in self.segments.values():
+            yield from seg.held.values()
+            for rec in self._records(seg):
+                if rec[1] not in seg.cancelled:
+                    evt = self.live.get(rec[1])
+                    yield evt if evt is not None else self._event(rec)
+
+    def ordered(self):
+        # the spilled events come after those in memory, except for
+        # the events at infinity
+        spilled = True
+        for t, evt in self.inner.ordered():
+            if spilled and t == infinite_time:
+                yield from self._ordered_spilled()
+                spilled = False
+            yield t, evt
+        if spilled:
+            yield from self._ordered_spilled()
+
+    def _ordered_spilled(self):
+        for p in sorted(self.segments):
+            seg = self.segments[p]
+            items = [(evt.time, seq, evt) for seq, evt in seg.held.items()]
+            for rec in self._records(seg):
+                if rec[1] not in seg.cancelled:
+                    evt = self.live.get(rec[1])
+                    items.append((rec[0], rec[1], evt if evt is not None else self._event(rec)))
+            items.sort(key=itemgetter(0, 1))
+            for t, _, evt in items:
+                yield t, evt
+
+    def _freeze(self, snaps):
+        # the spilled events have to be read back from the segments
+        evts = [evt for _, evt in self.ordered()]
+        for snap in snaps:
+            snap._evts = evts
+            snap._evlist = None
+
+    def insert(self, evt):
+        if self._snaps: self._detach()
+        if self.boundary <= evt.time < infinite_time:
+            self._spill(evt)
+        else:
+            self.inner.insert(evt)
+
+    def insert_many(self, evts):
+        if self._snaps: self._detach()
+        near = []
+        for evt in evts:
+            if self.boundary <= evt.time < infinite_time:
+                self._spill(evt)
+            else:
+                near.append(evt)
+        self.inner.insert_many(near)
+
+    def get_min(self):
+        if self.pending:
+            # reading back the segments changes the event list
+            if self._snaps: self._detach()
+            self._fill()
+        return self.inner.get_min()
+
+    def delete_min(self):
+        if self._snaps: self._detach()
+        if self.pending:
+            self._fill()
+        evt = self.inner.delete_min()
+        if self.boundary <= evt.time < infinite_time:
+            self.current = int(evt.time//self.horizon)
+            self.boundary = (self.current+1)*self.horizon
+        return evt
+
+    def delete_min_before(self, upper):
+        if self._snaps: self._detach()
+        if self.pending:
+            self._fill()
+        evt = self.inner.delete_min_before(upper)
+        if evt is not None and self.boundary <= evt.time < infinite_time:
+            self.current = int(evt.time//self.horizon)
+            self.boundary = (self.current+1)*self.horizon
+        return evt
+
+    def cancel(self, evt):
+        if self._snaps: self._detach()
+        if isinstance(evt._entry, _SpillHandle):
+            self._unspill(evt)
+            return False
+        return self.inner.cancel(evt)
+
+    def update(self, evt):
+        if self._snaps: self._detach()
+        if evt._entry is None:
+            raise ValueError("EventList.update(%s): event not found" % evt)
+        if isinstance(evt._entry, _SpillHandle):
+            self._unspill(evt)
+            self.insert(evt)
+            return False
+        if self.boundary <= evt.time < infinite_time:
+            buried = self.inner.cancel(evt)
+            self._spill(evt)
+            return buried
+        return self.inner.update(evt)
+
+    def _spillable(self, evt):
+        """Check whether the event can be written to a segment file."""
+        if type(evt) is not _DirectEvent or evt.trap is not None or \
+           not isinstance(evt.func, (FunctionType, BuiltinFunctionType)) or \
+           '<' in evt.func.__qualname__: # lambdas and local functions
+            return False
+        for a in chain(evt.args, evt.kwargs.values()):
+            if type(a) not in _spill_value_types and a is not self.sim:
+                return False
+        return True
+
+    def _spill(self, evt):
+        """Move the event to the segment of its partition."""
+        p = int(evt.time//self.horizon)
+        seg = self.segments.get(p)
+        if seg is None:
+            seg = _SpillSegment(p, os.path.join(self.dir, "seg-%d" % p))
+            self.segments[p] = seg
+            heapq.heappush(self.pending, p)
+        seq = next(self.seq)
+        if self._spillable(evt) and self._pickle(evt, seq):
+            seg.buf += self._stream.getbuffer()
+            self.buffered += self._stream.tell()
+            self.live[seq] = evt
+            self.spills += 1
+            if len(seg.buf) >= self.bufsize:
+                self._flush(seg)
+            if self.buffered >= self.maxbuf:
+                for x in self.segments.values():
+                    self._flush(x)
+        else:
+            seg.held[seq] = evt
+        seg.count += 1
+        self.spilled += 1
+        evt._entry = _SpillHandle(seg, seq)
+
+    def _pickle(self, evt, seq):
+        """Pickle the event into the stream; return False if it fails."""
+        stream = self._stream
+        stream.seek(0)
+        stream.truncate()
+        try:
+            self._pickler.dump((evt.time, seq, evt.func, evt.name, evt.repeat_intv,
+                                evt.args, evt.kwargs or None))
+        except (pickle.PicklingError, AttributeError, TypeError):
+            # e.g., a function that cannot be found by its name
+            return False
+        finally:
+            self._pickler.clear_memo()
+        return True
+
+    def _unspill(self, evt):
+        """Remove the spilled event from its segment."""
+        h = evt._entry
+        seg = h.seg
+        if seg.held.pop(h.seq, None) is None:
+            # the record stays in the segment file as a tombstone
+            seg.cancelled.add(h.seq)
+            self.live.pop(h.seq, None)
+        seg.count -= 1
+        self.spilled -= 1
+        evt._entry = None
+        if seg.count == 0:
+            # the partition remains on the pending heap; it's skipped
+            # when it comes to the top
+            if self.segments.get(seg.part) is seg:
+                del self.segments[seg.part]
+            self._discard(seg)
+
+    def _flush(self, seg):
+        """Append the buffered records to the segment file."""
+        if seg.buf:
+            with open(seg.path, 'ab') as f:
+                f.write(seg.buf)
+            seg.nbytes += len(seg.buf)
+            self.buffered -= len(seg.buf)
+            seg.buf = bytearray()
+
+    def _discard(self, seg):
+        """Remove the segment file and the buffered records."""
+        self.buffered -= len(seg.buf)
+        seg.buf = bytearray()
+        if seg.nbytes > 0:
+            os.remove(seg.path)
+            seg.nbytes = 0
+
+    def _records(self, seg):
+        """Iterate over the records of the segment (in the order they have
+        been spilled)."""
+        if seg.nbytes > 0:
+            with open(seg.path, 'rb') as f, \
+                 mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                unpickler = _SpillUnpickler(mm, self.sim)
+                while mm.tell() < seg.nbytes:
+                    yield unpickler.load()
+        if seg.buf:
+            stream = io.BytesIO(seg.buf)
+            unpickler = _SpillUnpickler(stream, self.sim)
+            while stream.tell() < len(seg.buf):
+                yield unpickler.load()
+
+    def _event(self, rec):
+        """Create a direct event from the record."""
+        t, _, func, name, repeat_intv, args, kwargs = rec
+        return _DirectEvent(self.sim, t, func, name, repeat_intv, args, kwargs)
+
+    def _fill(self):
+        """Read back the segments of the partitions that no longer start
+        after the earliest event in memory."""
+        pending = self.pending
+        while pending:
+            p = pending[0]
+            if len(self.inner) > 0 and self.inner.get_min() < p*self.horizon:
+                return
+            heapq.heappop(pending)
+            seg = self.segments.pop(p, None)
+            if seg is None: continue
+            if p > self.current:
+                self.current = p
+                self.boundary = (p+1)*self.horizon
+
+            evts = list(seg.held.items())
+            for rec in self._records(seg):
+                seq = rec[1]
+                if seq not in seg.cancelled:
+                    evt = self.live.pop(seq, None)
+                    evts.append((seq, evt if evt is not None else self._event(rec)))
+            self._discard(seg)
+            evts.sort(key=itemgetter(0))
+            evts = [evt for _, evt in evts]
+            for evt in evts:
+                evt._entry = None
+            self.spilled -= len(evts)
+            self.pageins += 1
+            self.inner.insert_many(evts)
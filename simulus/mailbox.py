@@ -242,13 +242,18 @@ class Mailbox(object):
             errmsg = "mailbox.recv(part=%r) out of range" % part
             log.error(errmsg)
             raise IndexError(errmsg)
+        return p._block(self._recv(p, part, isall))
+
+    def _recv(self, p, part, isall):
+        """The blocking operation of recv() as a generator (see
+        _Process._block())."""
 
         if self._parts[part].stats is not None:
             self._parts[part].stats._sample("retrievals", self._sim.now)
         if len(self._parts[part].msgbuf) == 0:
             #log.debug('receiver blocked from mailbox part=%d at %g' %
             #          (part, self._sim.now))
-            self._parts[part].trap.wait()
+            yield from self._parts[part].trap._wait(p)
             #log.debug('receiver unblocked from mailbox part=%d at %g' %
             #          (part, self._sim.now))
         else:
@@ -6,17 +6,22 @@
 
 """Simulation process."""
 
-# greenlet must be installed as additional python package
-from greenlet import greenlet
+# greenlet is an optional python package: it's needed only for the
+# processes started from plain functions; the processes started from
+# 'async def' functions are coroutines driven by the simulator itself
+try:
+    from greenlet import greenlet
+except ImportError:
+    greenlet = None
 
 from .trappable import Trappable
 from .trap import *
 from .event import *
 
-__all__ = ["_Process"]
+__all__ = ["_Process", "_CoroProcess"]
 
-#import logging
-#log = logging.getLogger('simulus.simulator')
+import logging
+log = logging.getLogger('simulus.simulator')
 
 class _Process(Trappable):
     """A process is an independent thread of execution."""
@@ -26,6 +31,10 @@ class _Process(Trappable):
     STATE_RUNNING       = 1
     STATE_SUSPENDED     = 2
     STATE_TERMINATED    = 3
+
+    __slots__ = ('name', 'func', 'args', 'kwargs', 'state', 'main', 'vert',
+                 'prio', 'prio_args', '_trap', '_acting_trappables', '_wakeup',
+                 '_waitset')
     
     def __init__(self, sim, name, func, usr_args, usr_kwargs, prio, prio_args):
         """A process can only be created using simulator's process() function;
@@ -36,20 +45,48 @@ class _Process(Trappable):
         self.name = name
         self.func = func
         #self.params = params
-        self.args = usr_args
-        self.kwargs = usr_kwargs
+        self.args = usr_args if usr_args else _empty_args
+        self.kwargs = usr_kwargs if usr_kwargs else _empty_kwargs
         self.state = _Process.STATE_STARTED
         self.main = None
-        self.vert = greenlet(self.invoke)
+        self.vert = self._vert()
         self.prio = prio
         self.prio_args = prio_args
-        self.trap = Trap(self._sim)
-        self.acting_trappables = []
+        # the trap (for other processes to wait on this process) and
+        # the list of acting trappables (for this process to wait on
+        # others) are only created when needed
+        self._trap = None
+        self._acting_trappables = None
+        # the event for the process to wake up from sleep, which is
+        # reused each time the process sleeps
+        self._wakeup = None
+        self._waitset = None # the wait set owned by the process, if any
+
+    @property
+    def trap(self):
+        """The trap to be triggered when the process terminates."""
+        if self._trap is None:
+            self._trap = Trap(self._sim)
+            if self.state == _Process.STATE_TERMINATED:
+                # nothing to wait for if the process has terminated
+                self._trap.state = Trap.TRAP_SPRUNG
+        return self._trap
+
+    @property
+    def acting_trappables(self):
+        """The trappables responsible for unblocking the process."""
+        if self._acting_trappables is None:
+            self._acting_trappables = []
+        return self._acting_trappables
 
     def activate(self):
         """Move the process into the ready queue."""
         
         if self.state != _Process.STATE_TERMINATED:
+            if self._waitset is not None and self._waitset._route():
+                # the wait set has taken the triggered trappable, and
+                # the process is not waiting for it right now
+                return
             if self.state != _Process.STATE_RUNNING:
                 self.state = _Process.STATE_RUNNING
                 self._sim._readyq.append(self)
@@ -59,11 +96,24 @@ class _Process(Trappable):
         # sleep) has been terminated somehow, in which case we simply
         # ignore its activation
 
+    def _vert(self):
+        """Return the initial thread of execution of this process."""
+
+        if greenlet is None:
+            errmsg = "simulator.process(proc=%r) requires greenlet (or an 'async def' function)" % self.func
+            log.error(errmsg)
+            raise ImportError(errmsg)
+        # the greenlet is assigned when the process starts running
+        # (see run()), either newly created or taken from the
+        # simulator's pool of retired greenlets
+        return None
+
     def deactivate(self, newstate):
         """Change the state of the process from running to another state."""
         self.state = newstate
 
-    def invoke(self):
+    @staticmethod
+    def invoke():
         """Invoke the start function of the process.
 
         We use this method to wrap around the start function and have
@@ -72,13 +122,26 @@ class _Process(Trappable):
         behave strangely in that case. To prevent that from
         happenning, we wrap the start function around with this
         method, which ends by manually terminating the current
-        process.
+        process. If the greenlet is then recycled, it comes back here
+        to invoke the start function of another process.
+
+        The processes are handed over as the return value of switching
+        to the greenlet, rather than as the argument of this method;
+        greenlet would otherwise hold on to the first process until
+        this method returns (i.e., forever, if the greenlet is
+        recycled).
 
         """
 
         #self.func(self._sim, self.params)
-        self.func(*self.args, **self.kwargs)
-        self.terminate()
+        p = greenlet.getcurrent().parent.switch()
+        while True:
+            p.func(*p.args, **p.kwargs)
+            main = p._retire()
+            # drop the finished process before the greenlet is parked
+            # in the pool, so that it can be garbage collected
+            del p
+            p = main.switch()
 
     def run(self):
         """Run this process when it's activated. This has to be called within
@@ -86,7 +149,15 @@ class _Process(Trappable):
 
         assert self.state == _Process.STATE_RUNNING
         self.main = greenlet.getcurrent()
-        self.vert.switch()
+        if self.vert is None:
+            pool = self._sim._greenlets
+            if pool:
+                self.vert = pool.pop()
+            else:
+                # start invoke() and have it wait for the process
+                self.vert = greenlet(_Process.invoke)
+                self.vert.switch()
+        self.vert.switch(self)
 
         # ... deprecated code:
         # check if the greenlet has finished itself (this seems to
@@ -106,13 +177,27 @@ class _Process(Trappable):
         assert self.vert
         assert not self.vert.dead
 
-        #log.debug('schedule timeout event at time=%g from now=%g' % (until, self._sim.now))
-        self._sim._runtime["scheduled_events"] += 1
-        e = _ProcessEvent(self._sim, until, self, self.name)
-        self._sim._eventlist.insert(e)
+        self._wake_at(until)
         self.deactivate(_Process.STATE_SUSPENDED)
         self.main.switch()
 
+    def _wake_at(self, until):
+        """Schedule the wakeup event of this process."""
+
+        sim = self._sim
+        sim._runtime["scheduled_events"] += 1
+        e = self._wakeup
+        if e is None or e._entry is not None or sim._exposed:
+            e = self._wakeup = _ProcessEvent(sim, until, self, self.name)
+        else:
+            # the previous wakeup event has been retrieved (and it has
+            # never been seen outside the simulator)
+            e.time = until
+            e.trap = None # trap cannot be reused
+        sim._eventlist.insert(e)
+        if sim._hooks is not None:
+            sim._notify("on_event_scheduled", e)
+
     def suspend(self):
         """Switch control to the simulator's main loop."""
         
@@ -125,6 +210,30 @@ class _Process(Trappable):
         self.deactivate(_Process.STATE_SUSPENDED)
         self.main.switch()
 
+    def _block(self, gen):
+        """Carry out a blocking operation in this process.
+
+        A blocking operation (such as waiting on a semaphore) is
+        implemented as a generator, which yields whenever the process
+        needs to be suspended; it's resumed once the process is
+        activated again. This method runs the generator to the end and
+        returns its return value.
+
+        """
+
+        try:
+            while True:
+                next(gen)
+                self.suspend()
+        except StopIteration as e:
+            return e.value
+
+    def _sleep(self, until):
+        """The blocking operation of sleep() as a generator."""
+
+        self._wake_at(until)
+        yield
+
     def terminate(self):
         """Self-terminate this process. 
 
@@ -138,6 +247,38 @@ class _Process(Trappable):
 
         """
 
+        assert self.vert
+        assert not self.vert.dead
+        self._finish()
+
+        #raise greenlet.GreenletExit
+        self.main.switch()
+
+    def _retire(self):
+        """Terminate this process when its start function returns.
+
+        The greenlet is put in the simulator's pool, unless the pool
+        is full, so that it can be reused by another process. This
+        method returns the greenlet of the simulator's main loop, to
+        which invoke() switches (without holding on to this process);
+        once the greenlet is reused, the switch returns the next
+        process to run on it (otherwise, it never returns).
+
+        """
+
+        assert self.vert
+        assert not self.vert.dead
+        self._finish()
+
+        sim = self._sim
+        if len(sim._greenlets) < sim._process_pool:
+            sim._greenlets.append(self.vert)
+            self.vert = None
+        return self.main
+
+    def _finish(self):
+        """Mark this process as terminated and trigger the trap."""
+
         # remember this is self-termination; however, it's possible
         # that a process got killed and ended up here from the end of
         # the invoke() method (... this is probably not true!)
@@ -145,18 +286,14 @@ class _Process(Trappable):
             assert self.state == _Process.STATE_RUNNING
             assert self._sim._theproc == self
 
-            assert self.vert
-            assert not self.vert.dead
-        
             self.deactivate(_Process.STATE_TERMINATED)
-            self.trap.trigger()
+            if self._trap is not None:
+                self._trap.trigger()
+            if self._sim._hooks is not None:
+                self._sim._notify("on_process_terminated", self)
 
-        #log.debug('process terminated at time=%g' % self._sim.now)
         self._sim._runtime["terminated_processes"] += 1
 
-        #raise greenlet.GreenletExit
-        self.main.switch()
-
     def set_priority(self, prio, prio_args):
         """Set the priority of this process (either a value or a function that
         returns a value)."""
@@ -177,4 +314,109 @@ class _Process(Trappable):
         self.trap._cancel_wait()
 
     def _true_trappable(self):
-        return self.trap
+        # _try_wait() has created the trap
+        return self._trap
+
+
+class _ProcessExit(BaseException):
+    """Raised to unwind a coroutine process that terminates itself."""
+
+class _Awaitable(object):
+    """The awaitable returned by a blocking operation in a coroutine
+    process; it wraps the generator of the blocking operation."""
+
+    __slots__ = ('proc', 'gen')
+
+    def __init__(self, proc, gen):
+        self.proc = proc
+        self.gen = gen
+
+    def __await__(self):
+        self.proc._pending = None
+        return self.gen
+
+class _CoroProcess(_Process):
+    """A process started from an 'async def' function.
+
+    The starting function of the process is run as a coroutine, which
+    is driven by the simulator's main loop directly (with no asyncio
+    event loop), and there is no greenlet for the process. The
+    blocking methods (such as the simulator's sleep() and wait(),
+    trap's wait(), semaphore's wait(), resource's acquire(), store's
+    and bucket's get() and put(), and mailbox's recv()) return
+    awaitables when called from a coroutine process; the process must
+    await them, e.g., 'await sim.sleep(5)'. A blocking operation that
+    is not awaited would have no effect; the process raises a
+    RuntimeError as soon as it calls another blocking operation or
+    gives up control without awaiting it.
+
+    """
+
+    __slots__ = ('_pending',)
+
+    def __init__(self, *args):
+        super().__init__(*args)
+        self._pending = None # the awaitable yet to be awaited
+
+    def _vert(self):
+        # the coroutine is created when the process starts running,
+        # so that a process killed before it starts leaves behind no
+        # coroutine that has never been awaited
+        return None
+
+    def run(self):
+        """Run this process when it's activated, until the coroutine awaits a
+        blocking operation or returns."""
+
+        assert self.state == _Process.STATE_RUNNING
+        if self.vert is None:
+            self.vert = self.func(*self.args, **self.kwargs)
+        try:
+            x = self.vert.send(None)
+        except StopIteration:
+            if self._pending is not None:
+                self._not_awaited()
+            self._finish()
+        except _ProcessExit:
+            # the process has terminated itself
+            assert self.state == _Process.STATE_TERMINATED
+        else:
+            if self._pending is not None:
+                self._not_awaited()
+            if x is not None:
+                errmsg = "process '%s' awaits on %r, not a simulus blocking operation" % \
+                         (self.name, x)
+                log.error(errmsg)
+                raise RuntimeError(errmsg)
+            if self.state == _Process.STATE_RUNNING:
+                self.deactivate(_Process.STATE_SUSPENDED)
+
+    def sleep(self, until):
+        assert self.state == _Process.STATE_RUNNING
+        assert self._sim._theproc == self
+        assert self._sim.now <= until
+        return self._block(self._sleep(until))
+
+    def suspend(self):
+        errmsg = "coroutine process cannot be suspended without await"
+        log.error(errmsg)
+        raise RuntimeError(errmsg)
+
+    def _block(self, gen):
+        if self._pending is not None:
+            self._not_awaited()
+        a = self._pending = _Awaitable(self, gen)
+        return a
+
+    def _not_awaited(self):
+        errmsg = "process '%s' did not await a blocking operation" % self.name
+        log.error(errmsg)
+        raise RuntimeError(errmsg)
+
+    def terminate(self):
+        """Self-terminate this process: the coroutine is unwound (with an
+        exception that should not be caught) back to the simulator's
+        main loop."""
+
+        self._finish()
+        raise _ProcessExit()
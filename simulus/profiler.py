@@ -0,0 +1,181 @@
+"""Profiling the event handlers and processes of a simulator."""
+
+import csv
+from collections import namedtuple
+
+__all__ = ["Profiler", "ProfileRecord"]
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+# a row of the profile table: 'kind' is either 'event' (for the event
+# handlers of direct events) or 'process' (for the starting functions
+# of the processes); 'calls' is the number of times the event handler
+# has been invoked, or the number of times the simulator has switched
+# context to the process (each time the process runs until it's
+# suspended or terminated); 'total' and 'mean' are the wall-clock
+# time (in seconds) spent for all calls and for each call on average;
+# 'first' and 'last' are the simulation time of the first and the
+# last call
+ProfileRecord = namedtuple('ProfileRecord', ('kind', 'name', 'calls', 'total',
+                                             'mean', 'first', 'last', 'func'))
+
+class Profiler(object):
+    """A profiler collects the wall-clock time spent by the event
+    handlers and the processes of a simulator.
+
+    A profiler is created by calling the simulator's profiler()
+    method. It can be used as a context manager, so that all events
+    processed by the simulator within the context are profiled::
+
+        with sim.profiler() as prof:
+            sim.run(until=100)
+        prof.report()
+
+    Alternatively, one can call start() and stop() explicitly, or
+    simply call run() with 'profile=True', which returns the profiler.
+    The statistics accumulate over multiple runs until the profiler is
+    cleared.
+
+    The event handlers are profiled by function: the bound methods of
+    different instances of the same class are reported as one (as
+    they run the same code). The processes are profiled by their
+    starting functions; the time spent by a process includes
+    everything it does between two context switches, such as
+    scheduling events or signaling other processes (but not the time
+    it's suspended).
+
+    """
+
+    def __init__(self, sim):
+        self._sim = sim
+        self._stats = {} # a map from (kind, func) to [calls, total, first, last]
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start profiling the simulator.
+
+        Profiling takes effect the next time the simulator starts
+        running; only one profiler can be active on a simulator at a
+        time.
+
+        """
+
+        sim = self._sim
+        if sim._profiler is not None and sim._profiler is not self:
+            errmsg = "profiler.start() another profiler active on simulator '%s'" % sim.name
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        sim._profiler = self
+
+    def stop(self):
+        """Stop profiling the simulator."""
+
+        if self._sim._profiler is self:
+            self._sim._profiler = None
+
+    def clear(self):
+        """Discard all statistics collected so far."""
+        self._stats.clear()
+
+    def _record(self, kind, func, t, now):
+        """Account for one call of the event handler or process."""
+
+        # bound methods are profiled by the underlying function
+        func = getattr(func, '__func__', func)
+        s = self._stats.get((kind, func))
+        if s is None:
+            self._stats[(kind, func)] = [1, t, now, now]
+        else:
+            s[0] += 1
+            s[1] += t
+            s[3] = now
+
+    def table(self, sortby='total', reverse=None):
+        """Return the collected statistics as a list of profile records.
+
+        Args:
+            sortby (str): the field of the profile records by which
+                the table is sorted, which can be 'total' (the
+                default), 'calls', 'mean', 'first', 'last', 'name', or
+                'kind'
+
+            reverse (bool): if True, the records are sorted in
+                descending order; if ignored, the numerical fields are
+                sorted in descending order (so that the most expensive
+                functions come first), and the others in ascending
+                order
+
+        Returns:
+            This method returns a list of ProfileRecord, which is a
+            named tuple with the fields: kind, name, calls, total,
+            mean, first, last, and func (the function itself).
+
+        """
+
+        if sortby not in ProfileRecord._fields or sortby == 'func':
+            errmsg = "profiler.table(sortby=%r) unknown field" % sortby
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if reverse is None:
+            reverse = sortby in ('calls', 'total', 'mean')
+
+        recs = [ProfileRecord(kind, _func_name(func), calls, total, total/calls,
+                              first, last, func)
+                for (kind, func), (calls, total, first, last) in self._stats.items()]
+        i = ProfileRecord._fields.index(sortby)
+        recs.sort(key=lambda r: r[i], reverse=reverse)
+        return recs
+
+    def to_csv(self, f, sortby='total'):
+        """Write the profile table to a CSV file; the argument is either the
+        name of the file or a file object opened for writing."""
+
+        if isinstance(f, str):
+            with open(f, 'w', newline='') as fo:
+                self.to_csv(fo, sortby)
+            return
+        w = csv.writer(f)
+        w.writerow(ProfileRecord._fields[:-1])
+        for r in self.table(sortby):
+            w.writerow(r[:-1])
+
+    def report(self, limit=20, sortby='total', prefix=''):
+        """Print the profile table.
+
+        Args:
+            limit (int): the maximum number of rows to be printed (the
+                default is 20); if None, all rows are printed
+
+            sortby (str): the field by which the table is sorted (see
+                table())
+
+            prefix (str): all print-out lines will be prefixed by this
+                string (the default is empty)
+
+        """
+
+        recs = self.table(sortby)
+        print('%s*********** simulator profile (%s) ***********' % (prefix, self._sim.name))
+        print('%s%-7s %10s %12s %12s %12s %12s  %s' %
+              (prefix, 'kind', 'calls', 'total(s)', 'mean(s)', 'first', 'last', 'name'))
+        for r in recs[:limit]:
+            print('%s%-7s %10d %12.6f %12.3e %12g %12g  %s' %
+                  (prefix, r.kind, r.calls, r.total, r.mean, r.first, r.last, r.name))
+        if limit is not None and len(recs) > limit:
+            print('%s... (%d more)' % (prefix, len(recs)-limit))
+
+def _func_name(func):
+    """Return a printable name of a function."""
+    name = getattr(func, '__qualname__', None)
+    if name is None:
+        return repr(func)
+    mod = getattr(func, '__module__', None)
+    return name if mod is None or mod == '__main__' else '%s.%s' % (mod, name)
@@ -0,0 +1,163 @@
+"""Sampling the progress of a long simulation run."""
+
+import time
+from collections import deque, namedtuple
+
+__all__ = ["Progress", "ProgressSample"]
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+# a sample of the simulator's progress: 'wall' is the wall-clock time
+# (in seconds) since the simulator was created, 'now' is the
+# simulation time, 'executed' is the total number of executed
+# events, 'pending' is the number of events on the event list, and
+# 'processes' is the number of live (not yet terminated) processes
+ProgressSample = namedtuple('ProgressSample', ('wall', 'now', 'executed',
+                                               'pending', 'processes'))
+
+class Progress(object):
+    """A progress sampler takes samples of a simulator's progress
+    periodically while the simulator is running.
+
+    A progress sampler is created by calling the simulator's
+    progress() method. The samples are taken either every given
+    number of executed events, or every given wall-clock interval, or
+    both; the latest samples are kept in a ring buffer. The sampler
+    is polled by the simulator's main event loop, which merely
+    counts down the events to the next poll; the wall-clock time is
+    read only at the polls, which are spaced out (by the observed
+    event rate) to happen several times per interval.
+
+    """
+
+    def __init__(self, sim, every, interval, callback, maxlen):
+        if every is None and interval is None:
+            errmsg = "simulator.progress() requires either 'every' or 'interval'"
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if every is not None and not (isinstance(every, int) and every > 0):
+            errmsg = "simulator.progress(every=%r) not a positive integer" % every
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if interval is not None and not interval > 0:
+            errmsg = "simulator.progress(interval=%r) non-positive interval" % interval
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if callback is not None and not callable(callback):
+            errmsg = "simulator.progress(callback=%r) not callable" % callback
+            log.error(errmsg)
+            raise TypeError(errmsg)
+
+        self._sim = sim
+        self.every = every
+        self.interval = interval
+        self.callback = callback
+        self._samples = deque(maxlen=maxlen)
+        self._due_count = 0 # the number of executed events for the next sample
+        self._due_time = 0 # the wall-clock time for the next sample
+        self._quantum = 100 # the number of events between polling the clock
+
+    def __len__(self):
+        return len(self._samples)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Attach the sampler to the simulator (only one sampler can be
+        attached to a simulator at a time)."""
+
+        sim = self._sim
+        if sim._progress is not None and sim._progress is not self:
+            errmsg = "progress.start() another sampler active on simulator '%s'" % sim.name
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        sim._progress = self
+
+    def stop(self):
+        """Detach the sampler from the simulator; the samples are kept."""
+
+        if self._sim._progress is self:
+            self._sim._progress = None
+
+    def samples(self):
+        """Return the list of samples in the ring buffer (oldest first)."""
+        return list(self._samples)
+
+    def sample(self):
+        """Take a sample now and return it (it's also put in the ring
+        buffer and passed to the callback, if provided)."""
+        return self._sample(time.time(), self._sim._runtime["executed_events"])
+
+    def _state(self, wall, executed):
+        """Return the current state of the simulator as a sample."""
+
+        sim = self._sim
+        rt = sim._runtime
+        return ProgressSample(wall-rt["start_clock"], sim.now, executed, len(sim._eventlist),
+                              rt["initiated_processes"]-rt["terminated_processes"]-
+                              rt["killed_processes"])
+
+    def _sample(self, wall, executed):
+        s = self._state(wall, executed)
+        if self.interval is not None and self._samples:
+            # space out the polls so that the clock is checked about
+            # ten times per interval at the current event rate
+            last = self._samples[-1]
+            if s.wall > last.wall:
+                rate = (s.executed-last.executed)/(s.wall-last.wall)
+                self._quantum = max(1, int(rate*self.interval/10))
+        self._samples.append(s)
+        if self.every is not None:
+            self._due_count = executed+self.every
+        if self.interval is not None:
+            self._due_time = wall+self.interval
+        if self.callback is not None:
+            self.callback(self._sim, s)
+        return s
+
+    def _poll(self, executed):
+        """Take a sample if it's due; return the number of events until the
+        next poll."""
+
+        if self.interval is None:
+            if not self._samples or executed >= self._due_count:
+                self._sample(time.time(), executed)
+            return self._due_count-executed
+
+        wall = time.time()
+        if not self._samples or wall >= self._due_time or \
+           self.every is not None and executed >= self._due_count:
+            self._sample(wall, executed)
+        if self.every is not None:
+            return min(self._quantum, self._due_count-executed)
+        return self._quantum
+
+    def report(self, limit=10, prefix=''):
+        """Print the trends of the event rate and the simulation to real
+        time ratio between the latest samples (up to 'limit' intervals,
+        or all if limit is None), and since the last sample."""
+
+        ss = list(self._samples)
+        now = self._state(time.time(), self._sim._runtime["executed_events"])
+        if not ss or now.executed > ss[-1].executed or now.now > ss[-1].now:
+            ss.append(now)
+        if limit is not None:
+            ss = ss[-limit-1:]
+        print('%sprogress trend (%d intervals):' % (prefix, len(ss)-1))
+        print('%s%12s %12s %12s %12s %12s %10s %10s' %
+              (prefix, 'wall', 'now', 'executed', 'event rate', 'sim/real', 'pending', 'processes'))
+        for a, b in zip(ss, ss[1:]):
+            dt = b.wall-a.wall
+            if dt > 0:
+                rate = '%12g %12g' % ((b.executed-a.executed)/dt, (b.now-a.now)/dt)
+            else:
+                rate = '%12s %12s' % ('-', '-')
+            print('%s%12g %12g %12d %s %10d %10d' %
+                  (prefix, b.wall, b.now, b.executed, rate, b.pending, b.processes))
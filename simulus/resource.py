@@ -7,6 +7,7 @@
 from .utils import QDIS, DataCollector, TimeSeries, DataSeries, TimeMarks
 from .trappable import Trappable
 from .semaphore import Semaphore
+from .process import _CoroProcess
 
 __all__ = ["Resource"]
 
@@ -37,7 +38,10 @@ class Resource(Trappable):
     is usually modeled using the sleep() method. Afterwards, the same
     process is expected to call the release() method to free the
     resource, so that another waiting process may have a chance to
-    gain access to the resource.
+    gain access to the resource. The resource can also be used in a
+    'with' statement, which acquires and releases it; a coroutine
+    process (started from an 'async def' function) must use 'async
+    with' instead.
 
     """
 
@@ -60,6 +64,7 @@ class Resource(Trappable):
         # for bookkeeping and statistics
         self._arrivals = {} # map from process to its arrival time
         self._services = {} # map from process to its entering service time
+        self._watchers = None # the conditions watching the resource
         if self.stats is not None:
             for k, v in dc._attrs.items():
                 if k in ('in_systems', 'in_services', 'in_queues'):
@@ -99,10 +104,15 @@ class Resource(Trappable):
             errmsg = "resource.acquire() outside process context"
             log.error(errmsg)
             raise RuntimeError(errmsg)
+        return p._block(self._acquire(p))
+
+    def _acquire(self, p):
+        """The blocking operation of acquire() as a generator (see
+        _Process._block())."""
 
         self._make_arrival(p)
         #log.debug('process tries to acquire resource at %g' % self._sim.now)
-        self._sem.wait()
+        yield from self._sem._wait(p)
         self._make_service(p)
         #log.debug('process obtains resource at %g' % self._sim.now)
 
@@ -167,6 +177,8 @@ class Resource(Trappable):
             self.stats._sample("in_systems", (self._sim.now, len(self._arrivals)))
             self.stats._sample("in_queues", (self._sim.now, len(self._arrivals)-len(self._services)))
             self._last_arrival = self._sim.now
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
 
     def _make_service(self, p):
         self._services[p] = self._sim.now
@@ -175,6 +187,8 @@ class Resource(Trappable):
             self.stats._sample("queue_times", self._sim.now-self._arrivals[p])
             self.stats._sample("in_queues", (self._sim.now, len(self._arrivals)-len(self._services)))
             self.stats._sample("in_services", (self._sim.now, len(self._services)))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
 
     def _make_renege(self, p):
         t = self._arrivals.pop(p) # throw a KeyError if not in dictionary
@@ -183,6 +197,8 @@ class Resource(Trappable):
             self.stats._sample("renege_times", self._sim.now-t)
             self.stats._sample("in_queues", (self._sim.now, len(self._arrivals)-len(self._services)))
             self.stats._sample("in_systems", (self._sim.now, len(self._arrivals)))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
 
     def _make_departure(self, p):
         ta = self._arrivals.pop(p) # throw a KeyError if not in dictionary
@@ -193,10 +209,24 @@ class Resource(Trappable):
             self.stats._sample("system_times", self._sim.now-ta)
             self.stats._sample("in_systems", (self._sim.now, len(self._arrivals)))
             self.stats._sample("in_services", (self._sim.now, len(self._services)))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
 
     def __enter__(self):
+        if isinstance(self._sim.cur_process(), _CoroProcess):
+            errmsg = "resource used in 'with' statement by coroutine process (use 'async with')"
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
         self.acquire()
         return self
     
     def __exit__(self, exc_type, exc_value, exc_traceback):
         self.release()
+
+    # a coroutine process acquires the resource with 'async with'
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, exc_traceback):
+        self.release()
@@ -90,6 +90,11 @@ class Semaphore(Trappable):
             errmsg = "semaphore.wait() outside process context"
             log.error(errmsg)
             raise RuntimeError(errmsg)
+        return p._block(self._wait(p))
+
+    def _wait(self, p):
+        """The blocking operation of wait() as a generator (see
+        _Process._block())."""
 
         self.val -= 1
         if self.val < 0:
@@ -98,7 +103,7 @@ class Semaphore(Trappable):
             self.shuffled = False
             assert len(self.blocked) == -self.val
             #log.debug('process blocked on semaphore wait (val=%d)' % self.val)
-            p.suspend()
+            yield
         else:
             # nothing to be done; there are no waiting processes
             assert len(self.blocked) == 0
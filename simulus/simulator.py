@@ -4,21 +4,27 @@
 # Last Update: Time-stamp: <2019-09-07 09:16:54 liux>
 ###############################################################
 
-import random, uuid, time
+import random, uuid, time, gc, inspect
 from collections import deque
 
 from .utils import *
 from .trappable import *
 from .trap import *
 from .semaphore import *
+from .condition import *
 from .resource import *
 from .event import *
+from .eventlist import *
 from .process import *
 from .simulus import *
 from .resource import *
 from .store import *
 from .bucket import *
 from .mailbox import *
+from .profiler import *
+from .progress import *
+from .trace import *
+from .waitset import *
 
 __all__ = ["simulator", "infinite_time", "minus_infinite_time"]
 
@@ -26,6 +32,14 @@ import logging
 log = logging.getLogger(__name__)
 log.addHandler(logging.NullHandler())
 
+# the names of the observer hooks (see simulator.add_hook())
+_HOOKS = ("on_event_executed", "on_event_scheduled", "on_event_cancelled",
+          "on_process_switch", "on_process_terminated")
+
+# the number of events till the next progress poll if there's no
+# progress sampler
+_NEVER = 1<<62
+
 class simulator:
     """A simulator instance.
 
@@ -44,7 +58,9 @@ class simulator:
 
     """
 
-    def __init__(self, name=None, init_time=0):
+    def __init__(self, name=None, init_time=0, eventlist='heap',
+                 lazy_cancel=True, compact_ratio=0.5, spill_horizon=None,
+                 spill_dir=None, process_pool=100):
         """Create a simulator.
 
         One can repeatedly create as many simulators as needed. A
@@ -64,11 +80,74 @@ class simulator:
             init_time (float): the optional start time of the
                 simulator; if unspecified, the default is zero
 
+            eventlist (string): the data structure used for the
+                event list of the simulator, which can be selected
+                from 'heap' (a binary heap), 'sorteddict' (a sorted
+                dict), 'calendar' (a calendar queue, which works well
+                for large event lists), or 'wheel' (a hierarchical
+                timing wheel, which works well for timeouts and
+                periodic events); if unspecified, the default is 'heap'
+
+            lazy_cancel (bool): if True (the default), cancelled or
+                rescheduled events are flagged as tombstones and
+                skipped when they reach the front of the event list,
+                rather than being removed right away; the heap, the
+                calendar queue, and the timing wheel always cancel
+                events lazily (the timing wheel removes the events in
+                the near future right away)
+
+            compact_ratio (float): the event list will be compacted
+                (by removing all tombstones) once the tombstones
+                exceed this fraction of all entries on the event
+                list; the value must be in (0, 1]; the default is 0.5
+
+            spill_horizon (float): if provided, the far-future events
+                are spilled to disk: the time line is divided into
+                partitions of this length, and the events beyond the
+                current partition are written to a file for each
+                partition and read back when the simulation clock
+                approaches the partition; only direct events with a
+                plain function as the event handler and immutable
+                values (or the simulator) as arguments are written
+                to disk; if ignored (the default), all events are
+                kept in memory
+
+            spill_dir (string): the directory in which the files of
+                the spilled events are created (in a temporary
+                subdirectory, which is removed along with the
+                simulator); if ignored, the system's default
+                temporary directory is used
+
+            process_pool (int): the maximum number of greenlets kept
+                by the simulator for reuse; when a process returns
+                from its starting function, its greenlet is retired
+                to the pool (unless the pool is full) and later taken
+                by a new process, which saves the cost of creating
+                greenlets for short-lived processes; the default is
+                100, and zero disables the pool
+
         Returns:
             This function returns the newly created simulator.
 
         """
 
+        if eventlist not in _EVENTLISTS:
+            errmsg = "simulator(eventlist=%r) unknown event list" % eventlist
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if not 0 < compact_ratio <= 1:
+            errmsg = "simulator(compact_ratio=%r) out of range" % compact_ratio
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if spill_horizon is not None and not 0 < spill_horizon < infinite_time:
+            errmsg = "simulator(spill_horizon=%r) non-positive or infinite" % spill_horizon
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if not (isinstance(process_pool, int) and process_pool >= 0):
+            errmsg = "simulator(process_pool=%r) not a non-negative integer" % process_pool
+            log.error(errmsg)
+            raise ValueError(errmsg)
+
         # note simulus is implemented as a singleton
         self._simulus = _Simulus()
 
@@ -83,24 +162,47 @@ class simulator:
         log.info("[r%d] creating simulator '%s'" % (self._simulus.comm_rank, self.name))
 
         self.init_time = self.now = init_time
-        self._eventlist = _EventList_()
+        self._eventlist = _EVENTLISTS[eventlist](lazy_cancel, compact_ratio)
+        if spill_horizon is not None:
+            self._eventlist = _SpillEventList_(self._eventlist, self, spill_horizon, spill_dir)
         self._theproc = None
         self._readyq = deque()
+        self._greenlets = [] # the pool of retired greenlets
+        self._process_pool = process_pool
         self._rng = None
         #self._fast_rng = None
 
+        # the observer hooks are kept in a map from hook names to
+        # tuples of functions; it's None if no hooks are registered
+        self._hooks = None
+        self._profiler = None
+        # whether the events have been handed out for inspection (by
+        # calendar(), snapshot(), or the observer hooks); if so, the
+        # processes no longer reuse their wakeup events, which would
+        # change underneath the inspecting code
+        self._exposed = False
+        self._progress = None
+        self._tracer = None
+
         # performance statistics
         self._runtime = {
             "start_clock": time.time(),
             "scheduled_events": 0,
             "cancelled_events": 0,
+            "tombstones": 0,
             "executed_events": 0,
             "initiated_processes": 0,
             "cancelled_processes": 0,
+            "killed_processes": 0,
             "process_contexts": 0,
             "terminated_processes": 0,
         }
 
+        # with the debug option (-vv), all activities are traced and
+        # logged at the debug level
+        if self._simulus.args.debug:
+            self.trace(logging=True)
+
     ###################################
     # direct event scheduling methods #
     ###################################
@@ -173,13 +275,118 @@ class simulator:
             log.error(errmsg)
             raise ValueError(errmsg)
             
-        #log.debug("[r%d] simulator '%s' schedule event at time=%g from now=%g" %
-        #          (self._simulus.comm_rank, self.name[-4:], time, self.now))
         self._runtime["scheduled_events"] += 1
         e = _DirectEvent(self, time, func, name, repeat_intv, args, kwargs)
         self._eventlist.insert(e)
+        if self._hooks is not None:
+            self._notify("on_event_scheduled", e)
         return e
 
+    def sched_many(self, func, offset=None, until=None, args=None, name=None):
+        """Schedule a batch of events with the same event handler.
+
+        This method is similar to calling sched() once for each event,
+        but much more efficient for scheduling a large number of
+        events (e.g., the initial events of a model): the times are
+        validated at once and the events are loaded into the event
+        list in bulk.
+
+        Args:
+            func (function): the event handler, which is a
+                user-defined function
+
+            offset (sequence): relative times from now at which the
+                events are scheduled to happen; it can be a list, a
+                tuple, or a one-dimensional NumPy array; all values
+                must be non-negative
+
+            until (sequence): absolute times at which the events are
+                scheduled to happen; none of them can be earlier than
+                the current time; either 'offset' or 'until' must be
+                provided, but not both
+
+            args (sequence): an optional sequence of argument arrays,
+                one for each positional argument to be passed to the
+                event handler; each array must have the same length
+                as the times; that is, the i-th event will be invoked
+                as func(args[0][i], args[1][i], ...)
+
+            name (string): an optional name for the events
+
+        Returns:
+            This method returns a list of direct scheduling events in
+            the same order as the given times.
+
+        Events scheduled at the same time are invoked in the order
+        they appear in the given sequence.
+
+        """
+
+        # figure out the event times
+        if until is None and offset is None:
+            errmsg = "simulator.sched_many() missing time specification"
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        elif until is not None and offset is not None:
+            errmsg = "simulator.sched_many() duplicate specification of 'until' and 'offset'"
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        times = offset if offset is not None else until
+        n = len(times)
+        if n == 0: return []
+
+        # the validation is done at once (vectorized if the times are
+        # given as a numpy array); note that the negated comparison
+        # also catches NaNs, as numpy's min() propagates them; the
+        # python min() doesn't (it depends on where the NaN is), so
+        # every element is checked
+        if hasattr(times, 'min'):
+            lo = times.min()
+        else:
+            lo = min(times)
+            if any(t != t for t in times):
+                lo = float('nan')
+        if offset is not None and not lo >= 0:
+            errmsg = "simulator.sched_many(offset) negative offset (%r)" % lo
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        elif until is not None and not lo >= self.now:
+            errmsg = "simulator.sched_many(until) earlier than now (%r < %r)" % (lo, self.now)
+            log.error(errmsg)
+            raise ValueError(errmsg)
+
+        # convert numpy arrays (if any) into lists of python objects
+        if hasattr(times, 'tolist'): times = times.tolist()
+        if offset is not None:
+            now = self.now
+            times = [now+t for t in times]
+        if args is None:
+            usr_args = [()]*n
+        else:
+            args = [a.tolist() if hasattr(a, 'tolist') else a for a in args]
+            for a in args:
+                if len(a) != n:
+                    errmsg = "simulator.sched_many() args length mismatch (%d != %d)" % (len(a), n)
+                    log.error(errmsg)
+                    raise ValueError(errmsg)
+            usr_args = list(zip(*args))
+
+        # the cyclic garbage collector would be triggered many times
+        # (for nothing) while creating a large number of events
+        gcon = gc.isenabled()
+        gc.disable()
+        try:
+            self._runtime["scheduled_events"] += n
+            evts = [_DirectEvent(self, t, func, name, None, a, _empty_kwargs)
+                    for t, a in zip(times, usr_args)]
+            self._eventlist.insert_many(evts)
+        finally:
+            if gcon: gc.enable()
+        if self._hooks is not None:
+            for e in evts:
+                self._notify("on_event_scheduled", e)
+        return evts
+
     def cancel(self, o):
         """Cancel a scheduled event or kill a process.
 
@@ -199,17 +406,15 @@ class simulator:
             log.error(errmsg)
             raise ValueError(errmsg)
         elif isinstance(o, _Event):
-            try:
-                self._eventlist.cancel(o)
-            except Exception:
+            if self._eventlist.current_event(o):
+                self._runtime["cancelled_events"] += 1
+                if self._eventlist.cancel(o):
+                    self._runtime["tombstones"] += 1
+                if self._hooks is not None:
+                    self._notify("on_event_cancelled", o)
+            else:
                 # the event is not in the event list; that's OK
-                #log.debug("[r%d] simulator '%s' cancel non-active event from now=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], self.now, self.now))
                 pass
-            else:
-                #log.debug("[r%d] simulator '%s' cancel event at time=%g from now=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], o.time, self.now))
-                self._runtime["cancelled_events"] += 1
         elif isinstance(o, _Process):
             self.kill(o)
         else:
@@ -245,7 +450,7 @@ class simulator:
         # figure out the event time
         if until == None and offset == None:
             # if both are missing, it's now!
-            e.time = self.now
+            time = self.now
         elif until != None and offset != None:
             errmsg = "simulator.resched(until=%r, offset=%r) duplicate specification" % (until, offset)
             log.error(errmsg)
@@ -255,24 +460,24 @@ class simulator:
                 errmsg = "simulator.resched(offset=%r) negative offset" % offset
                 log.error(errmsg)
                 raise ValueError(errmsg)
-            e.time = self.now + offset
+            time = self.now + offset
         elif until < self.now:
             errmsg = "simulator.resched(until=%r) earlier than now (%r)" % (until, self.now)
             log.error(errmsg)
             raise ValueError(errmsg)
-        else: e.time = until
+        else: time = until
 
-        try:
-            self._eventlist.update(e)
-            #log.debug("[r%d] simulator '%s' reschedule event to time=%g from now=%g" %
-            #          (self._simulus.comm_rank, self.name[-4:], e.time, self.now))
-            return e
-        except Exception:
+        if not self._eventlist.current_event(e):
             # the event already happened as it's not in the event list
-            #log.debug("[r%d] simulator '%s' reschedule non-active event from now=%g" %
-            #          (self._simulus.comm_rank, self.name[-4:], self.now))
             return None
 
+        e.time = time
+        if self._eventlist.update(e):
+            self._runtime["tombstones"] += 1
+        if self._hooks is not None:
+            self._notify("on_event_scheduled", e)
+        return e
+
 
     ##############################
     # process scheduling methods #
@@ -294,7 +499,10 @@ class simulator:
         
         Args:
             proc (function): the starting function of the process,
-                which can be an arbitrary user-defined function.
+                which can be an arbitrary user-defined function; if
+                it's an 'async def' function, the process runs as a
+                coroutine (without greenlet), and it must await the
+                blocking calls, e.g., 'await sim.sleep(5)'
 
             args (list): the positional arguments as a list to be
                 passed to the starting function when the process
@@ -359,13 +567,17 @@ class simulator:
             raise ValueError(errmsg)
         else: time = until
 
-        #log.debug("[r%d] simulator '%s' schedule process event at time=%g from now=%g" %
-        #          (self._simulus.comm_rank, self.name[-4:], time, self.now))
+        if inspect.iscoroutinefunction(proc):
+            p = _CoroProcess(self, name, proc, args, kwargs, prio, prio_args)
+        else:
+            # this raises ImportError if greenlet is not installed
+            p = _Process(self, name, proc, args, kwargs, prio, prio_args)
         self._runtime["scheduled_events"] += 1
         self._runtime["initiated_processes"] += 1
-        p = _Process(self, name, proc, args, kwargs, prio, prio_args)
         e = _ProcessEvent(self, time, p, name)
         self._eventlist.insert(e)
+        if self._hooks is not None:
+            self._notify("on_event_scheduled", e)
         return p
 
     def cur_process(self):
@@ -405,15 +617,16 @@ class simulator:
 
             if p.state != _Process.STATE_TERMINATED:
                 # if the process has not been terminated already
-                #log.debug("[r%d] simulator '%s' kill process at time=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], self.now))
                 self._runtime["cancelled_processes"] += 1
+                self._runtime["killed_processes"] += 1
                 p.deactivate(_Process.STATE_TERMINATED)
-                p.trap.trigger()
+                if p._trap is not None:
+                    # someone has waited on the process
+                    p._trap.trigger()
+                if self._hooks is not None:
+                    self._notify("on_process_terminated", p)
             else:
                 # otherwise, it's already killed; we do nothing
-                #log.debug("[r%d] simulator '%s' kill non-active process at time=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], self.now))
                 pass
         else:
             # kill oneself
@@ -422,8 +635,6 @@ class simulator:
                 errmsg = "simulator.kill() outside process context"
                 log.error(errmsg)
                 raise RuntimeError(errmsg)
-            #log.debug("[r%d] simulator '%s' self-kill process at time=%g" %
-            #          (self._simulus.comm_rank, self.name[-4:], self.now))
             self._runtime["cancelled_processes"] += 1
             p.terminate()
 
@@ -545,7 +756,7 @@ class simulator:
 
         # the control will be switched back to the simulator's main
         # event loop (i.e., the process will be putting on hold)...
-        p.sleep(time)
+        return p.sleep(time)
         # the control comes back now; the process resumes execution...
 
 
@@ -586,6 +797,36 @@ class simulator:
             raise ValueError(errmsg)
         return Semaphore(self, initval, qdis)
 
+    def condition(self, predicate, *watched):
+        """Create a condition for processes to wait until a predicate
+        becomes true.
+
+        Args:
+            predicate (function): a function that takes no arguments
+                and returns whether the condition holds
+
+            watched (list): the stores, buckets, and resources that the
+                predicate depends on; the predicate is re-evaluated
+                (only) when one of them changes, or when the
+                condition's notify() method is called
+
+        Returns:
+            This method returns a newly created condition, which is a
+            trappable. See Condition for details.
+
+        """
+
+        if not callable(predicate):
+            errmsg = "simulator.condition(predicate=%r) not callable" % predicate
+            log.error(errmsg)
+            raise TypeError(errmsg)
+        for w in watched:
+            if not hasattr(w, '_watchers') or w._sim is not self:
+                errmsg = "simulator.condition() cannot watch %r" % w
+                log.error(errmsg)
+                raise TypeError(errmsg)
+        return Condition(self, predicate, watched)
+
     def resource(self, capacity=1, qdis=QDIS.FIFO, name=None, collect=None):
         """Create and return a resource.
 
@@ -945,6 +1186,58 @@ class simulator:
             log.error(errmsg)
             raise ValueError(errmsg)
 
+        if len(traps) == 1:
+            return p._block(self._wait_one(p, traps[0], single_trappable, time))
+        return p._block(self._wait(p, traps, single_trappable, time, method))
+
+    def _wait_one(self, p, t, single_trappable, time):
+        """The blocking operation of wait() on only one trappable, which is
+        the same as _wait() without the lists."""
+
+        if not t._try_wait():
+            t._commit_wait()
+            return (True if single_trappable else [True]), False
+        tt = t._true_trappable()
+
+        trigged = timedout = False
+        e = None # this will be the timeout event
+        if time < infinite_time:
+            self._runtime["scheduled_events"] += 1
+            e = _ProcessEvent(self, time, p, p.name)
+            self._eventlist.insert(e)
+            if self._hooks is not None:
+                self._notify("on_event_scheduled", e)
+
+        acting = p.acting_trappables
+        acting.clear()
+        while not trigged:
+            yield
+            for a in acting:
+                if a is not tt:
+                    errmsg = "simulator.wait() unblocked by unexpected trappable %r" % a
+                    log.error(errmsg)
+                    raise ValueError(errmsg)
+                t._commit_wait()
+                trigged = True
+            acting.clear()
+            if e is not None and not self._eventlist.current_event(e):
+                timedout = True
+                break
+
+        if e is not None and not timedout:
+            self._runtime["cancelled_events"] += 1
+            if self._eventlist.cancel(e):
+                self._runtime["tombstones"] += 1
+            if self._hooks is not None:
+                self._notify("on_event_cancelled", e)
+        if not trigged:
+            t._cancel_wait()
+        return (trigged if single_trappable else [trigged]), timedout
+
+    def _wait(self, p, traps, single_trappable, time, method):
+        """The blocking operation of wait() as a generator (see
+        _Process._block())."""
+
         # a mask indicating whether the corresponding trap has been
         # triggered or not; if it is, there's no need to wait
         trigged = [not t._try_wait() for t in traps]
@@ -968,13 +1261,13 @@ class simulator:
             
             # make sure we schedule the timeout event, only once
             if e is None and time < infinite_time:
-                #log.debug("[r%d] simulator '%s' schedule timeout event at time=%g from now=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], time, self.now))
                 self._runtime["scheduled_events"] += 1
                 e = _ProcessEvent(self, time, p, p.name)
                 self._eventlist.insert(e)
+                if self._hooks is not None:
+                    self._notify("on_event_scheduled", e)
             
-            p.suspend()
+            yield
 
             # update the mask (this is a circuitous way to find out
             # which trap in the list of traps is responsible for
@@ -995,10 +1288,11 @@ class simulator:
             
         # cancel the future timeout event
         if e is not None and not timedout:
-            #log.debug("[r%d] simulator '%s' cancel timeout event at time=%g from now=%g" %
-            #          (self._simulus.comm_rank, self.name[-4:], e.time, self.now))
             self._runtime["cancelled_events"] += 1
-            self._eventlist.cancel(e)
+            if self._eventlist.cancel(e):
+                self._runtime["tombstones"] += 1
+            if self._hooks is not None:
+                self._notify("on_event_cancelled", e)
 
         # cancel the try-wait for those untriggered trappables
         [t._cancel_wait() for i, t in enumerate(traps) if not trigged[i]]
@@ -1012,11 +1306,225 @@ class simulator:
         # r = [t for i, t in enumerate(traps) if not trigged[i]]
         
 
+    def waitset(self, traps=()):
+        """Create a wait set for the current process to wait repeatedly for
+        any of a set of trappables to be triggered.
+
+        This method must be called within a process context. The wait
+        set registers the process with the trappables once (rather
+        than each time the process waits, as in the wait() method), so
+        that each wait takes time only in proportion to the number of
+        trappables that have been triggered. See WaitSet for details.
+
+        Args:
+            traps (list, tuple): the trappables (events, processes,
+                traps, semaphores, resources, mailbox receivers, etc.)
+                in the wait set; more can be added later using the
+                wait set's add() method
+
+        Returns:
+            This method returns the newly created wait set, which is
+            owned by the current process.
+
+        """
+
+        p = self.cur_process()
+        if p is None:
+            errmsg = "simulator.waitset() outside process context"
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        if not isinstance(traps, (list, tuple)):
+            errmsg = "simulator.waitset() list of trappables expected"
+            log.error(errmsg)
+            raise TypeError(errmsg)
+        if p._waitset is not None:
+            errmsg = "simulator.waitset() another waitset owned by the process"
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        return WaitSet(self, p, traps)
+
+    ##################
+    # observer hooks #
+    ##################
+
+    def add_hook(self, name, func):
+        """Register a function to be called upon a simulation event.
+
+        The observer hooks let the user watch the progress of the
+        simulation, e.g., for tracing, profiling, or animation. When
+        no hooks are registered (the default), the simulator runs the
+        main event loop without checking for hooks at all.
+
+        Args:
+            name (string): the name of the hook, which can be one of
+                the following: 'on_event_executed' (called after an
+                event has been processed), 'on_event_scheduled'
+                (called after an event has been scheduled or
+                rescheduled, including the wakeup events of the
+                processes and the renewed events of a repeating
+                event), 'on_event_cancelled' (called after a scheduled
+                event has been cancelled), 'on_process_switch' (called
+                right before the simulator switches context to a
+                process), or 'on_process_terminated' (called when a
+                process has finished or been killed)
+
+            func (function): the function to be called with two
+                arguments: the simulator and the event (for the event
+                hooks) or the process (for the process hooks); the
+                same function can be registered more than once, in
+                which case it'll be called as many times
+
+        The hooks for executed events and process switches are picked
+        up by the main event loop when the simulator starts running;
+        if they are added while the simulation is running (e.g., from
+        within an event handler or a process), they take effect at the
+        next call of run() or step().
+
+        """
+
+        if name not in _HOOKS:
+            errmsg = "simulator.add_hook(name=%r) unknown hook" % name
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if not callable(func):
+            errmsg = "simulator.add_hook(func=%r) not callable" % func
+            log.error(errmsg)
+            raise TypeError(errmsg)
+
+        # the functions are kept in tuples, so that a hook can be
+        # added or removed safely while the hooks are being called
+        self._exposed = True
+        if self._hooks is None:
+            self._hooks = {}
+        self._hooks[name] = self._hooks.get(name, ()) + (func,)
+
+    def remove_hook(self, name, func):
+        """Unregister a function previously registered with add_hook().
+
+        If the function has been registered more than once for the
+        same hook, only one registration is removed. Once all hooks
+        are removed, the simulator returns to the hook-free main
+        event loop (the next time it starts running).
+
+        """
+
+        if name not in _HOOKS:
+            errmsg = "simulator.remove_hook(name=%r) unknown hook" % name
+            log.error(errmsg)
+            raise ValueError(errmsg)
+
+        funcs = list(self._hooks.get(name, ())) if self._hooks else []
+        if func not in funcs:
+            errmsg = "simulator.remove_hook(func=%r) not registered for '%s'" % (func, name)
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        funcs.remove(func)
+        if funcs:
+            self._hooks[name] = tuple(funcs)
+        else:
+            del self._hooks[name]
+            if not self._hooks:
+                self._hooks = None
+
+    def _notify(self, name, o):
+        """Call the functions registered for the given hook."""
+
+        hooks = self._hooks
+        if hooks is not None:
+            for func in hooks.get(name, ()):
+                func(self, o)
+
+    def profiler(self):
+        """Return a new profiler for this simulator.
+
+        The profiler collects the call counts, the wall-clock time,
+        and the simulation time spread of the event handlers and the
+        processes while it's active; it's meant to be used as a
+        context manager (or one can call its start() and stop()
+        methods explicitly). See the Profiler class for details.
+
+        """
+        return Profiler(self)
+
+    def progress(self, every=None, interval=None, callback=None, maxlen=1000):
+        """Attach a progress sampler to this simulator and return it.
+
+        While the simulator is running, the sampler periodically
+        takes samples of the wall-clock time, the simulation time, the
+        number of executed events, the number of pending events, and
+        the number of live processes. The samples are used by
+        show_runtime_report() to print the trends of the event rate
+        and the simulation to real time ratio.
+
+        Args:
+            every (int): if provided, a sample is taken every so many
+                executed events
+
+            interval (float): if provided, a sample is taken about
+                every so many seconds of wall-clock time; either
+                'every' or 'interval' (or both) must be provided
+
+            callback (function): if provided, the function is called
+                with the simulator and the sample (a ProgressSample,
+                which is a named tuple with the fields: wall, now,
+                executed, pending, and processes) each time a sample
+                is taken
+
+            maxlen (int): the maximum number of samples kept in the
+                ring buffer (the default is 1000); the oldest samples
+                are dropped
+
+        Returns:
+            This method returns the progress sampler, which can be
+            detached (and re-attached) using its stop() and start()
+            methods; only one sampler can be attached to a simulator
+            at a time.
+
+        """
+
+        prog = Progress(self, every, interval, callback, maxlen)
+        prog.start()
+        return prog
+
+    def trace(self, maxlen=100000, logging=False):
+        """Attach a tracer to this simulator and return it.
+
+        The tracer records the activities of the simulator (such as
+        scheduling, cancelling, and executing events, switching
+        context to processes, and the producers and consumers getting
+        blocked and unblocked at the stores) as tuples, which are
+        formatted only when they are printed out. See the Tracer class
+        for details.
+
+        Args:
+            maxlen (int): the maximum number of trace records kept in
+                the ring buffer (the default is 100000); the oldest
+                records are dropped
+
+            logging (bool): if True, the trace records are also logged
+                at the debug level as they are recorded (the default
+                is False)
+
+        Returns:
+            This method returns the tracer, which can be detached
+            (and re-attached) using its stop() and start() methods;
+            if a tracer has already been attached to the simulator
+            (e.g., with the '-vv' command-line option), the existing
+            tracer is returned instead.
+
+        """
+
+        if self._tracer is not None:
+            return self._tracer
+        tr = Tracer(self, maxlen, logging)
+        tr.start()
+        return tr
+
     ######################
     # running simulation #
     ######################
     
-    def run(self, offset=None, until=None):
+    def run(self, offset=None, until=None, profile=False):
         """Run simulation and process events.
 
         This method processes the events in timestamp order and
@@ -1045,8 +1553,19 @@ class simulator:
         provided, the simulator will advance to the time of the last
         processed event.
 
+        If 'profile' is True, the wall-clock time spent by the event
+        handlers and the processes is profiled during the run, and
+        the method returns the profiler (see profiler()); otherwise,
+        the method returns None.
+
         """
 
+        if profile:
+            prof = self.profiler()
+            with prof:
+                self.run(offset, until)
+            return prof
+
         if self._insync:
             self._insync.run(offset, until)
             return
@@ -1080,11 +1599,12 @@ class simulator:
         'updating_until' is true, update the simulation clock to
         'until' after processing all the events."""
         
-        # this is the main event loop of the simulator!
-        while len(self._eventlist) > 0:
-            t = self._eventlist.get_min()
-            if t >= upper: break
-            self._process_one_event()
+        if self._profiler is not None:
+            self._run_profiled(upper)
+        elif self._hooks is not None:
+            self._run_hooked(upper)
+        else:
+            self._run_lean(upper)
 
         # after all the events, make sure we don't wind back the clock
         # if upper (set by either 'until' or 'offset') has been
@@ -1093,6 +1613,157 @@ class simulator:
             self._eventlist.last = upper
             self.now = upper
 
+    def _poll_progress(self, nevts):
+        """Poll the progress sampler (if any) from the main event loop,
+        given the number of events executed in the loop so far, and
+        return the number of events till the next poll."""
+
+        if self._progress is None:
+            return _NEVER
+        return self._progress._poll(self._runtime["executed_events"]+nevts)
+
+    def _run_lean(self, upper):
+        """The main event loop without observer hooks."""
+
+        # this is the main event loop of the simulator! it does the
+        # same as _process_one_event() for each event, but the event
+        # list is asked for the next event only once, and the
+        # counters are kept in local variables until the loop ends
+        delete_min_before = self._eventlist.delete_min_before
+        readyq = self._readyq
+        popleft = readyq.popleft
+        nevts = nctxs = 0
+        check = self._poll_progress(0)
+        try:
+            while True:
+                e = delete_min_before(upper)
+                if e is None: break
+                self.now = e.time
+                nevts += 1
+                if e.trap is not None:
+                    e.trap.trigger()
+                e._fire()
+
+                # processes are run only from the main loop!!
+                if readyq:
+                    while readyq:
+                        p = popleft()
+                        if p.state == _Process.STATE_RUNNING:
+                            self._theproc = p
+                            nctxs += 1
+                            p.run()
+                        else:
+                            # process is killed while in the ready queue
+                            assert p.state == _Process.STATE_TERMINATED
+                    self._theproc = None
+
+                # the progress sampler (if any) is polled only once in
+                # a while; otherwise, check never comes
+                if nevts >= check:
+                    check = nevts+self._poll_progress(nevts)
+        finally:
+            self._runtime["executed_events"] += nevts
+            self._runtime["process_contexts"] += nctxs
+
+    def _run_hooked(self, upper):
+        """The main event loop with observer hooks."""
+
+        # same as _run_lean(), except that the hooks are looked up
+        # again for each event (as they may be changed by the event
+        # handlers and the processes)
+        delete_min_before = self._eventlist.delete_min_before
+        readyq = self._readyq
+        popleft = readyq.popleft
+        nevts = nctxs = 0
+        check = self._poll_progress(0)
+        try:
+            while True:
+                e = delete_min_before(upper)
+                if e is None: break
+                self.now = e.time
+                nevts += 1
+                if e.trap is not None:
+                    e.trap.trigger()
+                e._fire()
+                if self._hooks is not None:
+                    self._notify("on_event_executed", e)
+
+                # processes are run only from the main loop!!
+                if readyq:
+                    while readyq:
+                        p = popleft()
+                        if p.state == _Process.STATE_RUNNING:
+                            self._theproc = p
+                            nctxs += 1
+                            if self._hooks is not None:
+                                self._notify("on_process_switch", p)
+                            p.run()
+                        else:
+                            # process is killed while in the ready queue
+                            assert p.state == _Process.STATE_TERMINATED
+                    self._theproc = None
+
+                # the progress sampler (if any) is polled only once in
+                # a while; otherwise, check never comes
+                if nevts >= check:
+                    check = nevts+self._poll_progress(nevts)
+        finally:
+            self._runtime["executed_events"] += nevts
+            self._runtime["process_contexts"] += nctxs
+
+    def _run_profiled(self, upper):
+        """The main event loop with the profiler (and observer hooks)."""
+
+        # same as _run_hooked(), except that the event handlers and
+        # the processes are timed (excluding the hooks)
+        record = self._profiler._record
+        clock = time.perf_counter
+        delete_min_before = self._eventlist.delete_min_before
+        readyq = self._readyq
+        popleft = readyq.popleft
+        nevts = nctxs = 0
+        check = self._poll_progress(0)
+        try:
+            while True:
+                e = delete_min_before(upper)
+                if e is None: break
+                self.now = e.time
+                nevts += 1
+                if e.trap is not None:
+                    e.trap.trigger()
+                t = clock()
+                e._fire()
+                t = clock()-t
+                if e.__class__ is _DirectEvent:
+                    record("event", e.func, t, self.now)
+                if self._hooks is not None:
+                    self._notify("on_event_executed", e)
+
+                # processes are run only from the main loop!!
+                if readyq:
+                    while readyq:
+                        p = popleft()
+                        if p.state == _Process.STATE_RUNNING:
+                            self._theproc = p
+                            nctxs += 1
+                            if self._hooks is not None:
+                                self._notify("on_process_switch", p)
+                            t = clock()
+                            p.run()
+                            record("process", p.func, clock()-t, self.now)
+                        else:
+                            # process is killed while in the ready queue
+                            assert p.state == _Process.STATE_TERMINATED
+                    self._theproc = None
+
+                # the progress sampler (if any) is polled only once in
+                # a while; otherwise, check never comes
+                if nevts >= check:
+                    check = nevts+self._poll_progress(nevts)
+        finally:
+            self._runtime["executed_events"] += nevts
+            self._runtime["process_contexts"] += nctxs
+
     def step(self):
         """Process only one event.
 
@@ -1126,8 +1797,6 @@ class simulator:
         
         e = self._eventlist.delete_min()
         self.now = e.time
-        #log.debug("[r%d] simulator '%s' execute event at time %g" %
-        #          (self._simulus.comm_rank, self.name[-4:], self.now))
         self._runtime["executed_events"] += 1
 
         # trigger the trap if the event already has a trap; this is a
@@ -1136,32 +1805,35 @@ class simulator:
         # method) are attached with a trap
         if e.trap is not None:
             e.trap.trigger()
-            
-        if isinstance(e, _DirectEvent):
-            if e.repeat_intv is not None:
-                # note that a renewed event is not trappable
-                e = e.renew(e.time+e.repeat_intv)
-                #log.debug("[r%d] simulator '%s' schedule repeated event at time=%g from now=%g" %
-                #          (self._simulus.comm_rank, self.name[-4:], e.time, self.now))
-                self._runtime["scheduled_events"] += 1
-                self._eventlist.insert(e)
-            e.func(*e.args, **e.kwargs)
-        elif isinstance(e, _ProcessEvent):
-            e.proc.activate()
+
+        # the event carries out its action according to its type
+        # (e.g., calling the function of a direct event, or activating
+        # the process of a process event)
+        prof = self._profiler
+        if prof is not None:
+            t = time.perf_counter()
+            e._fire()
+            if e.__class__ is _DirectEvent:
+                prof._record("event", e.func, time.perf_counter()-t, self.now)
         else:
-            errmsg = "unknown event type: " + str(e)
-            log.error(errmsg)
-            raise RuntimeError(errmsg)
+            e._fire()
+        if self._hooks is not None:
+            self._notify("on_event_executed", e)
 
         # processes are run only from the main loop!!
         while len(self._readyq) > 0:
             p = self._readyq.popleft()
             if p.state == _Process.STATE_RUNNING:
                 self._theproc = p
-                #log.debug("[r%d] simulator '%s' context switch at time %g" %
-                #          (self._simulus.comm_rank, self.name[-4:], self.now))
                 self._runtime["process_contexts"] += 1
-                p.run()
+                if self._hooks is not None:
+                    self._notify("on_process_switch", p)
+                if prof is not None:
+                    t = time.perf_counter()
+                    p.run()
+                    prof._record("process", p.func, time.perf_counter()-t, self.now)
+                else:
+                    p.run()
             else:
                 # process is killed while in the ready queue
                 assert p.state == _Process.STATE_TERMINATED
@@ -1212,6 +1884,68 @@ class simulator:
     #         self._fast_rng = _FastRNG(int(u.int/2**32))
     #     return self._fast_rng
 
+    def calendar(self, start=0, limit=100):
+        """Return a page of the future events currently on the event list.
+
+        Args:
+            start (int): the position of the first event to be
+                returned; the next event to be processed is at
+                position 0 (the default)
+
+            limit (int): the maximum number of events to be returned
+                (the default is 100); if it's None, all events from
+                the start position are returned
+
+        Returns:
+            This method returns a list of the future events, in the
+            order they will be processed. The events are the same as
+            those returned by sched(), for example, which can be used
+            to cancel or reschedule the events.
+
+        The events are listed without copying or sorting the whole
+        event list (except for the timing wheel, which has to sort
+        its events); getting the first few pages is therefore cheap
+        even for a very large number of events.
+
+        """
+
+        if start < 0:
+            errmsg = "simulator.calendar(start=%r) negative start" % start
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        if limit is not None and limit < 0:
+            errmsg = "simulator.calendar(limit=%r) negative limit" % limit
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        self._exposed = True
+        return self._eventlist.page(start, limit)
+
+    def snapshot(self):
+        """Return a snapshot of the future events currently on the event
+        list.
+
+        The snapshot is copy-on-write: it shares the event list with
+        the simulator until the simulator is about to change the event
+        list (e.g., to process the next event, or to schedule a new
+        one); only then are the events copied to the snapshot, which
+        takes O(n) time. The snapshot can therefore be taken at any
+        time, and inspected at leisure, for example, by a monitoring
+        tool, while the simulation goes on.
+
+        Returns:
+            This method returns a snapshot object, with the attribute
+            'now' (the simulation time at which the snapshot is
+            taken), and the method calendar(start, limit), which
+            works like that of the simulator. The length of the
+            snapshot is the number of events; iterating over the
+            snapshot yields the events in the order they would be
+            processed.
+
+        """
+
+        self._exposed = True
+        return self._eventlist.snapshot(self.now)
+
     def show_calendar(self):
         """Print the list of all future events currently on the event
         list. This is an expensive operation and should be used
@@ -1220,19 +1954,8 @@ class simulator:
         print("list of all future events (num=%d) at time %g on simulator '%s':" %
               (len(self._eventlist), self.now, self.name if self.name else ''))
         
-        #dic = self._eventlist.EvtDict  #dict having buc indices as key, pos in that buc as values
-        l = []
-        for i in range(len(self._eventlist.sd)):
-            #for j in range(len(self._eventlist.cqueue.m_buckets[i])):
-                #l.append(self._eventlist.cqueue.m_buckets[i][j].time)
-            l.append(self._eventlist.sd.values()[i])
-        #print("Dictionary Here ")
-        
-
-        for e in sorted(l):
+        for _, e in self._eventlist.ordered():
             print("  %s" % e)
-        #for e in sorted(self._eventlist.pqueue.values()):
-            #print("  %s" % e)
 
     def show_runtime_report(self, prefix=''):
         """Print a report on the simulator's runtime performance.
@@ -1255,7 +1978,17 @@ class simulator:
         print('%sexecuted events: %d (rate=%g)' %
               (prefix, self._runtime["executed_events"], self._runtime["executed_events"]/t))
         print('%scancelled events: %d' % (prefix, self._runtime["cancelled_events"]))
+        print('%stombstones: %d (pending=%d, compactions=%d)' %
+              (prefix, self._runtime["tombstones"], self._eventlist.tombstones,
+               self._eventlist.compactions))
+        if isinstance(self._eventlist, _SpillEventList_):
+            print('%sspilled events: %d (pending=%d, segments read back=%d)' %
+                  (prefix, self._eventlist.spills, self._eventlist.spilled,
+                   self._eventlist.pageins))
         print('%screated processes: %d' % (prefix, self._runtime["initiated_processes"]))
         print('%sfinished processes: %d' % (prefix, self._runtime["terminated_processes"]))
         print('%scancelled processes: %d' % (prefix, self._runtime["cancelled_processes"]))
+        print('%skilled processes: %d' % (prefix, self._runtime["killed_processes"]))
         print('%sprocess context switches: %d' % (prefix, self._runtime["process_contexts"]))
+        if self._progress is not None and len(self._progress) > 0:
+            self._progress.report(prefix=prefix)
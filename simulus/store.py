@@ -78,6 +78,7 @@ class Store(object):
         self.level = initlevel # nonnegative, no more than capacity
         self.name = name
         self.stats = dc
+        self._watchers = None # the conditions watching the level
 
         # internally, we use two semaphores; one for producer and one
         # for consumer
@@ -169,21 +170,25 @@ class Store(object):
             errmsg = "store.get(amt=%r) requires positive amount" % amt
             log.error(errmsg)
             raise ValueError(errmsg)
+        return p._block(self._get(p, amt))
+
+    def _get(self, p, amt):
+        """The blocking operation of get() as a generator (see
+        _Process._block())."""
 
         self._make_c_arrival(p, amt)
 
         # the consumer must be blocked if there isn't enough quantity
         # in the store
         if amt > self.level:
-            #log.debug('consumer get(amt=%r) blocked from store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
-            self._c_sem.wait()
-            #log.debug('consumer get(amt=%r) unblocked from store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("get-blocked", self, amt, self.level)
+            yield from self._c_sem._wait(p)
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("get-unblocked", self, amt, self.level)
         else:
-            #log.debug('no consumer blocked to get(amt=%r) from store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
-            pass
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("get", self, amt, self.level)
 
         # the get amount can be satisfied now if the consumer process
         # reaches here; we lower the level and unblock as many
@@ -195,8 +200,8 @@ class Store(object):
             # if the producer process to be unblocked next has room
             # now for the put amount, we unblock it
             if self._p_arrivals[np][1] + lvl <= self.capacity:
-                #log.debug('consumer get(amt=%r) unblocks producer put(amt=%r) in store (level=%r)' %
-                #          (amt, self._p_arrivals[np][1], self.level))
+                if self._sim._tracer is not None:
+                    self._sim._tracer.record("get-unblocks-put", self, amt, self._p_arrivals[np][1], self.level)
                 lvl += self._p_arrivals[np][1]
                 self._p_sem.signal()
                 np = self._p_sem._next_unblock()
@@ -255,21 +260,25 @@ class Store(object):
                     errmsg = "store.put(amt=%r, obj=%r) unmatched objects" % (amt, obj)
                     log.error(errmsg)
                     raise ValueError(errmsg)
-            
+        return p._block(self._put(p, amt, obj))
+
+    def _put(self, p, amt, obj):
+        """The blocking operation of put() as a generator (see
+        _Process._block())."""
+
         self._make_p_arrival(p, amt, obj)
 
         # the producer will be blocked if the put amount would
         # overflow the store
         if amt + self.level > self.capacity:
-            #log.debug('producer put(amt=%r) blocked from store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
-            self._p_sem.wait()
-            #log.debug('producer put(amt=%r) unblocked from store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("put-blocked", self, amt, self.level)
+            yield from self._p_sem._wait(p)
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("put-unblocked", self, amt, self.level)
         else:
-            #log.debug('no producer blocked to put(amt=%r) to store (level=%r) at %g' %
-            #          (amt, self.level, self._sim.now))
-            pass
+            if self._sim._tracer is not None:
+                self._sim._tracer.record("put", self, amt, self.level)
             
         # the put amount can be satisfied now if the producer process
         # reaches here; we increase the level and unblock as many
@@ -281,8 +290,8 @@ class Store(object):
             # if the consumer process to be unblocked next has enough
             # quantity in store now for the get amount, we unblock it
             if self._c_arrivals[nc][1] <= lvl:
-                #log.debug('producer put(amt=%r) unblocks consumer get(amt=%r) in store (level=%r)' %
-                #          (amt, self._c_arrivals[nc][1], self.level))
+                if self._sim._tracer is not None:
+                    self._sim._tracer.record("put-unblocks-get", self, amt, self._c_arrivals[nc][1], self.level)
                 lvl -= self._c_arrivals[nc][1]
                 self._c_sem.signal()
                 nc = self._c_sem._next_unblock()
@@ -327,27 +336,27 @@ class Store(object):
                 # the consumer will be blocked if there isn't enough
                 # quantity in the store
                 if self._amt > self._store.level:
-                    #log.debug('consumer try-get(amt=%r) blocked from store (level=%r) at %g' %
-                    #          (self._amt, self._store.level, self._store._sim.now))
+                    if self._store._sim._tracer is not None:
+                        self._store._sim._tracer.record("try-get-blocked", self._store, self._amt, self._store.level)
                     return self._store._c_sem._try_wait() # must be True
                 else:
-                    #log.debug('no consumer blocked to try-get(amt=%r) from store (level=%r) at %g' %
-                    #          (self._amt, self._store.level, self._store._sim.now))
+                    if self._store._sim._tracer is not None:
+                        self._store._sim._tracer.record("try-get", self._store, self._amt, self._store.level)
                     return False
 
             def _cancel_wait(self):
                 p = self._store._sim.cur_process()
                 assert p is not None
                 self._store._make_c_renege(p)
-                #log.debug('consumer cancels try-get(amt=%r) from store (level=%r) at %g' %
-                #          (self._amt, self._store.level, self._store._sim.now))
+                if self._store._sim._tracer is not None:
+                    self._store._sim._tracer.record("try-get-cancelled", self._store, self._amt, self._store.level)
                 self._store._c_sem._cancel_wait()
 
             def _commit_wait(self):
                 p = self._store._sim.cur_process()
                 assert p is not None
-                #log.debug('consumer try-get(amt=%r) unblocked from store (level=%r) at %g' %
-                #          (self._amt, self._store.level, self._store._sim.now))
+                if self._store._sim._tracer is not None:
+                    self._store._sim._tracer.record("try-get-unblocked", self._store, self._amt, self._store.level)
 
                 # the get amount can be satisfied if the consumer
                 # process reaches here; we lower the level and unblock
@@ -359,8 +368,8 @@ class Store(object):
                     # if the producer process to be unblocked next has
                     # room now for the put amount, we unblock it
                     if self._store._p_arrivals[np][1] + lvl <= self._store.capacity:
-                        #log.debug('consumer try-get(amt=%r) unblocks producer put(amt=%r) in store (level=%r)' %
-                        #          (self._amt, self._store._p_arrivals[np][1], self._store.level))
+                        if self._store._sim._tracer is not None:
+                            self._store._sim._tracer.record("try-get-unblocks-put", self._store, self._amt, self._store._p_arrivals[np][1], self._store.level)
                         lvl += self._store._p_arrivals[np][1]
                         self._store._p_sem.signal()
                         np = self._store._p_sem._next_unblock()
@@ -428,27 +437,27 @@ class Store(object):
                 # the producer must be blocked if the put amount would
                 # overflow the store
                 if self._amt + self._store.level > self._store.capacity:
-                    #log.debug('producer try-put(amt=%r) blocked from store (level=%r) at %g' %
-                    #          (self._amt, self._store.level, self._store._sim.now))
+                    if self._store._sim._tracer is not None:
+                        self._store._sim._tracer.record("try-put-blocked", self._store, self._amt, self._store.level)
                     return self._store._p_sem._try_wait() # must be True
                 else:
-                    #log.debug('no producer blocked to try-put(amt=%r) to store (level=%r) at %g' %
-                    #          (self._amt, self._store.level, self._store._sim.now))
+                    if self._store._sim._tracer is not None:
+                        self._store._sim._tracer.record("try-put", self._store, self._amt, self._store.level)
                     return False
 
             def _cancel_wait(self):
                 p = self._store._sim.cur_process()
                 assert p is not None
                 self._store._make_p_renege(p)
-                #log.debug('producer cancels try-put(amt=%r) to store (level=%r) at %g' %
-                #          (self._amt, self._store.level, self._store._sim.now))
+                if self._store._sim._tracer is not None:
+                    self._store._sim._tracer.record("try-put-cancelled", self._store, self._amt, self._store.level)
                 self._store._p_sem._cancel_wait()
 
             def _commit_wait(self):
                 p = self._store._sim.cur_process()
                 assert p is not None
-                #log.debug('producer try-put(amt=%r) unblocked from store (level=%r) at %g' %
-                #          (self._amt, self._store.level, self._store._sim.now))
+                if self._store._sim._tracer is not None:
+                    self._store._sim._tracer.record("try-put-unblocked", self._store, self._amt, self._store.level)
 
                 # the put amount can be satisfied now if the producer
                 # process reaches here; we increase the level and
@@ -461,8 +470,8 @@ class Store(object):
                     # enough quantity in store now for the get amount,
                     # we unblock it
                     if self._store._c_arrivals[nc][1] <= lvl:
-                        #log.debug('producer try-put(amt=%r) unblocks consumer get(amt=%r) in store (level=%r)' %
-                        #          (self._amt, self._store._c_arrivals[nc][1], self._store.level))
+                        if self._store._sim._tracer is not None:
+                            self._store._sim._tracer.record("try-put-unblocks-get", self._store, self._amt, self._store._c_arrivals[nc][1], self._store.level)
                         lvl -= self._store._c_arrivals[nc][1]
                         self._store._c_sem.signal()
                         nc = self._store._c_sem._next_unblock()
@@ -532,6 +541,8 @@ class Store(object):
             self.stats._sample("put_times", self._sim.now-t)
             self.stats._sample("put_queues", (self._sim.now, len(self._p_arrivals)))
             self.stats._sample("levels", (self._sim.now, self.level))
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
             
     def _make_c_departure(self, p, amt):
         t,a = self._c_arrivals.pop(p) # throw a KeyError if not in dictionary
@@ -540,11 +551,15 @@ class Store(object):
             self.stats._sample("get_times", self._sim.now-t)
             self.stats._sample("get_queues", (self._sim.now, len(self._c_arrivals)))
             self.stats._sample("levels", (self._sim.now, self.level))
+        ret = None
         if self._obj_store is not None:
             if amt == 1: 
-                return self._obj_store.popleft()
+                ret = self._obj_store.popleft()
             else:
                 ret = []
                 for _ in range(amt):
                     ret.append(self._obj_store.popleft())
-                return ret
+        # the watchers must see the objects gone with the level
+        if self._watchers is not None:
+            for c in self._watchers: c.notify()
+        return ret
@@ -408,8 +408,6 @@ class sync(object):
                 else:
                     for s in range(1, len(self._local_partitions)):
                         self._local_queues[s].put(horizon)
-            #log.debug("[r%d] sync._run(pid='%d'): sync window [%g:%g]" %
-            #          (sync._simulus.comm_rank, pid, self.now, horizon))
 
             # if there's no more event anywhere, and the upper was not
             # specified, it means we can simply stop by now, the
@@ -420,9 +418,10 @@ class sync(object):
 
             # bring all local simulators' time to horizon
             for s in run_sims:
-                #log.debug("[r%d] sync._run(): simulator '%s' execute [%g:%g]" %
-                #          (sync._simulus.comm_rank, s[-4:], self._local_sims[s].now, horizon))
-                self._local_sims[s]._run(horizon, True)
+                sim = self._local_sims[s]
+                if sim._tracer is not None:
+                    sim._tracer.record("sync-window", self, sim.now, horizon)
+                sim._run(horizon, True)
             self.now = horizon
 
             # distribute remote messages:
@@ -430,14 +429,10 @@ class sync(object):
             # first, gather remote messages from processes
             if len(self._local_partitions) > 1:
                 if pid > 0:
-                    #log.debug("[r%d] sync._run(pid=%d): put %r to pid 0" %
-                    #          (sync._simulus.comm_rank, pid, self._remote_msgbuf))
                     self._local_queues[0].put(self._remote_msgbuf)
                 else:
                     for s in range(1, len(self._local_partitions)):
                         x = self._local_queues[0].get()
-                        #log.debug("[r%d] sync._run(pid=0): get %r" %
-                        #          (sync._simulus.comm_rank, x))
                         for r in x.keys():
                             self._remote_msgbuf[r].extend(x[r])
                         
@@ -447,15 +442,11 @@ class sync(object):
                     incoming = sync._simulus.alltoall(self._remote_msgbuf)
                 else:
                     incoming = self._remote_msgbuf[0]
-                #log.debug("[r%d] sync._run(pid=0): all-to-all incoming=%r" %
-                #          (sync._simulus.comm_rank, incoming))
             
             # third, scatter messages to target processes
             if len(self._local_partitions) > 1:
                 if pid > 0:
                     incoming = self._local_queues[pid].get()
-                    #log.debug("[r%d] sync._run(pid=%d): get %r" %
-                    #              (sync._simulus.comm_rank, pid, incoming))
                 else:
                     pmsgs = defaultdict(list)
                     if incoming is not None:
@@ -466,11 +457,7 @@ class sync(object):
                             pmsgs[self._local_pids[s]].append(m)
                     for s in range(1, len(self._local_partitions)):
                         self._local_queues[s].put(pmsgs[s])
-                        #log.debug("[r%d] sync._run(pid=%d): put %r to pid %d" %
-                        #          (sync._simulus.comm_rank, pid, pmsgs[s], s))
                     incoming = pmsgs[0]
-                    #log.debug("[r%d] sync._run(pid=%d): keep %r" %
-                    #          (sync._simulus.comm_rank, pid, incoming))
             
             if incoming is not None:
                 for until, mbname, part, msg in incoming:
@@ -497,6 +484,30 @@ class sync(object):
                 self._local_queues[s].put(2) # stop command
             for p in self._child_procs: p.join()
 
+    def add_hook(self, name, func):
+        """Register a function to be called upon a simulation event for all
+        local simulators in the synchronized group.
+
+        This is the same as calling add_hook() on each of the local
+        simulators (see simulator.add_hook()); the function is called
+        with the simulator on which the event happens as the first
+        argument. If SMP is enabled, the hooks must be added before
+        the group starts running, since the simulators are run in
+        separate processes; if SPMD is enabled, the hooks are added
+        only to the simulators on the local rank.
+
+        """
+
+        for sname, sim in self._local_sims.items():
+            sim.add_hook(name, func)
+
+    def remove_hook(self, name, func):
+        """Unregister a function previously registered with add_hook() from
+        all local simulators in the synchronized group."""
+
+        for sname, sim in self._local_sims.items():
+            sim.remove_hook(name, func)
+
     def send(self, sim, mbox_name, msg, delay=None, part=0):
         """Send a messsage from a simulator to a named mailbox.
 
@@ -575,15 +586,15 @@ class sync(object):
                 mbox = self._local_mboxes[mbox_name]
                 until = sim.now+delay
                 mbox._sim.sched(mbox._mailbox_event, msg, part, until=until)
-                #log.debug("[r%d] sync.send(sim='%s') to local mailbox '%s': msg=%r, delay=%g (until=%g), part=%d" %
-                #          (sync._simulus.comm_rank, sim.name[-4:], mbox_name, msg, delay, until, part))
+                if sim._tracer is not None:
+                    sim._tracer.record("send-local", self, mbox_name, msg, delay, part)
             else:
                 until = sim.now+delay
                 self._remote_msgbuf[self._all_sims[sname]].append((until, mbox_name, part, msg))
                 if self._remote_future > until:
                     self._remote_future = until
-                #log.debug("[r%d] sync.send(sim='%s') to remote mailbox '%s' on simulator '%s': msg=%r, delay=%g, part=%d" %
-                #          (sync._simulus.comm_rank, sim.name[-4:], mbox_name, sname[-4:], msg, delay, part))
+                if sim._tracer is not None:
+                    sim._tracer.record("send-remote", self, mbox_name, sname, msg, delay, part)
         else:
             errmsg = "sync.send() to mailbox named '%s' not found" % mbox_name
             log.error(errmsg)
@@ -650,9 +661,11 @@ class sync(object):
             "sims": self._local_pids.copy(),
             "scheduled_events": 0,
             "cancelled_events": 0,
+            "tombstones": 0,
             "executed_events": 0,
             "initiated_processes": 0,
             "cancelled_processes": 0,
+            "killed_processes": 0,
             "process_contexts": 0,
             "terminated_processes": 0,
         }
@@ -662,9 +675,11 @@ class sync(object):
                 sync_rt["start_clock"] = rt["start_clock"]
             sync_rt["scheduled_events"] += rt["scheduled_events"]
             sync_rt["cancelled_events"] += rt["cancelled_events"]
+            sync_rt["tombstones"] += rt["tombstones"]
             sync_rt["executed_events"] += rt["executed_events"]
             sync_rt["initiated_processes"] += rt["initiated_processes"]
             sync_rt["cancelled_processes"] += rt["cancelled_processes"]
+            sync_rt["killed_processes"] += rt["killed_processes"]
             sync_rt["process_contexts"] += rt["process_contexts"]
             sync_rt["terminated_processes"] += rt["terminated_processes"]
             
@@ -678,9 +693,11 @@ class sync(object):
                         sync_rt["start_clock"] = rt["start_clock"]
                     sync_rt["scheduled_events"] += rt["scheduled_events"]
                     sync_rt["cancelled_events"] += rt["cancelled_events"]
+                    sync_rt["tombstones"] += rt["tombstones"]
                     sync_rt["executed_events"] += rt["executed_events"]
                     sync_rt["initiated_processes"] += rt["initiated_processes"]
                     sync_rt["cancelled_processes"] += rt["cancelled_processes"]
+                    sync_rt["killed_processes"] += rt["killed_processes"]
                     sync_rt["process_contexts"] += rt["process_contexts"]
                     sync_rt["terminated_processes"] += rt["terminated_processes"]
 
@@ -694,9 +711,11 @@ class sync(object):
                     sync_rt["sims"].update(rt["sims"])
                     sync_rt["scheduled_events"] += rt["scheduled_events"]
                     sync_rt["cancelled_events"] += rt["cancelled_events"]
+                    sync_rt["tombstones"] += rt["tombstones"]
                     sync_rt["executed_events"] += rt["executed_events"]
                     sync_rt["initiated_processes"] += rt["initiated_processes"]
                     sync_rt["cancelled_processes"] += rt["cancelled_processes"]
+                    sync_rt["killed_processes"] += rt["killed_processes"]
                     sync_rt["process_contexts"] += rt["process_contexts"]
                     sync_rt["terminated_processes"] += rt["terminated_processes"]
 
@@ -713,7 +732,9 @@ class sync(object):
             print('%sexecuted events: %d (rate=%g)' %
                   (prefix, sync_rt["executed_events"], sync_rt["executed_events"]/t))
             print('%scancelled events: %d' % (prefix, sync_rt["cancelled_events"]))
+            print('%stombstones: %d' % (prefix, sync_rt["tombstones"]))
             print('%screated processes: %d' % (prefix, sync_rt["initiated_processes"]))
             print('%sfinished processes: %d' % (prefix, sync_rt["terminated_processes"]))
             print('%scancelled processes: %d' % (prefix, sync_rt["cancelled_processes"]))
+            print('%skilled processes: %d' % (prefix, sync_rt["killed_processes"]))
             print('%sprocess context switches: %d' % (prefix, sync_rt["process_contexts"]))
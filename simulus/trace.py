@@ -0,0 +1,184 @@
+"""Tracing the activities of a simulator."""
+
+import sys
+from collections import deque
+
+__all__ = ["Tracer"]
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+# each trace record is a tuple: (kind, now, sim_name, obj_id, *info),
+# where 'kind' is one of the following keys, 'now' is the simulation
+# time, 'sim_name' is the name of the simulator, 'obj_id' is the id()
+# of the object involved (an event, a process, a store, or a sync
+# group), and 'info' is formatted according to the corresponding
+# format string, only when the record is printed out
+_FORMATS = {
+    # simulator (recorded using the observer hooks)
+    "schedule": "schedule event '%s' at time=%g",
+    "cancel": "cancel event '%s' at time=%g",
+    "execute": "execute event '%s'",
+    "switch": "context switch to process '%s'",
+    "terminate": "process '%s' terminated",
+
+    # store
+    "get-blocked": "consumer get(amt=%r) blocked from store (level=%r)",
+    "get-unblocked": "consumer get(amt=%r) unblocked from store (level=%r)",
+    "get": "no consumer blocked to get(amt=%r) from store (level=%r)",
+    "get-unblocks-put": "consumer get(amt=%r) unblocks producer put(amt=%r) in store (level=%r)",
+    "put-blocked": "producer put(amt=%r) blocked from store (level=%r)",
+    "put-unblocked": "producer put(amt=%r) unblocked from store (level=%r)",
+    "put": "no producer blocked to put(amt=%r) to store (level=%r)",
+    "put-unblocks-get": "producer put(amt=%r) unblocks consumer get(amt=%r) in store (level=%r)",
+    "try-get-blocked": "consumer try-get(amt=%r) blocked from store (level=%r)",
+    "try-get": "no consumer blocked to try-get(amt=%r) from store (level=%r)",
+    "try-get-cancelled": "consumer cancels try-get(amt=%r) from store (level=%r)",
+    "try-get-unblocked": "consumer try-get(amt=%r) unblocked from store (level=%r)",
+    "try-get-unblocks-put": "consumer try-get(amt=%r) unblocks producer put(amt=%r) in store (level=%r)",
+    "try-put-blocked": "producer try-put(amt=%r) blocked from store (level=%r)",
+    "try-put": "no producer blocked to try-put(amt=%r) to store (level=%r)",
+    "try-put-cancelled": "producer cancels try-put(amt=%r) to store (level=%r)",
+    "try-put-unblocked": "producer try-put(amt=%r) unblocked from store (level=%r)",
+    "try-put-unblocks-get": "producer try-put(amt=%r) unblocks consumer get(amt=%r) in store (level=%r)",
+
+    # sync group
+    "sync-window": "execute sync window [%g:%g]",
+    "send-local": "send to local mailbox '%s': msg=%r, delay=%g, part=%d",
+    "send-remote": "send to remote mailbox '%s' on simulator '%s': msg=%r, delay=%g, part=%d",
+}
+
+# all print-out lines start with the rank, the simulation time, the
+# (last four characters of the) simulator name, and the object id
+_PREFIX = "[r%d] %g: simulator '%s' obj=%x: "
+
+class Tracer(object):
+    """A tracer records the activities of a simulator as they happen.
+
+    A tracer is created and attached to a simulator by calling the
+    simulator's trace() method; it's also attached automatically to
+    every simulator if simulus is run with the '-vv' (or '--debug')
+    command-line option, in which case the trace records are also
+    logged at the debug level. One can detach (and re-attach) the
+    tracer at any time using its stop() and start() methods.
+
+    The trace records are kept as tuples in a ring buffer; they are
+    formatted only when they are printed out (or logged). When no
+    tracer is attached to a simulator, the simulator runs without
+    tracing overhead: the events and processes are traced using the
+    observer hooks (see simulator.add_hook()), and elsewhere each
+    trace point is guarded by a single check of the simulator's
+    tracer.
+
+    """
+
+    def __init__(self, sim, maxlen, logging):
+        self._sim = sim
+        self._rank = sim._simulus.comm_rank
+        self._records = deque(maxlen=maxlen)
+        self.logging = logging
+
+    def __len__(self):
+        return len(self._records)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Attach the tracer to the simulator (only one tracer can be
+        attached to a simulator at a time)."""
+
+        sim = self._sim
+        if sim._tracer is self:
+            return
+        if sim._tracer is not None:
+            errmsg = "tracer.start() another tracer active on simulator '%s'" % sim.name
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        sim._tracer = self
+        sim.add_hook("on_event_scheduled", self._on_scheduled)
+        sim.add_hook("on_event_cancelled", self._on_cancelled)
+        sim.add_hook("on_event_executed", self._on_executed)
+        sim.add_hook("on_process_switch", self._on_switch)
+        sim.add_hook("on_process_terminated", self._on_terminated)
+
+    def stop(self):
+        """Detach the tracer from the simulator; the records are kept."""
+
+        sim = self._sim
+        if sim._tracer is not self:
+            return
+        sim._tracer = None
+        sim.remove_hook("on_event_scheduled", self._on_scheduled)
+        sim.remove_hook("on_event_cancelled", self._on_cancelled)
+        sim.remove_hook("on_event_executed", self._on_executed)
+        sim.remove_hook("on_process_switch", self._on_switch)
+        sim.remove_hook("on_process_terminated", self._on_terminated)
+
+    def clear(self):
+        """Discard all trace records."""
+        self._records.clear()
+
+    def records(self, kind=None):
+        """Return the list of trace records in the ring buffer (oldest
+        first); if 'kind' is provided, only the records of the given kind
+        are returned."""
+
+        if kind is None:
+            return list(self._records)
+        return [r for r in self._records if r[0] == kind]
+
+    def record(self, kind, obj, *info):
+        """Add a trace record of the given kind about the given object."""
+
+        sim = self._sim
+        rec = (kind, sim.now, sim.name, id(obj)) + info
+        self._records.append(rec)
+        if self.logging:
+            log.debug(_PREFIX + _FORMATS[kind], self._rank, sim.now, sim.name[-4:], id(obj), *info)
+
+    def format(self, rec):
+        """Return the printable string of a trace record."""
+        return _PREFIX % (self._rank, rec[1], rec[2][-4:], rec[3]) + _FORMATS[rec[0]] % rec[4:]
+
+    def dump(self, file=None, limit=None):
+        """Print the latest trace records (all of them if 'limit' is None) to
+        the given file (the default is sys.stdout)."""
+
+        if file is None: file = sys.stdout
+        recs = list(self._records)
+        if limit is not None:
+            recs = recs[-limit:]
+        for rec in recs:
+            print(self.format(rec), file=file)
+
+    # the observer hooks
+    def _on_scheduled(self, sim, e):
+        self.record("schedule", e, _event_name(e), e.time)
+
+    def _on_cancelled(self, sim, e):
+        self.record("cancel", e, _event_name(e), e.time)
+
+    def _on_executed(self, sim, e):
+        self.record("execute", e, _event_name(e))
+
+    def _on_switch(self, sim, p):
+        self.record("switch", p, p.name or getattr(p.func, '__name__', '?'))
+
+    def _on_terminated(self, sim, p):
+        self.record("terminate", p, p.name or getattr(p.func, '__name__', '?'))
+
+def _event_name(e):
+    """Return the name of the event, or the name of the function (the
+    event handler or the starting function of the process) if the
+    event is unnamed."""
+
+    if e.name is not None:
+        return e.name
+    func = e.func if hasattr(e, 'func') else e.proc.func
+    return getattr(func, '__name__', '?')
@@ -47,6 +47,8 @@ class Trap(Trappable):
     TRAP_SET    = 1
     TRAP_SPRUNG = 2
 
+    __slots__ = ('state', 'blocked')
+
     def __init__(self, sim):
         """A trap can only be created using simulator's trap() function; it
         starts from "unset" state and there are no waiting processes."""
@@ -64,6 +66,11 @@ class Trap(Trappable):
             errmsg = "trap.wait() outside process context"
             log.error(errmsg)
             raise RuntimeError(errmsg)
+        return p._block(self._wait(p))
+
+    def _wait(self, p):
+        """The blocking operation of wait() as a generator (see
+        _Process._block())."""
 
         if self.state == Trap.TRAP_UNSET or \
            self.state == Trap.TRAP_SET:
@@ -71,7 +78,7 @@ class Trap(Trappable):
             self.state = Trap.TRAP_SET
             self.blocked.append(p)
             #log.debug('process blocked on trap wait')
-            p.suspend()
+            yield
         else:
             # nothing to be done when the trap is sprung; there are no
             # blocked processes
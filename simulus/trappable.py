@@ -15,6 +15,11 @@ class Trappable(object):
 
     """
 
+    # trappables are created in large numbers (every event and process
+    # is a trappable); subclasses that are created in large numbers
+    # should define their own slots too
+    __slots__ = ('_sim', 'retval')
+
     def __init__(self, sim):
         self._sim = sim
         self.retval = None
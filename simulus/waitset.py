@@ -0,0 +1,244 @@
+"""Waiting repeatedly on a set of trappables."""
+
+from .trappable import Trappable
+from .trap import Trap
+from .event import *
+from .process import _Process
+
+__all__ = ["WaitSet"]
+
+import logging
+log = logging.getLogger(__name__)
+log.addHandler(logging.NullHandler())
+
+class WaitSet(object):
+    """A wait set lets a process wait repeatedly for any of a set of
+    trappables to be triggered.
+
+    A wait set is created by calling the simulator's waitset() method
+    from within a process, which becomes the owner of the wait set;
+    all methods of the wait set must be called by the owner process.
+    Unlike the simulator's wait() method, which conditionally waits
+    on every trappable anew each time it's called (and cancels the
+    wait for every trappable that has not been triggered), a wait set
+    registers the process with its trappables only once; when a
+    trappable is triggered, it's set aside in the wait set, whether
+    or not the process is waiting at the time. Each call of
+    wait_any() thus takes time in proportion to the number of
+    trappables that have been triggered, not the size of the set.
+
+    The trappables that can be triggered more than once (semaphores,
+    resources, mailbox receivers, the getters and putters of stores
+    and buckets) are registered again the next time the process
+    calls wait_any() after they have been reported. The one-time
+    trappables (traps, events, and processes) are removed from the
+    wait set once they have been reported.
+
+    While a trappable is in the wait set, it's considered waited on
+    by the process (e.g., a semaphore in the wait set takes its turn
+    to be signaled, and a resource in the wait set takes its place in
+    the queue); the process should not wait on it otherwise. A
+    process can have only one wait set at a time; the wait set should
+    be closed when it's no longer needed.
+
+    """
+
+    def __init__(self, sim, proc, traps):
+        for t in traps:
+            if not isinstance(t, Trappable):
+                errmsg = "simulator.waitset() not a trappable in list"
+                log.error(errmsg)
+                raise TypeError(errmsg)
+        if len(set(traps)) < len(traps):
+            errmsg = "simulator.waitset() duplicate trappables in list"
+            log.error(errmsg)
+            raise ValueError(errmsg)
+
+        self._sim = sim
+        self._proc = proc
+        self._members = {} # a map from trappable to its true trappable (or None if not armed)
+        self._armed = {} # a map from true trappable to the list of armed trappables
+        self._ready = [] # the triggered trappables yet to be reported
+        self._rearm = [] # the reported trappables to be registered again
+        self._waiting = False # whether the process is waiting in wait_any()
+        proc._waitset = self
+        for t in traps:
+            self.add(t)
+
+    def __len__(self):
+        return len(self._members)
+
+    def __contains__(self, t):
+        return t in self._members
+
+    def _check_owner(self, method):
+        p = self._sim.cur_process()
+        if p is not self._proc:
+            errmsg = "waitset.%s() not called by the owner process" % method
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        if p._waitset is not self:
+            errmsg = "waitset.%s() on closed waitset" % method
+            log.error(errmsg)
+            raise RuntimeError(errmsg)
+        return p
+
+    def add(self, t):
+        """Add a trappable to the wait set."""
+
+        self._check_owner("add")
+        if not isinstance(t, Trappable):
+            errmsg = "waitset.add(t=%r) not a trappable" % t
+            log.error(errmsg)
+            raise TypeError(errmsg)
+        if t in self._members:
+            errmsg = "waitset.add(t=%r) duplicate trappable" % t
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        self._members[t] = None
+        self._arm(t)
+
+    def remove(self, t):
+        """Remove a trappable from the wait set. Return True if the trappable
+        has been triggered but not reported yet, in which case it's
+        handled as if it were reported by wait_any() (e.g., a
+        semaphore has been decremented, or a mailbox receiver has
+        retrieved the messages); otherwise, return False."""
+
+        self._check_owner("remove")
+        if t not in self._members:
+            errmsg = "waitset.remove(t=%r) not in waitset" % t
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        tt = self._members.pop(t)
+        if tt is not None:
+            # the trappable is still armed; cancel the wait
+            ts = self._armed[tt]
+            ts.remove(t)
+            if not ts: del self._armed[tt]
+            t._cancel_wait()
+            return False
+        if t in self._ready:
+            self._ready.remove(t)
+            t._commit_wait()
+            return True
+        self._rearm.remove(t)
+        return False
+
+    def close(self):
+        """Remove all trappables from the wait set, so that the process is
+        no longer registered with them. Return the list of trappables
+        that have been triggered but not reported yet (see remove())."""
+
+        p = self._check_owner("close")
+        ready = [t for t in list(self._members) if self.remove(t)]
+        p._waitset = None
+        return ready
+
+    def wait_any(self, timeout=None):
+        """Wait for any trappables in the wait set to be triggered.
+
+        Args:
+            timeout (float): the maximum amount of time the process
+                will wait; if it's zero, the method only collects the
+                trappables that have been triggered, without waiting;
+                if it's ignored, there will be no time limit
+
+        Returns:
+            This method returns the list of the trappables that have
+            been triggered since the last call (in the order they were
+            triggered), or an empty list if timed out. The trappables
+            are handled as if the process has waited on them using
+            the simulator's wait() method (e.g., a mailbox receiver has
+            the retrieved messages in its 'retval' attribute).
+
+        """
+
+        p = self._check_owner("wait_any")
+        if timeout is not None and timeout < 0:
+            errmsg = "waitset.wait_any(timeout=%r) negative timeout" % timeout
+            log.error(errmsg)
+            raise ValueError(errmsg)
+        return p._block(self._wait_any(p, timeout))
+
+    def _wait_any(self, p, timeout):
+        """The blocking operation of wait_any() as a generator (see
+        _Process._block())."""
+
+        # register again the trappables reported last time
+        rearm = self._rearm
+        self._rearm = []
+        for t in rearm:
+            self._arm(t)
+
+        if not self._ready and timeout != 0:
+            sim = self._sim
+            e = None # this will be the timeout event
+            if timeout is not None:
+                sim._runtime["scheduled_events"] += 1
+                e = _ProcessEvent(sim, sim.now+timeout, p, p.name)
+                sim._eventlist.insert(e)
+                if sim._hooks is not None:
+                    sim._notify("on_event_scheduled", e)
+
+            self._waiting = True
+            try:
+                while not self._ready:
+                    yield
+                    if e is not None and not sim._eventlist.current_event(e):
+                        break # timed out
+            finally:
+                self._waiting = False
+
+            if e is not None and sim._eventlist.current_event(e):
+                # cancel the future timeout event
+                sim._runtime["cancelled_events"] += 1
+                if sim._eventlist.cancel(e):
+                    sim._runtime["tombstones"] += 1
+                if sim._hooks is not None:
+                    sim._notify("on_event_cancelled", e)
+
+        ready = self._ready
+        self._ready = []
+        for t in ready:
+            t._commit_wait()
+            if isinstance(t, (Trap, _Event, _Process)):
+                del self._members[t]
+            else:
+                self._rearm.append(t)
+        return ready
+
+    def _arm(self, t):
+        """Register the process with the trappable (in the process context),
+        unless it has been triggered already."""
+
+        if t._try_wait():
+            tt = t._true_trappable()
+            self._members[t] = tt
+            ts = self._armed.get(tt)
+            if ts is None:
+                self._armed[tt] = [t]
+            else:
+                ts.append(t)
+        else:
+            self._ready.append(t)
+
+    def _route(self):
+        """Called when the process is activated: if it's one of the armed
+        trappables that has just been triggered (the last in the
+        process's acting trappables), set it aside; return True if the
+        process should not be activated (since it's not waiting)."""
+
+        acting = self._proc._acting_trappables
+        if not acting:
+            return False
+        tt = acting[-1]
+        ts = self._armed.get(tt)
+        if ts is None:
+            return False
+        acting.pop()
+        t = ts.pop(0)
+        if not ts: del self._armed[tt]
+        self._members[t] = None
+        self._ready.append(t)
+        return not self._waiting
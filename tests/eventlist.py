@@ -0,0 +1,324 @@
+#
+# Event List Test
+#
+# We check that all event lists that can be selected when creating a
+# simulator share the same semantics: events are retrieved in
+# timestamp order, simultaneous events in the order they have been
+# scheduled, and cancelled or rescheduled events are handled
+# properly. The test_*() methods will be picked up to run by pytest.
+#
+
+import random
+import pytest
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+eventlists = sorted(_EVENTLISTS.keys())
+
+def run_model(eventlist, nevts=2000, seed=12345, lazy_cancel=True):
+    rnd = random.Random(seed)
+    sim = simulus.simulator(eventlist=eventlist, lazy_cancel=lazy_cancel)
+    trace = []
+    def handler(i):
+        trace.append((sim.now, i))
+        if rnd.random() < 0.5:
+            sim.sched(handler, i+nevts, offset=rnd.choice((0, 0.5, 1, rnd.random())))
+    evts = [sim.sched(handler, i, offset=rnd.randrange(10)) for i in range(nevts)]
+    for e in evts[::7]: sim.cancel(e)
+    for e in evts[::11]: sim.resched(e, offset=rnd.randrange(10))
+    sim.run(until=20)
+    return trace
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_order(eventlist):
+    trace = run_model(eventlist)
+    assert trace == sorted(trace, key=lambda x: x[0])
+    # simultaneous initial events (not rescheduled) come in the
+    # order they were scheduled
+    for t in range(10):
+        ids = [i for (x, i) in trace if x == t and i < 2000 and i%11 != 0]
+        assert ids == sorted(ids)
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_simultaneous(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    fired = []
+    def handler(i):
+        fired.append(i)
+        # scheduled at the current time, after all others
+        if i == 3: sim.sched(fired.append, -1)
+    evts = [sim.sched(handler, i, until=i%3) for i in range(300)]
+    for e in evts[::5]: sim.cancel(e)
+    # rescheduled events go behind those already at the new time
+    sim.resched(evts[1], until=0)
+    ids = [i for i in range(300) if i%5 != 0 and i != 1]
+    assert len(sim._eventlist) == len(ids)+1
+    sim.run()
+    n0 = len([i for i in ids if i%3 == 0])
+    expected = sorted(ids, key=lambda i: i%3)
+    expected[n0:n0] = [1, -1]
+    assert fired == expected
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_same_as_sorteddict(eventlist):
+    assert run_model(eventlist) == run_model('sorteddict')
+
+def test_eager_cancel():
+    assert run_model('sorteddict', lazy_cancel=False) == run_model('sorteddict')
+
+# the timing wheel removes cancelled events in the near future
+# right away (see test_wheel)
+@pytest.mark.parametrize("eventlist", [x for x in eventlists if x != 'wheel'])
+def test_compaction(eventlist):
+    sim = simulus.simulator(eventlist=eventlist, compact_ratio=0.25)
+    fired = []
+    evts = [sim.sched(fired.append, i, offset=i) for i in range(1000)]
+    for e in evts:
+        if e.args[0]%10 != 0: sim.cancel(e)
+    assert len(sim._eventlist) == 100
+    assert sim._runtime["tombstones"] == 900
+    assert sim._eventlist.compactions > 0
+    assert sim._eventlist.tombstones <= 0.25*(100+sim._eventlist.tombstones)+32
+    sim.run()
+    assert fired == list(range(0, 1000, 10))
+    assert sim._eventlist.tombstones == 0
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_cancel_resched(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    fired = []
+    e1 = sim.sched(fired.append, 1, offset=1)
+    e2 = sim.sched(fired.append, 2, offset=2)
+    e3 = sim.sched(fired.append, 3, offset=3)
+    assert len(sim._eventlist) == 3
+    sim.cancel(e2)
+    sim.cancel(e2) # no effect
+    assert sim.resched(e3, offset=0.5) is e3
+    assert sim.peek() == 0.5
+    sim.run()
+    assert fired == [3, 1]
+    assert sim.resched(e1, offset=1) is None
+    assert len(sim._eventlist) == 0
+    with pytest.raises(IndexError):
+        sim._eventlist.get_min()
+
+def test_wheel():
+    sim = simulus.simulator(eventlist='wheel')
+    evts = [sim.sched(lambda: None, offset=i) for i in range(1000)]
+    for e in evts[1::2]: sim.cancel(e)
+    assert len(sim._eventlist) == 500
+    assert sim._runtime["tombstones"] == 0
+
+    # a small wheel, so that most events are cascaded from the higher
+    # levels or brought in from beyond the horizon
+    from simulus.eventlist import _WheelEventList_
+    wl = _WheelEventList_(resolution=0.37, bits=2, levels=2)
+    rnd = random.Random(13579)
+    times = [rnd.choice((rnd.random(), rnd.randrange(5), rnd.expovariate(0.01)))
+             for _ in range(2000)]
+    evts = [simulus.event._DirectEvent(None, t, None, None, None, (), {}) for t in times]
+    wl.insert_many(evts[:1000])
+    for e in evts[1000:]: wl.insert(e)
+    for e in evts[::3]: wl.cancel(e)
+    out = []
+    while len(wl) > 0:
+        out.append(wl.delete_min())
+    expect = [e for i, e in enumerate(evts) if i%3 != 0]
+    expect.sort(key=lambda e: e.time) # stable for simultaneous events
+    assert out == expect
+    assert wl.tombstones == 0
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_immediate(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    trace = []
+    def h0():
+        trace.append((sim.now, 'h0'))
+        sim.sched(trace.append, (sim.now, 'A'))
+        b = sim.sched(trace.append, (sim.now, 'B'))
+        c = sim.sched(trace.append, (sim.now, 'C'))
+        assert len(sim._eventlist) == 5 and sim._eventlist.nnow == 3
+        sim.cancel(b)
+        sim.resched(c, offset=1)
+        sim.resched(y, offset=0)
+        assert sim.peek() == 1
+    sim.sched(h0, until=1)
+    sim.sched(trace.append, (1, 'X'), until=1)
+    y = sim.sched(trace.append, (1, 'Y'), until=1)
+    sim.run()
+    # the events at time 1 on the main event list go first
+    assert trace == [(1, 'h0'), (1, 'X'), (1, 'A'), (1, 'Y'), (1, 'C')]
+    assert sim.now == 2 and len(sim._eventlist) == 0
+
+def arrive(sim, trace, i):
+    trace.append((sim.now, i))
+
+def spill_model(eventlist, spill_horizon):
+    sim = simulus.simulator(eventlist=eventlist, spill_horizon=spill_horizon)
+    rnd = random.Random(13579)
+    trace = []
+    # the trace is not a value, so these events are held in memory
+    evts = [sim.sched(arrive, sim, trace, i, offset=rnd.uniform(0, 100))
+            for i in range(200)]
+    # these events are spilled to disk (the trace is a global)
+    spill_trace.clear()
+    for i in range(1000):
+        sim.sched(arrive_spill, sim, i, offset=rnd.uniform(0, 100))
+    kept = [sim.sched(arrive_spill, sim, i, offset=rnd.uniform(0, 100))
+            for i in range(1000, 1100)]
+    for e in kept[::2]: sim.cancel(e)
+    for e in kept[1::4]: sim.resched(e, offset=rnd.uniform(0, 100))
+    def waiter(e):
+        sim.wait(e)
+        trace.append((sim.now, 'waited'))
+    sim.process(waiter, kept[3])
+    sim.sched(lambda: trace.append((sim.now, 'lambda')), offset=55)
+    sim.run()
+    return trace+spill_trace, sim._eventlist
+
+spill_trace = []
+def arrive_spill(sim, i):
+    spill_trace.append((sim.now, i))
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_spill(eventlist):
+    trace, _ = spill_model(eventlist, None)
+    trace2, el = spill_model(eventlist, 10)
+    assert trace == trace2
+    assert el.spills > 0 and el.pageins > 0
+    assert len(el) == 0 and el.segments == {}
+
+@pytest.mark.parametrize("spill_horizon", [None, 3])
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_calendar(eventlist, spill_horizon):
+    sim = simulus.simulator(eventlist=eventlist, spill_horizon=spill_horizon)
+    rnd = random.Random(2468)
+    evts = [sim.sched(arrive_spill, sim, i, offset=rnd.randrange(20)) for i in range(500)]
+    for e in evts[::7]: sim.cancel(e)
+    for e in evts[::11]: sim.resched(e, offset=rnd.randrange(20))
+    sim.sched(arrive_spill, sim, -1, until=float('inf'))
+    sim.run(until=5)
+    sim.sched(arrive_spill, sim, 1000) # immediate events
+    sim.sched(arrive_spill, sim, 1001)
+
+    cal = [e.args[1] for e in sim.calendar(0, None)]
+    assert len(cal) == len(sim._eventlist)
+    assert [e.args[1] for e in sim.calendar(10, 5)] == cal[10:15]
+    assert len(sim.calendar()) == 100
+    snap = sim.snapshot()
+    assert [e.args[1] for e in snap.calendar(0, None)] == cal # shared
+    snap2 = sim.snapshot()
+    spill_trace.clear()
+    sim.run(until=30)
+    assert [i for _, i in spill_trace] == cal[:-1] and cal[-1] == -1
+    assert snap.now == 5 and len(snap) == len(cal)
+    assert [e.args[1] for e in snap] == cal # copied
+    assert [e.args[1] for e in snap2.calendar(3, 4)] == cal[3:7]
+    assert [e.args[1] for e in sim.calendar()] == [-1]
+    with pytest.raises(ValueError):
+        sim.calendar(start=-1)
+
+def test_unknown_eventlist():
+    with pytest.raises(ValueError):
+        simulus.simulator(eventlist='nosuchthing')
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_sched_many(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    fired = []
+    def handler(i, j):
+        fired.append((sim.now, i, j))
+    sim.sched(handler, -1, -1, offset=2)
+    evts = sim.sched_many(handler, offset=[3, 1, 2, 1], args=[range(4), 'abcd'])
+    assert len(evts) == 4 and len(sim._eventlist) == 5
+    sim.cancel(evts[2])
+    sim.run()
+    assert fired == [(1, 1, 'b'), (1, 3, 'd'), (2, -1, -1), (3, 0, 'a')]
+    with pytest.raises(ValueError):
+        sim.sched_many(handler, offset=[1, -1])
+    with pytest.raises(ValueError):
+        sim.sched_many(handler, until=[0, 5])
+    with pytest.raises(ValueError):
+        sim.sched_many(handler, offset=[1, float('nan')])
+    with pytest.raises(ValueError):
+        sim.sched_many(handler, until=[5, float('nan'), 6])
+    with pytest.raises(ValueError):
+        sim.sched_many(handler, until=[5, 6], args=[[1]])
+
+def test_calendar_insert_many():
+    # small batches are enqueued one by one, without rebuilding the
+    # calendar each time
+    sim = simulus.simulator(eventlist='calendar')
+    el = sim._eventlist
+    rnd = random.Random(8642)
+    fired = []
+    def handler(i):
+        fired.append(i)
+    sim.sched_many(handler, offset=[rnd.random()*100 for _ in range(1500)],
+                   args=[range(1500)])
+    assert el.nbuckets == 1024 # room for 2048 events
+    resizes = []
+    resize = el._resize
+    el._resize = lambda n: (resizes.append(n), resize(n))
+    for i in range(100):
+        sim.sched_many(handler, offset=[rnd.random()*100, rnd.random()*100],
+                       args=[[1500+2*i, 1501+2*i]])
+    assert resizes == []
+    sim.run()
+    assert sorted(fired) == list(range(1700))
+
+def hold_model(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    rnd = random.Random(97531)
+    trace = []
+    def holder(i):
+        while True:
+            sim.sleep(rnd.choice((0, 0.5, rnd.random()*3)))
+            trace.append((sim.now, i))
+    def tick():
+        trace.append((sim.now, 'tick'))
+    ps = [sim.process(holder, i, offset=rnd.random()) for i in range(50)]
+    sim.sched(tick, offset=0.25, repeat_intv=0.75)
+    sim.run(until=10)
+    snap = sim.snapshot()
+    cal = [(e.time, e) for e in sim.calendar(0, None)]
+    sim.run(until=20)
+    # the snapshot keeps the order the events had, while the processes
+    # keep sleeping
+    assert [e for _, e in cal] == list(snap)
+    assert [t for t, _ in cal] == sorted(t for t, _ in cal)
+    return sim, ps, trace
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_hold(eventlist):
+    sim, ps, trace = hold_model(eventlist)
+    assert trace == hold_model('sorteddict')[2]
+    assert len(trace) > 1000
+    wakeups = set(id(p._wakeup) for p in ps)
+    assert len(wakeups) == len(ps)
+    assert all(e.proc._wakeup is e for e in sim.calendar(0, None)
+               if isinstance(e, simulus.event._ProcessEvent))
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_wakeup_exposed(eventlist):
+    # the wakeup event of a process is reused only as long as no events
+    # have been handed out for inspection
+    sim = simulus.simulator(eventlist=eventlist)
+    wakeups = []
+    snaps = []
+    def sleeper():
+        for i in range(4):
+            sim.sleep(1)
+            wakeups.append((sim.now, sim._theproc._wakeup))
+    def inspect():
+        snaps.append(sim.snapshot())
+    sim.process(sleeper)
+    sim.sched(inspect, offset=2.5)
+    sim.run()
+    assert [t for t, _ in wakeups] == [1, 2, 3, 4]
+    assert wakeups[0][1] is wakeups[1][1] # reused before the snapshot
+    e = wakeups[1][1]
+    assert list(snaps[0]) == [e] and e.time == 3
+    # the event on the snapshot keeps its time after the next sleep
+    assert wakeups[2][1] is e and wakeups[3][1] is not e
+    assert e.time == 3 and list(snaps[0])[0].time == 3
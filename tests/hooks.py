@@ -0,0 +1,59 @@
+#
+# Observer Hook Test
+#
+# We check that the observer hooks of a simulator are called for the
+# events and processes, with any event list, and that the simulator
+# returns to its hook-free main loop once all hooks are removed. The
+# test_*() methods will be picked up to run by pytest.
+#
+
+import pytest
+import simulus
+from simulus.eventlist import _EVENTLISTS
+
+eventlists = sorted(_EVENTLISTS.keys())
+
+@pytest.mark.parametrize("eventlist", eventlists)
+def test_hooks(eventlist):
+    sim = simulus.simulator(eventlist=eventlist)
+    seen = []
+    def hook(name):
+        return lambda s, o: seen.append((name, s.now, o))
+    hooks = {name: hook(name) for name in
+             ("on_event_executed", "on_event_scheduled", "on_event_cancelled",
+              "on_process_switch", "on_process_terminated")}
+    for name, func in hooks.items():
+        sim.add_hook(name, func)
+    def handler(): pass
+    def child():
+        sim.sleep(1)
+    e1 = sim.sched(handler, offset=1, repeat_intv=2)
+    e2 = sim.sched(handler, offset=4)
+    p = sim.process(child, offset=1)
+    sim.cancel(e2)
+    sim.run(until=3.5)
+    kinds = [(name, t) for (name, t, _) in seen]
+    assert kinds == [
+        ("on_event_scheduled", 0), ("on_event_scheduled", 0),
+        ("on_event_scheduled", 0), ("on_event_cancelled", 0),
+        ("on_event_scheduled", 1), ("on_event_executed", 1), # repeat
+        ("on_event_executed", 1), ("on_process_switch", 1),
+        ("on_event_scheduled", 1), # sleep
+        ("on_event_executed", 2), ("on_process_switch", 2),
+        ("on_process_terminated", 2),
+        ("on_event_scheduled", 3), ("on_event_executed", 3)]
+    assert seen[3][2] is e2 and seen[-1][2] is e1 and seen[7][2] is p
+
+    # the simulator returns to the hook-free loop once all hooks are removed
+    for name, func in hooks.items():
+        sim.remove_hook(name, func)
+    assert sim._hooks is None
+    del seen[:]
+    sim.run(until=10)
+    assert not seen
+    with pytest.raises(ValueError):
+        sim.add_hook("on_nothing", handler)
+    with pytest.raises(ValueError):
+        sim.remove_hook("on_event_executed", handler)
+    with pytest.raises(TypeError):
+        sim.add_hook("on_event_executed", None)
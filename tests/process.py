@@ -0,0 +1,504 @@
+#
+# Process Test
+#
+# We check that a process can be joined (i.e., waited on until it
+# terminates), that the processes started from 'async def' functions
+# (the coroutine processes) behave the same as the greenlet processes
+# started from plain functions, and that the two kinds of processes
+# interoperate through traps, semaphores, resources, stores, buckets,
+# and mailboxes. The test_*() methods will be picked up to run by
+# pytest.
+#
+
+import random
+import pytest
+import simulus
+
+def test_process_join():
+    sim = simulus.simulator()
+    trace = []
+    def child(d):
+        sim.sleep(d)
+    def parent(p):
+        sim.wait(p)
+        trace.append(sim.now)
+    c1 = sim.process(child, 5)
+    c2 = sim.process(child, 1)
+    sim.process(parent, c1, offset=2)
+    sim.process(parent, c2, offset=2) # c2 has terminated by then
+    sim.run()
+    assert trace == [2, 5]
+    # no one has waited on c2 before it terminated
+    assert c2._trap.state == simulus.Trap.TRAP_SPRUNG
+    assert not hasattr(c1, '__dict__')
+
+def greenlet_model(sim, trace):
+    res = sim.resource(capacity=2)
+    st = sim.store(capacity=3)
+    bk = sim.bucket(capacity=5)
+    mb = sim.mailbox(nparts=1)
+    tr = sim.trap()
+    def producer(i):
+        for j in range(4):
+            sim.sleep(i+1)
+            st.put(1, obj=(i, j))
+            bk.put(1.5)
+            mb.send((i, j), delay=0.5)
+        trace.append(('producer', i, sim.now))
+    def consumer(i):
+        while True:
+            res.acquire()
+            x = st.get(1)
+            sim.sleep(0.25)
+            res.release()
+            trace.append(('consumer', i, sim.now, x))
+    def receiver():
+        while True:
+            msgs = mb.recv()
+            trace.append(('recv', sim.now, msgs))
+    def drainer():
+        bk.get(4)
+        trace.append(('drained', sim.now))
+        tr.trigger()
+        while True:
+            bk.get(1.5)
+    def waiter():
+        (trig, timedout) = sim.wait(tr, offset=100)
+        trace.append(('waiter', sim.now, trig, timedout))
+        (trig, timedout) = sim.wait(sim.trap(), offset=2)
+        trace.append(('waiter', sim.now, trig, timedout))
+    ps = [sim.process(producer, i) for i in range(3)]
+    [sim.process(consumer, i) for i in range(3)]
+    sim.process(receiver)
+    sim.process(drainer)
+    sim.process(waiter)
+    return ps
+
+def coroutine_model(sim, trace):
+    res = sim.resource(capacity=2)
+    st = sim.store(capacity=3)
+    bk = sim.bucket(capacity=5)
+    mb = sim.mailbox(nparts=1)
+    tr = sim.trap()
+    async def producer(i):
+        for j in range(4):
+            await sim.sleep(i+1)
+            await st.put(1, obj=(i, j))
+            await bk.put(1.5)
+            mb.send((i, j), delay=0.5)
+        trace.append(('producer', i, sim.now))
+    async def consumer(i):
+        while True:
+            await res.acquire()
+            x = await st.get(1)
+            await sim.sleep(0.25)
+            res.release()
+            trace.append(('consumer', i, sim.now, x))
+    async def receiver():
+        while True:
+            msgs = await mb.recv()
+            trace.append(('recv', sim.now, msgs))
+    async def drainer():
+        await bk.get(4)
+        trace.append(('drained', sim.now))
+        tr.trigger()
+        while True:
+            await bk.get(1.5)
+    async def waiter():
+        (trig, timedout) = await sim.wait(tr, offset=100)
+        trace.append(('waiter', sim.now, trig, timedout))
+        (trig, timedout) = await sim.wait(sim.trap(), offset=2)
+        trace.append(('waiter', sim.now, trig, timedout))
+    ps = [sim.process(producer, i) for i in range(3)]
+    [sim.process(consumer, i) for i in range(3)]
+    sim.process(receiver)
+    sim.process(drainer)
+    sim.process(waiter)
+    return ps
+
+def test_same_as_greenlet():
+    traces = []
+    for model in (greenlet_model, coroutine_model):
+        sim = simulus.simulator()
+        trace = []
+        ps = model(sim, trace)
+        sim.run(until=20)
+        assert all(sim.terminated(p) for p in ps)
+        traces.append(trace)
+    assert traces[0] == traces[1]
+    assert len(traces[0]) > 20
+
+def test_mixed():
+    # greenlet and coroutine processes wait on each other
+    sim = simulus.simulator()
+    sem = sim.semaphore()
+    trace = []
+    async def child(d):
+        await sim.sleep(d)
+        sem.signal()
+        trace.append(('child', sim.now))
+        return 'ignored'
+    def parent():
+        c = sim.process(child, 2)
+        sem.wait()
+        trace.append(('parent', sim.now))
+        sim.wait(c)
+        trace.append(('joined', sim.now))
+    async def grandparent():
+        p = sim.process(parent)
+        await sim.wait(p)
+        trace.append(('grandparent', sim.now))
+    sim.process(grandparent)
+    sim.run()
+    assert trace == [('child', 2), ('parent', 2), ('joined', 2), ('grandparent', 2)]
+
+def test_kill():
+    sim = simulus.simulator()
+    trace = []
+    async def sleeper():
+        await sim.sleep(10)
+        trace.append('woke up')
+    async def suicide():
+        await sim.sleep(1)
+        sim.kill()
+        trace.append('not reached')
+    async def killer(p, q):
+        await sim.sleep(2)
+        sim.kill(p)
+        sim.kill(q) # never started
+        await sim.wait([p, q, s])
+        trace.append(('killer', sim.now))
+    p = sim.process(sleeper)
+    q = sim.process(sleeper, offset=5)
+    s = sim.process(suicide)
+    sim.process(killer, p, q)
+    sim.run()
+    assert trace == [('killer', 2)]
+    assert sim.terminated(p) and sim.terminated(q) and sim.terminated(s)
+    assert sim._runtime["terminated_processes"] == 2 # suicide and killer
+    assert sim._runtime["killed_processes"] == 2
+
+def test_foreign_awaitable():
+    sim = simulus.simulator()
+    class Foreign(object):
+        def __await__(self):
+            yield 'something'
+    async def proc():
+        await Foreign()
+    sim.process(proc)
+    with pytest.raises(RuntimeError):
+        sim.run()
+
+def recycle_model(pool):
+    sim = simulus.simulator(process_pool=pool)
+    rng = random.Random(13579)
+    trace = []
+    def customer(i):
+        sim.sleep(rng.expovariate(1))
+        trace.append((i, sim.now))
+    def parent(i):
+        c = sim.process(customer, i)
+        sim.wait(c)
+        trace.append(('joined', i, sim.now))
+    def arrival():
+        for i in range(200):
+            sim.sleep(0.1)
+            sim.process(parent if i%2 else customer, i)
+    sim.process(arrival)
+    sim.run()
+    return sim, trace
+
+def test_recycle():
+    sim0, trace0 = recycle_model(0)
+    assert not sim0._greenlets
+    sim1, trace1 = recycle_model(10)
+    assert trace0 == trace1
+    assert len(sim1._greenlets) == 10
+    assert sim1._runtime["terminated_processes"] == 301
+    with pytest.raises(ValueError):
+        simulus.simulator(process_pool=-1)
+
+def test_waitset():
+    sim = simulus.simulator()
+    mb = sim.mailbox(nparts=100)
+    sem = sim.semaphore()
+    tr = sim.trap()
+    trace = []
+    def child():
+        sim.sleep(12)
+    def router():
+        c = sim.process(child)
+        rs = [mb.receiver(i) for i in range(100)]
+        ws = sim.waitset(rs+[sem, tr])
+        ws.add(c)
+        assert len(ws) == 103
+        while True:
+            ready = ws.wait_any(timeout=10)
+            if not ready:
+                trace.append((sim.now, 'timeout'))
+                break
+            trace.append((sim.now, ['child' if t is c else t.retval if t in rs else t
+                                    for t in ready]))
+            # the triggers during sleep are collected by the waitset
+            sim.sleep(1)
+        assert len(ws) == 101 # the trap and the child have gone
+        assert ws.close() == []
+        assert sem.val == 0 and len(mb._parts[7].trap.blocked) == 0
+        with pytest.raises(RuntimeError):
+            ws.wait_any()
+    sim.process(router)
+    mb.send('a', delay=1, part=7)
+    mb.send('b', delay=1, part=3)
+    mb.send('c', delay=1.5, part=7)
+    sim.sched(sem.signal, offset=2)
+    sim.sched(tr.trigger, offset=2.5)
+    sim.sched(sem.signal, offset=2.5)
+    mb.send('d', delay=2.5, part=99)
+    sim.run()
+    assert trace == [(1, [['a']]), (2, [['b'], sem, ['c']]), (3, [tr, ['d'], sem]),
+                     (12, ['child']), (23, 'timeout')]
+
+def test_waitset_misc():
+    sim = simulus.simulator()
+    sem = sim.semaphore()
+    trace = []
+    async def owner():
+        ws = sim.waitset([sem])
+        with pytest.raises(RuntimeError):
+            sim.waitset([])
+        with pytest.raises(ValueError):
+            ws.add(sem)
+        assert await ws.wait_any(timeout=0) == []
+        await sim.sleep(5)
+        # signaled twice while sleeping: reported once, then again
+        # once it has been registered again
+        assert await ws.wait_any() == [sem]
+        trace.append(sim.now)
+        assert await ws.wait_any(timeout=1) == [sem]
+        trace.append(sim.now)
+        await sim.sleep(1)
+        # not registered again since the last report
+        assert ws.close() == [] and sem.val == 1
+    def intruder(p):
+        with pytest.raises(RuntimeError):
+            p._waitset.wait_any()
+        trace.append('intruder')
+    p = sim.process(owner)
+    sim.process(intruder, p, offset=1)
+    sim.sched(sem.signal, offset=3)
+    sim.sched(sem.signal, offset=4)
+    sim.sched(sem.signal, offset=5.5)
+    sim.run()
+    assert trace == ['intruder', 5, 5]
+    with pytest.raises(RuntimeError):
+        sim.waitset([sem])
+
+def test_wait_one():
+    sim = simulus.simulator()
+    trace = []
+    def proc():
+        tr = sim.trap()
+        sim.sched(tr.trigger, offset=2)
+        trace.append(sim.wait(tr, offset=1))
+        trace.append(sim.wait([tr], offset=5))
+        trace.append(sim.wait([tr]))
+        sem = sim.semaphore(1)
+        trace.append(sim.wait(sem))
+        trace.append(sim.wait(sem, offset=1))
+        assert sem.val == 0 and not sem.blocked
+    sim.process(proc)
+    sim.run()
+    assert trace == [(False, True), ([True], False), ([True], False), (True, False), (False, True)]
+
+def test_condition():
+    sim = simulus.simulator()
+    st = sim.store(capacity=10)
+    res = sim.resource(capacity=2)
+    full = sim.condition(lambda: st.level >= 5, st)
+    busy = sim.condition(lambda: res.num_in_service() == 2 and res.num_in_queue() > 0, res)
+    trace = []
+    def producer():
+        for i in range(8):
+            sim.sleep(1)
+            st.put(1)
+    def watcher():
+        full.wait()
+        trace.append(('full', sim.now, st.level))
+        # the predicate still holds
+        full.wait()
+        trace.append(('still full', sim.now))
+    async def timed():
+        (trig, timedout) = await sim.wait(full, offset=2)
+        trace.append(('timed', sim.now, trig, timedout))
+        (trig, timedout) = await sim.wait([full, busy], offset=10)
+        trace.append(('timed', sim.now, trig, timedout))
+    def user(d):
+        sim.sleep(d)
+        with res:
+            sim.sleep(3)
+    sim.process(producer)
+    sim.process(watcher)
+    sim.process(timed)
+    for d in (0.5, 0.5, 0.75):
+        sim.process(user, d)
+    sim.run()
+    assert trace == [('timed', 2, False, True), ('full', 5, 5), ('still full', 5),
+                     ('timed', 5, [True, True], False)]
+    assert not full.blocked and not busy.blocked
+
+def test_condition_notify():
+    sim = simulus.simulator()
+    bk = sim.bucket(capacity=10)
+    var = {'x': 0}
+    cond = sim.condition(lambda: var['x'] + bk.level > 3, bk)
+    trace = []
+    def waiter(i):
+        cond.wait()
+        trace.append((i, sim.now))
+    def changer():
+        sim.sleep(1)
+        var['x'] = 2
+        cond.notify()
+        sim.sleep(1)
+        bk.put(1.5)
+    for i in range(3):
+        sim.process(waiter, i)
+    sim.process(changer)
+    sim.run()
+    assert trace == [(0, 2), (1, 2), (2, 2)]
+    assert bk._watchers == [cond]
+    cond.close()
+    assert bk._watchers is None
+    with pytest.raises(TypeError):
+        sim.condition(True)
+    with pytest.raises(TypeError):
+        sim.condition(lambda: True, var)
+
+def test_recycle_releases():
+    # a finished process (and whatever its arguments refer to) is not
+    # kept alive by its greenlet parked in the pool
+    import gc, weakref
+    from simulus.process import _Process
+    sim = simulus.simulator(process_pool=10)
+    refs = []
+    class Payload(object): pass
+    def customer(x):
+        sim.sleep(1)
+    def arrival():
+        for i in range(5):
+            x = Payload()
+            refs.append(weakref.ref(x))
+            sim.process(customer, x)
+            del x
+            sim.sleep(2)
+    sim.process(arrival)
+    sim.run()
+    gc.collect()
+    assert len(sim._greenlets) == 2
+    assert all(r() is None for r in refs)
+    assert not [o for o in gc.get_objects() if isinstance(o, _Process) and o._sim is sim]
+
+def test_condition_contents():
+    # the predicate looks at the objects in the store, which must
+    # agree with the level when the watchers are notified
+    sim = simulus.simulator()
+    st = sim.store(capacity=10, initlevel=2, initobj=['urgent', 'normal'])
+    urgent_gone = sim.condition(lambda: 'urgent' not in st._obj_store, st)
+    head_normal = sim.condition(lambda: st.level > 0 and st._obj_store[0] == 'normal', st)
+    trace = []
+    def waiter(name, cond):
+        cond.wait()
+        trace.append((name, sim.now, st.level, list(st._obj_store)))
+    def consumer():
+        sim.sleep(1)
+        trace.append(('got', sim.now, st.get(1)))
+    sim.process(waiter, 'gone', urgent_gone)
+    sim.process(waiter, 'head', head_normal)
+    sim.process(consumer)
+    sim.run()
+    assert trace == [('got', 1, 'urgent'), ('gone', 1, 1, ['normal']),
+                     ('head', 1, 1, ['normal'])]
+
+def test_resource_context():
+    sim = simulus.simulator()
+    res = sim.resource(capacity=1)
+    trace = []
+    def user(i):
+        with res:
+            trace.append((i, sim.now))
+            sim.sleep(2)
+    async def auser(i):
+        async with res:
+            trace.append((i, sim.now))
+            await sim.sleep(2)
+    async def wrong():
+        with res:
+            pass
+    sim.process(user, 'g')
+    sim.process(auser, 'c')
+    sim.process(user, 'g2')
+    sim.run()
+    assert trace == [('g', 0), ('c', 2), ('g2', 4)]
+    assert res.num_in_system() == 0
+    sim.process(wrong)
+    with pytest.raises(RuntimeError):
+        sim.run()
+    assert res.num_in_system() == 0
+
+def test_not_awaited():
+    # a blocking operation that is not awaited is caught at the next
+    # blocking operation, or when the process gives up control
+    trace = []
+    def run(proc):
+        sim = simulus.simulator()
+        sim.process(proc, sim)
+        with pytest.raises(RuntimeError):
+            sim.run()
+        trace.append(sim.now)
+    async def sleeper(sim):
+        sim.sleep(5)
+        await sim.sleep(1)
+    async def getter(sim):
+        st = sim.store()
+        st.get()
+    async def acquirer(sim):
+        res = sim.resource()
+        await sim.sleep(2)
+        res.acquire()
+        await sim.trap().wait()
+    for proc in (sleeper, getter, acquirer):
+        run(proc)
+    assert trace == [0, 0, 2]
+
+def test_no_greenlet(monkeypatch):
+    # without greenlet, only coroutine processes can be created, and a
+    # failed attempt leaves no trace in the runtime statistics
+    monkeypatch.setattr(simulus.process, 'greenlet', None)
+    sim = simulus.simulator()
+    def proc(): pass
+    async def aproc(): pass
+    with pytest.raises(ImportError):
+        sim.process(proc)
+    assert sim._runtime["initiated_processes"] == 0
+    assert sim._runtime["scheduled_events"] == 0
+    sim.process(aproc)
+    sim.run()
+    assert sim._runtime["initiated_processes"] == 1
+
+def test_kill_report(capsys):
+    def model(n):
+        sim = simulus.simulator()
+        def sleeper():
+            sim.sleep(10)
+        ps = [sim.process(sleeper) for _ in range(n)]
+        for p in ps:
+            sim.sched(sim.kill, p, offset=1)
+        return sim
+    sims = [model(1), model(2)]
+    g = simulus.sync(sims)
+    g.run(5)
+    sims[0].show_runtime_report()
+    g.show_runtime_report()
+    out = capsys.readouterr().out.splitlines()
+    assert [l for l in out if 'killed processes' in l] == \
+        ['killed processes: 1', 'killed processes: 3']
@@ -0,0 +1,49 @@
+#
+# Profiler Test
+#
+# We check that the simulator's profiler collects the execution
+# counts and the wall-clock time spent in the event handlers and
+# process segments, and that the statistics can be sorted, exported
+# to CSV, and cleared. The test_*() methods will be picked up to run
+# by pytest.
+#
+
+import io
+import pytest
+import simulus
+
+def test_profiler():
+    sim = simulus.simulator()
+    class Model(object):
+        def handler(self):
+            sum(range(1000))
+    def worker(n):
+        for _ in range(n):
+            sim.sleep(1)
+    models = [Model() for _ in range(3)]
+    for i, m in enumerate(models):
+        sim.sched(m.handler, offset=i+1)
+    sim.process(worker, 3, offset=2)
+    prof = sim.run(until=4, profile=True)
+    assert sim._profiler is None
+    recs = {(r.kind, r.name.split('.')[-1]): r for r in prof.table()}
+    h = recs[("event", "handler")]
+    w = recs[("process", "worker")]
+    assert (h.calls, h.first, h.last) == (3, 1, 3)
+    assert (w.calls, w.first, w.last) == (2, 2, 3)
+    assert h.total > 0 and h.mean == h.total/3
+
+    # the statistics accumulate until the profiler is cleared
+    with prof:
+        sim.run()
+        with pytest.raises(RuntimeError):
+            sim.profiler().start()
+    assert prof.table(sortby='name')[-1].calls == 4
+    assert [r.kind for r in prof.table(sortby='kind')] == ['event', 'process']
+    out = io.StringIO()
+    prof.to_csv(out)
+    assert out.getvalue().splitlines()[0] == 'kind,name,calls,total,mean,first,last'
+    with pytest.raises(ValueError):
+        prof.table(sortby='nothing')
+    prof.clear()
+    assert prof.table() == []
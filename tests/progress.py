@@ -0,0 +1,51 @@
+#
+# Progress Report Test
+#
+# We check that the simulator samples the progress of a run at the
+# requested intervals (in events or in wall-clock time), includes the
+# trend in the runtime report, and rejects invalid settings. The
+# test_*() methods will be picked up to run by pytest.
+#
+
+import io
+import contextlib
+import pytest
+import simulus
+
+def test_progress():
+    sim = simulus.simulator()
+    def handler(): pass
+    def worker():
+        sim.sleep(50)
+    sim.sched_many(handler, offset=range(100))
+    for i in range(10):
+        sim.process(worker, offset=i*10)
+    sim.kill(sim.process(worker, offset=1))
+    called = []
+    prog = sim.progress(every=25, maxlen=4, callback=lambda s, x: called.append(x))
+    with pytest.raises(RuntimeError):
+        sim.progress(every=10)
+    sim.run(until=40)
+    sim.run()
+    assert len(called) == 5 and prog.samples() == called[-4:]
+    assert [s.executed for s in called] == [0, 25, 50, 75, 100]
+    # 100 handlers, 11 processes started (one of them killed), and
+    # 10 processes woken up
+    assert sim._runtime["executed_events"] == 121
+    assert called[0][1:] == (0, 0, 111, 10)
+    assert called[-1][1:] == (85, 100, 20, 6)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        sim.show_runtime_report()
+    assert 'progress trend (4 intervals)' in out.getvalue()
+    prog.stop()
+    assert sim._progress is None
+    with pytest.raises(ValueError):
+        sim.progress()
+    with pytest.raises(ValueError):
+        sim.progress(every=0)
+
+    prog = sim.progress(interval=1e-9)
+    sim.sched_many(handler, offset=range(1000))
+    sim.run()
+    assert 1 < len(prog) <= 1000 and prog.samples()[-1].executed <= 1121
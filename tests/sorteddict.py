@@ -0,0 +1,220 @@
+#
+# Sorted Dict Test
+#
+# We check the sorted containers used by the event lists against
+# plain python lists and dicts. The test_*() methods will be picked up
+# to run by pytest.
+#
+
+import random
+import pytest
+import pickle
+from simulus.event import SortedDict, SortedMultiDict, CompactSortedDict
+
+def test_multidict():
+    rnd = random.Random(13579)
+    smd = SortedMultiDict()
+    ref = [] # list of (key, seq, value), sorted by key and then seq
+    for seq in range(5000):
+        op = rnd.random()
+        if op < 0.5 or not ref:
+            key = rnd.randrange(50)
+            smd.add(key, seq)
+            ref.append((key, seq, seq))
+        elif op < 0.7:
+            k, _, v = ref.pop(rnd.randrange(len(ref)))
+            smd.remove(k, v)
+        elif op < 0.85:
+            ref.sort()
+            k, _, v = ref.pop(0)
+            assert smd.popitem() == (k, v)
+        else:
+            ref.sort()
+            k = ref[0][0]
+            assert smd.popall() == [v for (x, _, v) in ref if x == k]
+            ref = [r for r in ref if r[0] != k]
+        assert len(smd) == len(ref)
+    smd._check()
+    ref.sort()
+    assert list(smd.items()) == [(k, v) for (k, _, v) in ref]
+    assert list(smd) == [k for (k, _, _) in ref]
+    assert list(smd.keys()) == sorted(set(k for (k, _, _) in ref))
+
+    k = ref[-1][0]
+    assert smd.count(k) == len(smd.getall(k))
+    assert smd.popall(k) == [v for (x, _, v) in ref if x == k]
+    assert k not in smd
+    assert not smd.discard(k, 0)
+    with pytest.raises(KeyError):
+        smd.remove(k, 0)
+    with pytest.raises(KeyError):
+        smd.popall(k)
+
+    copy = smd.copy()
+    copy._check()
+    assert list(copy.items()) == list(smd.items())
+    smd.clear()
+    assert len(smd) == 0 and len(copy) > 0
+    with pytest.raises(KeyError):
+        smd.popitem()
+    with pytest.raises(KeyError):
+        smd.popall()
+
+def test_multidict_bucket():
+    # many values under one key (e.g., simultaneous events), removed
+    # from the middle, with duplicates and unhashable values mixed in
+    rnd = random.Random(24680)
+    n = 100000
+    smd = SortedMultiDict((1, i) for i in range(n))
+    smd.add(0, 'x')
+    smd.update([(1, 'dup'), (1, ['list']), (1, 'dup')])
+    ref = list(range(n)) + ['dup', ['list'], 'dup']
+    gone = rnd.sample(range(1, n-1), 5000)
+    for v in gone:
+        smd.remove(1, v)
+    gone = set(gone)
+    ref = [v for v in ref if isinstance(v, (str, list)) or v not in gone]
+    assert smd.getall(1) == ref
+    smd.remove(1, 'dup')
+    smd.remove(1, ['list'])
+    ref.remove('dup')
+    ref.remove(['list'])
+    assert not smd.discard(1, ['list']) and not smd.discard(1, n+1)
+    assert smd.count(1) == len(ref)
+    assert smd.peekitem(-1) == (1, 'dup')
+    assert smd.popitem(-1) == (1, 'dup')
+    assert smd.popitem() == (0, 'x') and smd.popitem() == (1, 0)
+    v = smd.peekitem()[1]
+    smd.add(1, v)
+    smd.remove(1, v) # the first of the two occurrences is gone
+    assert smd.peekitem() != (1, v) and smd.peekitem(-1) == (1, v)
+    smd._check()
+
+@pytest.mark.parametrize("load", [4, 16, 1000])
+def test_pop_range(load):
+    rnd = random.Random(load)
+    sd = SortedDict()
+    sd._reset(load) # small sublists to exercise the slicing
+    ref = {}
+    for i in range(3000):
+        op = rnd.random()
+        if op < 0.6:
+            k = rnd.random()*1000
+            sd[k] = i
+            ref[k] = i
+        else:
+            lo = rnd.choice((None, rnd.random()*1000))
+            hi = rnd.choice((None, rnd.random()*1000, lo))
+            inc = (rnd.random() < 0.5, rnd.random() < 0.5)
+            if hi is not None and lo is not None and hi < lo: lo, hi = hi, lo
+            expect = [(k, ref[k]) for k in sorted(ref)
+                      if (lo is None or k > lo or inc[0] and k == lo) and
+                         (hi is None or k < hi or inc[1] and k == hi)]
+            if op < 0.8:
+                assert sd.pop_range(lo, hi, inc) == expect
+            elif op < 0.9:
+                sd.del_range(lo, hi, inc)
+            else:
+                hi = rnd.random()*1000
+                expect = [(k, v) for (k, v) in sorted(ref.items()) if k < hi]
+                assert sd.popitems_until(hi) == expect
+            for k, _ in expect: del ref[k]
+        sd._check()
+        assert list(sd.items()) == sorted(ref.items())
+
+def test_pop_range_key():
+    sd = SortedDict(lambda k: -k, {i: str(i) for i in range(10)})
+    assert sd.pop_range(7, 3) == [(7, '7'), (6, '6'), (5, '5'), (4, '4'), (3, '3')]
+    sd.del_range(9, 8)
+    assert list(sd.keys()) == [2, 1, 0]
+    sd._check()
+
+@pytest.mark.parametrize("typecode", [None, 'd'])
+@pytest.mark.parametrize("load", [4, 1000])
+def test_compact(typecode, load):
+    rnd = random.Random(load)
+    csd = CompactSortedDict(typecode=typecode)
+    csd._reset(load)
+    sd = SortedDict()
+    for i in range(5000):
+        op = rnd.random()
+        k = float(rnd.randrange(2000))
+        if op < 0.5:
+            csd[k] = sd[k] = i
+        elif op < 0.65:
+            assert csd.pop(k, None) == sd.pop(k, None)
+        elif op < 0.75 and sd:
+            idx = rnd.choice((0, -1, rnd.randrange(len(sd))))
+            assert csd.peekitem(idx) == sd.peekitem(idx)
+            assert csd.popitem(idx) == sd.popitem(idx)
+        elif op < 0.8:
+            assert csd.setdefault(k, i) == sd.setdefault(k, i)
+        elif op < 0.85:
+            lo, hi = sorted((k, float(rnd.randrange(2000))))
+            assert csd.pop_range(lo, hi, (False, True)) == \
+                sd.pop_range(lo, hi, (False, True))
+        elif op < 0.9:
+            items = {float(rnd.randrange(2000)): i for _ in range(rnd.randrange(50))}
+            csd.update(items)
+            sd.update(items)
+        else:
+            assert (k in csd) == (k in sd)
+            assert csd.bisect_left(k) == sd.bisect_left(k)
+            assert csd.bisect_right(k) == sd.bisect_right(k)
+            assert list(csd.irange(k, k+100, (False, True), True)) == \
+                list(sd.irange(k, k+100, (False, True), True))
+        assert len(csd) == len(sd)
+    csd._check()
+    assert csd == sd
+    assert list(csd.items()) == list(sd.items())
+    assert list(reversed(csd)) == list(reversed(sd))
+    assert csd.keys()[3:10] == sd.keys()[3:10]
+    assert csd.values()[-1] == sd.values()[-1]
+    assert csd.items()[len(sd)//2] == sd.items()[len(sd)//2]
+    assert list(pickle.loads(pickle.dumps(csd)).items()) == list(sd.items())
+    copy = csd.copy()
+    assert csd.popitems_until(1000.0) == sd.popitems_until(1000.0)
+    csd.del_range(1500.0)
+    sd.del_range(1500.0)
+    csd._check()
+    assert list(csd.items()) == list(sd.items())
+    copy._check()
+    assert len(copy) > len(csd)
+    with pytest.raises(KeyError):
+        csd[-1.0]
+    with pytest.raises(KeyError):
+        del csd[-1.0]
+    csd.clear()
+    with pytest.raises(KeyError):
+        csd.popitem()
+
+@pytest.mark.parametrize("cls", [SortedDict, CompactSortedDict])
+@pytest.mark.parametrize("load", [4, 1000])
+def test_merge_sorted(cls, load):
+    rnd = random.Random(load)
+    d = cls()
+    d._reset(load)
+    ref = {}
+    for i in range(300):
+        n = rnd.choice((1, 5, 50, 500))
+        lo = rnd.choice((0, max(ref, default=0)))
+        keys = sorted(set(lo+rnd.randrange(2000) for _ in range(n)))
+        items = [(k, i) for k in keys]
+        if rnd.random() < 0.2:
+            rnd.shuffle(items) # detected and merged anyway
+        d.merge_sorted(items)
+        ref.update(items)
+        if rnd.random() < 0.3:
+            for k in rnd.sample(sorted(ref), len(ref)//2):
+                del d[k]
+                del ref[k]
+        d._check()
+        assert list(d.items()) == sorted(ref.items())
+
+    items = sorted(ref.items())
+    d = cls.from_sorted(iter(items), check=False)
+    d._check()
+    assert list(d.items()) == items
+    d = cls.from_sorted(items[::-1])
+    d._check()
+    assert list(d.items()) == items
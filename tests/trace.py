@@ -0,0 +1,42 @@
+#
+# Trace Test
+#
+# We check that the simulator's tracer records the events, the
+# process transitions, and the blocking operations on the resources,
+# that the records can be filtered and dumped, and that nothing is
+# recorded once the tracer is stopped. The test_*() methods will be
+# picked up to run by pytest.
+#
+
+import io
+import simulus
+
+def test_trace():
+    sim = simulus.simulator()
+    st = sim.store(capacity=1)
+    def prod():
+        st.put(1)
+        st.put(1)
+    def cons():
+        sim.sleep(1)
+        st.get(1)
+    sim.process(prod, name='prod')
+    sim.process(cons)
+    tr = sim.trace(maxlen=100)
+    assert sim.trace() is tr
+    sim.run()
+    kinds = [r[0] for r in tr.records()]
+    assert kinds.count("execute") == 3 and kinds.count("terminate") == 2
+    assert tr.records("put-blocked") == [("put-blocked", 0, sim.name, id(st), 1, 1)]
+    assert tr.records("get")[0][1] == 1
+    out = io.StringIO()
+    tr.dump(out, limit=2)
+    assert out.getvalue().splitlines()[-1].endswith("process 'prod' terminated")
+
+    # once stopped, nothing is traced and no hooks are left behind
+    tr.stop()
+    assert sim._tracer is None and sim._hooks is None
+    n = len(tr)
+    sim.process(prod)
+    sim.run()
+    assert len(tr) == n